@@ -1,3 +1,4 @@
+import asyncio
 import functools
 import json
 import inspect
@@ -6,6 +7,7 @@ from typing import Callable, Any
 class CacheManager:
     def __init__(self):
         self.cache = {}
+        self.in_flight = {}
 
     def _generate_cache_key(self, func: Callable, *args: Any, **kwargs: Any) -> str:
         if inspect.ismethod(func) or (inspect.isfunction(func) and len(inspect.signature(func).parameters) > 0):
@@ -18,7 +20,7 @@ class CacheManager:
         ]
         return ':'.join(key_parts)
 
-    def cached(self, ttl: int = 120):
+    def cached(self, ttl: int = 120, wait_timeout: float = 10.0):
         def decorator(func):
             @functools.wraps(func)
             async def wrapper(*args, **kwargs):
@@ -29,10 +31,27 @@ class CacheManager:
                 if cached_result:
                     return cached_result
                 
+                # Concurrent misses share the call already in flight for this key
+                pending = self.in_flight.get(key)
+                if pending is not None:
+                    try:
+                        return await asyncio.wait_for(asyncio.shield(pending), wait_timeout)
+                    except asyncio.TimeoutError:
+                        return await func(*args, **kwargs)
+                
                 # Call the original function and cache the result
-                result = await func(*args, **kwargs)
-                self.cache[key] = result
-                return result
+                async def fetch():
+                    try:
+                        result = await func(*args, **kwargs)
+                        self.cache[key] = result
+                        return result
+                    finally:
+                        self.in_flight.pop(key, None)
+                
+                pending = asyncio.ensure_future(fetch())
+                self.in_flight[key] = pending
+                # Shielded so a cancelled first caller does not fail the waiters
+                return await asyncio.shield(pending)
             return wrapper
         return decorator
 
@@ -0,0 +1,81 @@
+# benchmarks/bench_cache_storage.py
+"""
+Microbenchmark: CacheStorage operations under each eviction policy
+
+The storage holds half of the key space, so misses are followed by a
+set that evicts, as in a full proxy cache. Keys are drawn with Zipf
+popularity; 'mixed' is the read-through pattern of a cache in front of
+an origin (get, and set on a miss).
+
+Run from web-proxy/:  python -m benchmarks.bench_cache_storage
+"""
+import random
+import time
+from typing import Dict
+
+from web.cache.cache_storage import CacheStorage
+from web.config.cache_settings import CacheConfig
+
+from benchmarks.workload import zipf_keys
+
+POLICIES = (CacheConfig.EVICTION_LRU, CacheConfig.EVICTION_FIFO, CacheConfig.EVICTION_LFU)
+KEYS = [f"GET http://www.example.com/static/{index}.js" for index in range(20000)]
+VALUE = b"x" * 1024
+
+
+def _ns_per_op(func, operations: int) -> float:
+    """Best of three timings of func, in nanoseconds per operation"""
+    best = float('inf')
+    for _ in range(3):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best / operations * 1e9
+
+
+def run(operations: int = 200_000, s: float = 0.8, seed: int = 1) -> Dict[str, Dict[str, float]]:
+    """
+    Time get, set and read-through operations for every eviction policy
+
+    :param operations: Operations per measurement
+    :param s: Zipf exponent of key popularity
+    :param seed: Seed of the key sequence
+    :return: Nanoseconds per operation, and the read-through hit ratio,
+             for each policy
+    """
+    keys = [KEYS[index] for index in zipf_keys(len(KEYS), operations, s, random.Random(seed))]
+    results = {}
+    for policy in POLICIES:
+        storage = CacheStorage(max_size=len(KEYS) // 2, eviction_policy=policy)
+        hits = [0]
+
+        def set_all():
+            for key in keys:
+                storage.set(key, VALUE)
+
+        def get_all():
+            for key in keys:
+                storage.get(key)
+
+        def read_through():
+            found = 0
+            for key in keys:
+                if storage.get(key) is None:
+                    storage.set(key, VALUE)
+                else:
+                    found += 1
+            hits[0] = found
+
+        results[policy] = {
+            'set': _ns_per_op(set_all, operations),
+            'get': _ns_per_op(get_all, operations),
+            'read_through': _ns_per_op(read_through, operations),
+            'hit_ratio': hits[0] / operations
+        }
+    return results
+
+
+if __name__ == "__main__":
+    for policy, result in run().items():
+        print(f"{policy:>24}: set {result['set']:6.0f} ns  get {result['get']:6.0f} ns  "
+              f"read-through {result['read_through']:6.0f} ns  hit ratio {result['hit_ratio']:.2f}")
\ No newline at end of file
@@ -0,0 +1,95 @@
+# benchmarks/bench_request_parser.py
+"""
+Microbenchmark: RequestParser against the original str-splitting parser
+
+Run from web-proxy/:  python -m benchmarks.bench_request_parser
+"""
+import timeit
+import urllib.parse
+from typing import Any, Dict
+
+from web.proxy.request_parser import RequestParser
+
+BROWSER_REQUEST = (
+    b"GET http://www.example.com/static/js/app.bundle.js?v=20241215 HTTP/1.1\r\n"
+    b"Host: www.example.com\r\n"
+    b"User-Agent: Mozilla/5.0 (X11; Linux x86_64; rv:133.0) Gecko/20100101 Firefox/133.0\r\n"
+    b"Accept: */*\r\n"
+    b"Accept-Language: en-US,en;q=0.5\r\n"
+    b"Accept-Encoding: gzip, deflate, br, zstd\r\n"
+    b"Referer: http://www.example.com/\r\n"
+    b"Connection: keep-alive\r\n"
+    b"Cookie: session=8f14e45fceea167a5a36dedd4bea2543; theme=dark; consent=1\r\n"
+    b"Sec-Fetch-Dest: script\r\n"
+    b"Sec-Fetch-Mode: no-cors\r\n"
+    b"Sec-Fetch-Site: same-origin\r\n"
+    b"If-None-Match: \"5f1a-62b0e3c1\"\r\n"
+    b"\r\n"
+)
+
+
+def legacy_parse_request(request: bytes) -> Dict[str, Any]:
+    """The parser RequestParser replaced, kept for comparison"""
+    try:
+        request_str = request.decode('utf-8', errors='ignore')
+        lines = request_str.split('\n')
+        if not lines:
+            return {}
+        method, full_url, _ = lines[0].split(' ')
+        parsed_url = urllib.parse.urlparse(full_url)
+        headers = {}
+        for line in lines[1:]:
+            if ':' in line:
+                key, value = line.split(':', 1)
+                headers[key.strip()] = value.strip()
+        return {
+            'method': method,
+            'url': full_url,
+            'scheme': parsed_url.scheme,
+            'host': parsed_url.hostname,
+            'path': parsed_url.path,
+            'headers': headers
+        }
+    except Exception:
+        return {}
+
+
+def run(number: int = 100_000) -> Dict[str, float]:
+    """
+    Time both parsers on a typical browser request
+
+    :param number: Parses per measurement
+    :return: Nanoseconds per parse for each parser
+    """
+    def legacy():
+        request = legacy_parse_request(BROWSER_REQUEST)
+        return request['url'], request['host']
+
+    def one_shot():
+        request = RequestParser.parse_request(BROWSER_REQUEST)
+        return request.url, request.host
+
+    half = len(BROWSER_REQUEST) // 2
+    first, second = BROWSER_REQUEST[:half], BROWSER_REQUEST[half:]
+
+    def incremental():
+        # Request arriving in two reads, as over a slow connection
+        parser = RequestParser()
+        parser.feed(first)
+        parser.next_request()
+        parser.feed(second)
+        request = parser.next_request()
+        return request.url, request.host
+
+    results = {}
+    for name, func in (('legacy', legacy), ('request_parser', one_shot), ('incremental', incremental)):
+        best = min(timeit.repeat(func, number=number, repeat=5))
+        results[name] = best / number * 1e9
+    return results
+
+
+if __name__ == "__main__":
+    results = run()
+    for name, ns in results.items():
+        print(f"{name:>16}: {ns:8.0f} ns/request")
+    print(f"{'speedup':>16}: {results['legacy'] / results['request_parser']:8.2f}x")
@@ -0,0 +1,97 @@
+# benchmarks/bench_sharded_storage.py
+"""
+Stress benchmark: ShardedCacheStorage throughput by shard count
+
+Threads hammer one storage with a mixed get/set workload over a shared
+key space; shards=1 is the single global lock the cache used to need.
+Scaling past one shard depends on how many threads can run at once, so
+on a GIL build it mostly shows up as less lock handoff between threads.
+
+Run from web-proxy/:  python -m benchmarks.bench_sharded_storage
+"""
+import os
+import random
+import sys
+import threading
+import time
+from typing import Dict, Tuple
+
+from web.cache.cache_storage import CacheStorage
+from web.cache.sharded_storage import ShardedCacheStorage
+
+KEYS = [f"http://www.example.com/static/{index}.js" for index in range(4096)]
+VALUE = b"x" * 512
+
+
+def _stress(storage: ShardedCacheStorage,
+            threads: int,
+            duration: float,
+            write_ratio: float) -> Tuple[int, int]:
+    """Run the workload and return (operations, errors)"""
+    start = threading.Barrier(threads + 1)
+    stop = threading.Event()
+    counts = [0] * threads
+    errors = [0] * threads
+
+    def worker(index: int):
+        rng = random.Random(index)
+        keys = [rng.choice(KEYS) for _ in range(8192)]
+        writes = [rng.random() < write_ratio for _ in range(8192)]
+        done = 0
+        start.wait()
+        while not stop.is_set():
+            for key, write in zip(keys, writes):
+                try:
+                    if write:
+                        storage.set(key, VALUE)
+                    else:
+                        storage.get(key)
+                except Exception:
+                    errors[index] += 1
+            done += len(keys)
+        counts[index] = done
+
+    pool = [threading.Thread(target=worker, args=(index,)) for index in range(threads)]
+    for thread in pool:
+        thread.start()
+    start.wait()
+    time.sleep(duration)
+    stop.set()
+    for thread in pool:
+        thread.join()
+    return sum(counts), sum(errors)
+
+
+def run(threads: int = 8,
+        duration: float = 2.0,
+        write_ratio: float = 0.2,
+        shard_counts: Tuple[int, ...] = (1, 2, 4, 8, 16)) -> Dict[int, float]:
+    """
+    Measure throughput of a mixed workload for each shard count
+
+    :param threads: Concurrent worker threads
+    :param duration: Seconds each configuration runs
+    :param write_ratio: Share of operations that are sets
+    :param shard_counts: Shard counts to compare
+    :return: Operations per second for each shard count
+    """
+    results = {}
+    for shards in shard_counts:
+        storage = ShardedCacheStorage(
+            lambda index: CacheStorage(max_size=-(-len(KEYS) // 2 // shards)),
+            shards=shards
+        )
+        ops, errors = _stress(storage, threads, duration, write_ratio)
+        if errors:
+            raise RuntimeError(f"{errors} operations failed with {shards} shards")
+        results[shards] = ops / duration
+    return results
+
+
+if __name__ == "__main__":
+    threads = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+    print(f"{threads} threads, {os.cpu_count()} CPUs, Python {sys.version.split()[0]}")
+    results = run(threads=threads)
+    baseline = results[min(results)]
+    for shards, rate in results.items():
+        print(f"{shards:>4} shards: {rate:12,.0f} ops/s  {rate / baseline:5.2f}x")
\ No newline at end of file
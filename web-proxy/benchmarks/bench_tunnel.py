@@ -0,0 +1,116 @@
+# benchmarks/bench_tunnel.py
+"""
+Benchmark: bytes relayed through a CONNECT tunnel
+
+A client streams data through the proxy's tunnel to an echo server
+and reads it back, both directions at once, so the relay moves every
+byte twice. The echo server and the proxy run in processes of their
+own, as in the load test.
+
+Run from web-proxy/:  python -m benchmarks.bench_tunnel
+"""
+import multiprocessing
+import socket
+import socketserver
+import threading
+import time
+from typing import Dict
+
+from web.config.settings import ServerConfig
+from web.logging.logger import Logger
+from web.proxy.server import ProxyServer
+
+from benchmarks.load_test import _free_port, _wait_listening
+
+CHUNK = b"x" * (256 * 1024)
+
+
+def _serve_echo(port: int) -> None:
+    """Echo every connection's bytes back until killed"""
+    class Handler(socketserver.BaseRequestHandler):
+        def handle(self):
+            buffer = bytearray(256 * 1024)
+            while True:
+                received = self.request.recv_into(buffer)
+                if not received:
+                    return
+                self.request.sendall(memoryview(buffer)[:received])
+
+    socketserver.ThreadingTCPServer.allow_reuse_address = True
+    with socketserver.ThreadingTCPServer(('127.0.0.1', port), Handler) as server:
+        server.daemon_threads = True
+        server.serve_forever()
+
+
+def _serve_proxy(port: int, mode: str) -> None:
+    """Run a proxy that tunnels to any port until killed"""
+    Logger.configure('WARNING')
+    ServerConfig.TUNNEL_PORTS = None
+    ProxyServer(host='127.0.0.1', port=port, mode=mode, snapshot_path=None).start()
+
+
+def _transfer(proxy_port: int, echo_port: int, size: int) -> float:
+    """Send size bytes through a tunnel and read them back; return seconds taken"""
+    with socket.create_connection(('127.0.0.1', proxy_port), timeout=30) as sock:
+        sock.sendall(f"CONNECT 127.0.0.1:{echo_port} HTTP/1.1\r\nHost: 127.0.0.1\r\n\r\n".encode('ascii'))
+        head = b''
+        while b'\r\n\r\n' not in head:
+            head += sock.recv(1024)
+        if not head.startswith(b'HTTP/1.1 200'):
+            raise RuntimeError(f"Tunnel refused: {head.splitlines()[0]!r}")
+        echoed = len(head.partition(b'\r\n\r\n')[2])
+
+        def send():
+            for _ in range(size // len(CHUNK)):
+                sock.sendall(CHUNK)
+            sock.shutdown(socket.SHUT_WR)
+
+        started = time.perf_counter()
+        sender = threading.Thread(target=send)
+        sender.start()
+        buffer = bytearray(len(CHUNK))
+        while True:
+            received = sock.recv_into(buffer)
+            if not received:
+                break
+            echoed += received
+        sender.join()
+        if echoed != size // len(CHUNK) * len(CHUNK):
+            raise RuntimeError(f"Tunnel lost data: {echoed} of {size} bytes echoed")
+        return time.perf_counter() - started
+
+
+def run(size: int = 256 * 1024 * 1024, repeat: int = 3) -> Dict[str, float]:
+    """
+    Measure tunnel throughput in each serving mode
+
+    :param size: Bytes sent each way per transfer (rounded down to whole chunks)
+    :param repeat: Transfers per mode; the fastest counts
+    :return: Megabytes per second relayed each way, by mode
+    """
+    size -= size % len(CHUNK)
+    context = multiprocessing.get_context('fork')
+    results = {}
+    for mode in (ServerConfig.MODE_THREADED, ServerConfig.MODE_ASYNCIO):
+        echo_port, proxy_port = _free_port(), _free_port()
+        processes = [
+            context.Process(target=_serve_echo, args=(echo_port,), daemon=True),
+            context.Process(target=_serve_proxy, args=(proxy_port, mode), daemon=True)
+        ]
+        for process in processes:
+            process.start()
+        try:
+            for port in (echo_port, proxy_port):
+                _wait_listening(port)
+            best = min(_transfer(proxy_port, echo_port, size) for _ in range(repeat))
+        finally:
+            for process in processes:
+                process.terminate()
+                process.join()
+        results[mode] = size / best / 1e6
+    return results
+
+
+if __name__ == "__main__":
+    for mode, rate in run().items():
+        print(f"{mode:>9}: {rate:,.0f} MB/s each way")
\ No newline at end of file
@@ -0,0 +1,322 @@
+# benchmarks/load_test.py
+"""
+Load test: drive a proxy in front of a stand-in origin
+
+The origin and the proxy each run in a process of their own; client
+threads in this process send a fixed, seeded sequence of requests so
+two runs with the same options send the same requests. Each key's
+object has a log-normal body size and keys are requested with Zipf
+popularity (see benchmarks.workload). A share of the keys is served
+with no-store, which caps the hit ratio below what popularity alone
+gives. Every request opens its own connection, unless --keep-alive
+has each client thread send all of its requests on one.
+
+The origin listens on port 7070 by default, the local upstream the
+proxy tries first (where main.py's stand-in runs), so misses are not
+preceded by a refused connection attempt.
+
+The hit ratio is read from the proxy's /metrics endpoint, and how much
+load the cache took off the origin from the origin's request count.
+
+Run from web-proxy/:  python -m benchmarks.load_test --help
+"""
+import argparse
+import json
+import multiprocessing
+import random
+import re
+import socket
+import socketserver
+import threading
+import time
+import urllib.parse
+import urllib.request
+from typing import Any, Dict, List, Sequence
+
+from web.cache.cache_manager import CacheManager
+from web.config.settings import ServerConfig
+from web.logging.logger import Logger
+from web.proxy.response_parser import HTTPParseError, ResponseParser
+from web.proxy.server import ProxyServer
+
+from benchmarks.workload import object_sizes, percentiles, zipf_keys
+
+_CACHE_RESULT = re.compile(r'^proxy_cache_requests_total\{result="(\w+)"\} (\S+)$', re.MULTILINE)
+
+
+def _free_port(port: int = 0) -> int:
+    """Check a port is free, or pick a free one with port 0"""
+    with socket.socket() as s:
+        s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        try:
+            s.bind(('127.0.0.1', port))
+        except OSError:
+            raise RuntimeError(f"Port {port} is already in use")
+        return s.getsockname()[1]
+
+
+def _wait_listening(port: int, timeout: float = 10.0) -> None:
+    """Wait until something accepts connections on a local port"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=1).close()
+            return
+        except OSError:
+            time.sleep(0.05)
+    raise RuntimeError(f"Nothing listening on port {port}")
+
+
+def _serve_origin(port: int, sizes: Sequence[int], cacheable: Sequence[bool], served) -> None:
+    """
+    Serve /obj/<key> on keep-alive connections until killed
+
+    :param port: Port to listen on
+    :param sizes: Body size of each key's object
+    :param cacheable: Whether each key's object may be cached
+    :param served: Shared counter of requests answered
+    """
+    body = b'x' * max(sizes)
+
+    class Handler(socketserver.BaseRequestHandler):
+        def handle(self):
+            buffer = b''
+            while True:
+                while b'\r\n\r\n' not in buffer:
+                    data = self.request.recv(65536)
+                    if not data:
+                        return
+                    buffer += data
+                head, buffer = buffer.split(b'\r\n\r\n', 1)
+                target = head.split(b' ', 2)[1].decode('ascii')
+                key = int(urllib.parse.urlsplit(target).path.rsplit('/', 1)[-1])
+                cache_control = b'max-age=3600' if cacheable[key] else b'no-store'
+                self.request.sendall(
+                    b"HTTP/1.1 200 OK\r\nContent-Type: application/octet-stream\r\n"
+                    b"Cache-Control: %s\r\nContent-Length: %d\r\n\r\n" % (cache_control, sizes[key])
+                    + body[:sizes[key]]
+                )
+                with served.get_lock():
+                    served.value += 1
+
+    socketserver.ThreadingTCPServer.allow_reuse_address = True
+    with socketserver.ThreadingTCPServer(('127.0.0.1', port), Handler) as server:
+        server.daemon_threads = True
+        server.serve_forever()
+
+
+def _serve_proxy(port: int, admin_port: int, mode: str, cache_size: int, log_level: str) -> None:
+    """Run a proxy with a memory cache of cache_size entries until killed"""
+    Logger.configure(log_level)
+    # Every benchmark client connects from the same address
+    ServerConfig.MAX_CONNECTIONS_PER_CLIENT = None
+    ProxyServer(
+        host='127.0.0.1',
+        port=port,
+        mode=mode,
+        cache_manager=CacheManager(max_size=cache_size),
+        snapshot_path=None,
+        admin_port=admin_port
+    ).start()
+
+
+def _cache_results(admin_port: int) -> Dict[str, float]:
+    """Scrape the proxy's cache results by kind"""
+    with urllib.request.urlopen(f"http://127.0.0.1:{admin_port}/metrics", timeout=10) as response:
+        text = response.read().decode('utf-8')
+    return {result: float(value) for result, value in _CACHE_RESULT.findall(text)}
+
+
+def _drive(proxy_port: int,
+           origin_port: int,
+           keys: List[int],
+           concurrency: int,
+           keep_alive: bool = False) -> Dict[str, Any]:
+    """Send the requests for keys from concurrency threads; keep_alive reuses one connection per thread"""
+    latencies: List[float] = []
+    received = [0]
+    errors = [0]
+    lock = threading.Lock()
+    start = threading.Barrier(concurrency + 1)
+
+    def client(share: List[int]):
+        done = []
+        size = errors_seen = 0
+        sock = None
+        connection = 'keep-alive' if keep_alive else 'close'
+        start.wait()
+        for key in share:
+            request = (
+                f"GET http://127.0.0.1:{origin_port}/obj/{key} HTTP/1.1\r\n"
+                f"Host: 127.0.0.1:{origin_port}\r\nConnection: {connection}\r\n\r\n"
+            ).encode('ascii')
+            started = time.perf_counter()
+            try:
+                if sock is None:
+                    sock = socket.create_connection(('127.0.0.1', proxy_port), timeout=30)
+                sock.sendall(request)
+                parser = ResponseParser()
+                length = 0
+                while not parser.message_complete:
+                    chunk = sock.recv(65536)
+                    if not chunk:
+                        parser.feed_eof()
+                        break
+                    parser.feed(chunk)
+                    length += len(chunk)
+                if not keep_alive or not parser.keep_alive:
+                    sock.close()
+                    sock = None
+                if parser.response.status != 200:
+                    errors_seen += 1
+                    continue
+            except (OSError, HTTPParseError):
+                errors_seen += 1
+                if sock is not None:
+                    sock.close()
+                    sock = None
+                continue
+            done.append(time.perf_counter() - started)
+            size += length
+        if sock is not None:
+            sock.close()
+        with lock:
+            latencies.extend(done)
+            received[0] += size
+            errors[0] += errors_seen
+
+    threads = [
+        threading.Thread(target=client, args=(keys[index::concurrency],))
+        for index in range(concurrency)
+    ]
+    for thread in threads:
+        thread.start()
+    start.wait()
+    started = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    duration = time.perf_counter() - started
+    return {'latencies': latencies, 'bytes': received[0], 'errors': errors[0], 'duration': duration}
+
+
+def run(mode: str = ServerConfig.MODE_THREADED,
+        concurrency: int = 16,
+        requests: int = 5000,
+        warmup: int = 1000,
+        keys: int = 2000,
+        zipf: float = 0.8,
+        cacheable: float = 0.9,
+        size_median: int = 8192,
+        size_sigma: float = 1.0,
+        size_max: int = 1024 * 1024,
+        cache_size: int = 1000,
+        seed: int = 1,
+        keep_alive: bool = False,
+        origin_port: int = 7070,
+        log_level: str = 'WARNING') -> Dict[str, Any]:
+    """
+    Run one load test
+
+    :param mode: Proxy serving mode ('threaded' or 'asyncio')
+    :param concurrency: Client threads sending requests at once
+    :param requests: Requests measured
+    :param warmup: Requests sent first to fill the cache, not measured
+    :param keys: Distinct objects the origin serves
+    :param zipf: Zipf exponent of key popularity (0 for uniform)
+    :param cacheable: Share of the keys the origin allows to be cached
+    :param size_median: Median object size in bytes
+    :param size_sigma: Spread of the log-normal object sizes
+    :param size_max: Largest object size in bytes
+    :param cache_size: Entries the proxy's cache holds
+    :param seed: Seed of object sizes, cacheability and request order
+    :param keep_alive: Send each client thread's requests on one connection
+    :param origin_port: Port of the stand-in origin
+    :param log_level: Proxy log level; INFO logs every request
+    :return: Options, throughput, latency percentiles (seconds), hit
+             ratio and origin offload of the measured requests
+    """
+    options = dict(locals())
+    rng = random.Random(seed)
+    sizes = object_sizes(keys, size_median, size_sigma, size_max, rng)
+    allowed = [rng.random() < cacheable for _ in range(keys)]
+    warmup_keys = zipf_keys(keys, warmup, zipf, rng)
+    measured_keys = zipf_keys(keys, requests, zipf, rng)
+
+    context = multiprocessing.get_context('fork')
+    served = context.Value('q', 0)
+    origin_port, proxy_port, admin_port = _free_port(origin_port), _free_port(), _free_port()
+    processes = [
+        context.Process(target=_serve_origin, args=(origin_port, sizes, allowed, served), daemon=True),
+        context.Process(target=_serve_proxy, args=(proxy_port, admin_port, mode, cache_size, log_level), daemon=True)
+    ]
+    for process in processes:
+        process.start()
+    try:
+        for port in (origin_port, proxy_port, admin_port):
+            _wait_listening(port)
+        if warmup_keys:
+            _drive(proxy_port, origin_port, warmup_keys, concurrency, keep_alive)
+
+        before, origin_before = _cache_results(admin_port), served.value
+        result = _drive(proxy_port, origin_port, measured_keys, concurrency, keep_alive)
+        after, origin_after = _cache_results(admin_port), served.value
+    finally:
+        for process in processes:
+            process.terminate()
+            process.join()
+
+    results = {kind: after[kind] - before.get(kind, 0) for kind in after}
+    looked_up = sum(results.values())
+    completed = len(result['latencies'])
+    latency = percentiles(result['latencies'])
+    latency['mean'] = sum(result['latencies']) / completed if completed else 0.0
+    return {
+        'options': options,
+        'requests': completed,
+        'errors': result['errors'],
+        'duration': result['duration'],
+        'throughput': completed / result['duration'],
+        'bytes_per_second': result['bytes'] / result['duration'],
+        'latency': latency,
+        'hit_ratio': 1 - results.get('miss', 0) / looked_up if looked_up else 0.0,
+        'cache_results': results,
+        'origin_offload': 1 - (origin_after - origin_before) / requests if requests else 0.0
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0].strip())
+    parser.add_argument('--mode', default=ServerConfig.MODE_THREADED,
+                        choices=(ServerConfig.MODE_THREADED, ServerConfig.MODE_ASYNCIO))
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--requests', type=int, default=5000)
+    parser.add_argument('--warmup', type=int, default=1000)
+    parser.add_argument('--keys', type=int, default=2000)
+    parser.add_argument('--zipf', type=float, default=0.8)
+    parser.add_argument('--cacheable', type=float, default=0.9)
+    parser.add_argument('--size-median', type=int, default=8192)
+    parser.add_argument('--size-sigma', type=float, default=1.0)
+    parser.add_argument('--size-max', type=int, default=1024 * 1024)
+    parser.add_argument('--cache-size', type=int, default=1000)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--keep-alive', action='store_true', help='reuse one connection per client thread')
+    parser.add_argument('--origin-port', type=int, default=7070)
+    parser.add_argument('--json', action='store_true', help='print the result as JSON')
+    args = parser.parse_args()
+
+    options = vars(args)
+    as_json = options.pop('json')
+    result = run(**options)
+    if as_json:
+        print(json.dumps(result, indent=2))
+        return
+    latency = result['latency']
+    print(f"{result['requests']} requests ({result['errors']} errors) in {result['duration']:.2f} s: "
+          f"{result['throughput']:,.0f} req/s, {result['bytes_per_second'] / 1e6:,.1f} MB/s")
+    print(f"latency p50 {latency['p50'] * 1e3:.2f} ms  p95 {latency['p95'] * 1e3:.2f} ms  "
+          f"p99 {latency['p99'] * 1e3:.2f} ms  max {latency['max'] * 1e3:.2f} ms")
+    print(f"hit ratio {result['hit_ratio']:.2f}, origin offload {result['origin_offload']:.2f}")
+
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
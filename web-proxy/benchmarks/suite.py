@@ -0,0 +1,170 @@
+# benchmarks/suite.py
+"""
+Benchmark suite: every benchmark, as one JSON report
+
+Runs the microbenchmarks (request parser, cache storage, sharded
+storage, URL blocker), load tests in both serving modes, with and
+without client keep-alive, and CONNECT tunnel throughput, and writes a
+report whose 'metrics' map each metric name to its value, unit and
+whether higher or lower is better. Reports from different commits can
+be compared with --compare; any metric more than --threshold worse
+than in the baseline is listed and the exit status is 1, so a CI job
+can fail on it.
+
+Load tests need port 7070 free for their stand-in origin.
+
+Run from web-proxy/:
+    python -m benchmarks.suite --output before.json
+    python -m benchmarks.suite --output after.json --compare before.json
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import subprocess
+import sys
+from typing import Any, Dict
+
+from web.config.settings import ServerConfig
+from web.logging.logger import Logger
+
+from benchmarks import (bench_cache_storage, bench_request_parser, bench_sharded_storage,
+                        bench_tunnel, bench_url_blocking, load_test)
+
+HIGHER, LOWER = 'higher', 'lower'
+
+
+def _commit() -> str:
+    """Current git commit of the tree, if it is a git checkout"""
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__))
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def run(quick: bool = False) -> Dict[str, Any]:
+    """
+    Run every benchmark
+
+    :param quick: Run smaller workloads, e.g. for a smoke test
+    :return: Report with the environment, raw results and flat metrics
+    """
+    scale = 0.1 if quick else 1.0
+    raw: Dict[str, Any] = {}
+    metrics: Dict[str, Dict[str, Any]] = {}
+
+    def metric(name: str, value: float, unit: str, better: str) -> None:
+        metrics[name] = {'value': value, 'unit': unit, 'better': better}
+
+    raw['request_parser'] = bench_request_parser.run(number=int(100_000 * scale))
+    for name in ('request_parser', 'incremental'):
+        metric(f'request_parser.{name}', raw['request_parser'][name], 'ns/request', LOWER)
+
+    raw['cache_storage'] = bench_cache_storage.run(operations=int(200_000 * scale))
+    for policy, result in raw['cache_storage'].items():
+        for operation in ('get', 'set', 'read_through'):
+            metric(f'cache_storage.{policy}.{operation}', result[operation], 'ns/op', LOWER)
+
+    raw['sharded_storage'] = bench_sharded_storage.run(duration=2.0 * scale, shard_counts=(1, 16))
+    for shards, rate in raw['sharded_storage'].items():
+        metric(f'sharded_storage.{shards}_shards', rate, 'ops/s', HIGHER)
+
+    raw['url_blocking'] = bench_url_blocking.run(patterns=int(bench_url_blocking.PATTERNS * scale))
+    for scenario, result in raw['url_blocking'].items():
+        name = scenario.replace(', ', '.').replace(' ', '_')
+        metric(f'url_blocking.{name}', result['new'], 'lookups/s', HIGHER)
+
+    for mode in (ServerConfig.MODE_THREADED, ServerConfig.MODE_ASYNCIO):
+        for keep_alive in (False, True):
+            name = f'load.{mode}.keep_alive' if keep_alive else f'load.{mode}'
+            result = load_test.run(
+                mode=mode, requests=int(5000 * scale), warmup=int(1000 * scale), keep_alive=keep_alive
+            )
+            raw[name] = result
+            metric(f'{name}.throughput', result['throughput'], 'requests/s', HIGHER)
+            for point in ('p50', 'p95', 'p99'):
+                metric(f'{name}.latency_{point}', result['latency'][point], 's', LOWER)
+            metric(f'{name}.hit_ratio', result['hit_ratio'], 'ratio', HIGHER)
+            metric(f'{name}.errors', result['errors'], 'requests', LOWER)
+
+    raw['tunnel'] = bench_tunnel.run(size=int(256 * 1024 * 1024 * scale))
+    for mode, rate in raw['tunnel'].items():
+        metric(f'tunnel.{mode}.throughput', rate, 'MB/s', HIGHER)
+
+    return {
+        'commit': _commit(),
+        'timestamp': datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds'),
+        'python': sys.version.split()[0],
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'quick': quick,
+        'metrics': metrics,
+        'results': raw
+    }
+
+
+def compare(report: Dict[str, Any], baseline: Dict[str, Any], threshold: float) -> Dict[str, float]:
+    """
+    Find metrics that got worse than in a baseline report
+
+    :param report: New report
+    :param baseline: Report to compare against
+    :param threshold: Relative change tolerated, e.g. 0.1 for 10%
+    :return: Relative change (negative is worse) of each metric beyond
+             the threshold, by metric name
+    """
+    regressions = {}
+    for name, current in report['metrics'].items():
+        previous = baseline.get('metrics', {}).get(name)
+        if previous is None:
+            continue
+        old, new = previous['value'], current['value']
+        if old == 0:
+            # Only counts can start at zero; any new one is a regression
+            change = -float(new > 0) if current['better'] == LOWER else 0.0
+        elif current['better'] == HIGHER:
+            change = (new - old) / old
+        else:
+            change = (old - new) / old
+        if change < -threshold:
+            regressions[name] = change
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0].strip())
+    parser.add_argument('--output', help='write the report to this file (default: stdout)')
+    parser.add_argument('--compare', metavar='BASELINE', help='report to check for regressions against')
+    parser.add_argument('--threshold', type=float, default=0.1,
+                        help='relative change tolerated before a metric counts as regressed')
+    parser.add_argument('--quick', action='store_true', help='run smaller workloads')
+    args = parser.parse_args()
+
+    Logger.configure('WARNING')
+    report = run(quick=args.quick)
+    text = json.dumps(report, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, 'w') as output_file:
+            output_file.write(text + '\n')
+    else:
+        print(text)
+
+    if args.compare:
+        with open(args.compare) as baseline_file:
+            baseline = json.load(baseline_file)
+        regressions = compare(report, baseline, args.threshold)
+        for name, change in sorted(regressions.items()):
+            print(f"REGRESSION {name}: {baseline['metrics'][name]['value']:.6g} -> "
+                  f"{report['metrics'][name]['value']:.6g} ({change:+.0%})", file=sys.stderr)
+        print(f"{len(regressions)} of {len(report['metrics'])} metrics regressed by more than "
+              f"{args.threshold:.0%} against {baseline.get('commit', args.compare)}", file=sys.stderr)
+        sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
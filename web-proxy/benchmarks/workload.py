@@ -0,0 +1,67 @@
+# benchmarks/workload.py
+"""
+Seeded workload generators shared by the benchmarks
+
+Key popularity follows a Zipf distribution: key i (from 0) is requested
+with weight 1 / (i + 1) ** s, so a few keys take most of the requests
+the way a few URLs do in real proxy traffic. s = 0 is uniform; web
+traces usually measure s between 0.6 and 1.0.
+"""
+import itertools
+import math
+import random
+from typing import Dict, List, Sequence
+
+
+def zipf_keys(keys: int, count: int, s: float, rng: random.Random) -> List[int]:
+    """
+    Draw key indices with Zipf popularity
+
+    :param keys: Number of distinct keys
+    :param count: Number of draws
+    :param s: Zipf exponent (0 for uniform)
+    :param rng: Seeded random source
+    :return: Key indices in [0, keys)
+    """
+    weights = [1 / (index + 1) ** s for index in range(keys)]
+    return rng.choices(range(keys), cum_weights=list(itertools.accumulate(weights)), k=count)
+
+
+def object_sizes(keys: int,
+                 median: int,
+                 sigma: float,
+                 maximum: int,
+                 rng: random.Random) -> List[int]:
+    """
+    Draw a body size for every key from a log-normal distribution
+
+    :param keys: Number of keys
+    :param median: Median size in bytes
+    :param sigma: Spread of the log of the size (0 makes every object median bytes)
+    :param maximum: Largest size drawn
+    :param rng: Seeded random source
+    :return: Size in bytes of each key's object
+    """
+    return [
+        max(1, min(maximum, int(rng.lognormvariate(math.log(median), sigma))))
+        for _ in range(keys)
+    ]
+
+
+def percentiles(samples: Sequence[float], points: Sequence[int] = (50, 95, 99)) -> Dict[str, float]:
+    """
+    Nearest-rank percentiles of a set of samples
+
+    :param samples: Measured values
+    :param points: Percentiles to report
+    :return: Value at each percentile as 'p50' etc., plus 'max'
+    """
+    ordered = sorted(samples)
+    if not ordered:
+        return {f'p{point}': 0.0 for point in points}
+    result = {
+        f'p{point}': ordered[min(len(ordered) - 1, max(0, math.ceil(point / 100 * len(ordered)) - 1))]
+        for point in points
+    }
+    result['max'] = ordered[-1]
+    return result
\ No newline at end of file
@@ -1,4 +1,8 @@
 from .cache_manager import CacheManager
 from .cache_storage import CacheStorage
+from .disk_storage import DiskCacheStorage
+from .sharded_storage import ShardedCacheStorage
+from .snapshot import CacheSnapshotter
+from .tiered_storage import TieredCacheStorage
 
-__all__ = ["CacheManager", "CacheStorage"]
+__all__ = ["CacheManager", "CacheStorage", "DiskCacheStorage", "ShardedCacheStorage", "CacheSnapshotter", "TieredCacheStorage"]
@@ -1,70 +1,167 @@
-from typing import Dict, Any, Callable
+from collections import OrderedDict
+from typing import Dict, Hashable, Optional, Type
 
-class CacheEvictionStrategy:
+class EvictionPolicy:
     """
-    Advanced cache eviction strategies
+    Base class for cache eviction policies
+    
+    Each policy keeps its own ordering of keys, updated on every insert,
+    access and removal, so choosing a victim never scans the cache.
     """
     
-    @staticmethod
-    def least_recently_used(cache: Dict[str, Dict[str, Any]], 
-                             max_size: int) -> str:
+    def record_insert(self, key: Hashable) -> None:
         """
-        Identify least recently used item for eviction
+        Track a newly inserted key
         
-        :param cache: Current cache dictionary
-        :param max_size: Maximum cache size
-        :return: Key of item to evict
+        :param key: Inserted key
         """
-        return min(
-            cache, 
-            key=lambda k: cache[k].get('last_accessed', 0)
-        )
+        raise NotImplementedError
     
-    @staticmethod
-    def first_in_first_out(cache: Dict[str, Dict[str, Any]], 
-                            max_size: int) -> str:
+    def record_access(self, key: Hashable) -> None:
         """
-        Identify first added item for eviction
+        Track a read (or overwrite) of an existing key
         
-        :param cache: Current cache dictionary
-        :param max_size: Maximum cache size
-        :return: Key of item to evict
+        :param key: Accessed key
         """
-        return min(
-            cache, 
-            key=lambda k: cache[k].get('created_at', 0)
-        )
+        raise NotImplementedError
     
-    @staticmethod
-    def least_frequently_used(cache: Dict[str, Dict[str, Any]], 
-                               max_size: int) -> str:
+    def record_remove(self, key: Hashable) -> None:
         """
-        Identify least frequently accessed item for eviction
+        Stop tracking a key removed from the cache
         
-        :param cache: Current cache dictionary
-        :param max_size: Maximum cache size
-        :return: Key of item to evict
+        :param key: Removed key
         """
-        return min(
-            cache, 
-            key=lambda k: cache[k].get('access_count', 0)
-        )
+        raise NotImplementedError
+    
+    def select_victim(self) -> Optional[Hashable]:
+        """
+        Identify the key to evict next
+        
+        :return: Key of item to evict, or None if nothing is tracked
+        """
+        raise NotImplementedError
+    
+    def clear(self) -> None:
+        """Stop tracking all keys"""
+        raise NotImplementedError
+
+
+class LRUEvictionPolicy(EvictionPolicy):
+    """Evict the least recently used key"""
+    
+    def __init__(self):
+        self._order: 'OrderedDict[Hashable, None]' = OrderedDict()
+    
+    def record_insert(self, key: Hashable) -> None:
+        self._order[key] = None
+        self._order.move_to_end(key)
+    
+    def record_access(self, key: Hashable) -> None:
+        if key in self._order:
+            self._order.move_to_end(key)
+    
+    def record_remove(self, key: Hashable) -> None:
+        self._order.pop(key, None)
+    
+    def select_victim(self) -> Optional[Hashable]:
+        return next(iter(self._order), None)
+    
+    def clear(self) -> None:
+        self._order.clear()
+
+
+class FIFOEvictionPolicy(LRUEvictionPolicy):
+    """Evict the key that was inserted first; reads do not reorder"""
+    
+    def record_access(self, key: Hashable) -> None:
+        pass
+
+
+class LFUEvictionPolicy(EvictionPolicy):
+    """
+    Evict the least frequently used key
+    
+    Keys are grouped in per-frequency buckets; each bucket is ordered
+    by recency so ties are broken LRU-first.
+    """
+    
+    def __init__(self):
+        self._frequency: Dict[Hashable, int] = {}
+        self._buckets: Dict[int, 'OrderedDict[Hashable, None]'] = {}
+        self._min_frequency = 0
+    
+    def record_insert(self, key: Hashable) -> None:
+        if key in self._frequency:
+            self.record_access(key)
+            return
+        self._frequency[key] = 1
+        self._buckets.setdefault(1, OrderedDict())[key] = None
+        self._min_frequency = 1
+    
+    def record_access(self, key: Hashable) -> None:
+        frequency = self._frequency.get(key)
+        if frequency is None:
+            return
+        
+        bucket = self._buckets[frequency]
+        del bucket[key]
+        if not bucket:
+            del self._buckets[frequency]
+            if self._min_frequency == frequency:
+                self._min_frequency = frequency + 1
+        
+        self._frequency[key] = frequency + 1
+        self._buckets.setdefault(frequency + 1, OrderedDict())[key] = None
+    
+    def record_remove(self, key: Hashable) -> None:
+        frequency = self._frequency.pop(key, None)
+        if frequency is None:
+            return
+        
+        bucket = self._buckets[frequency]
+        del bucket[key]
+        if not bucket:
+            # min_frequency is repaired lazily in select_victim
+            del self._buckets[frequency]
+    
+    def select_victim(self) -> Optional[Hashable]:
+        if not self._frequency:
+            return None
+        
+        bucket = self._buckets.get(self._min_frequency)
+        if not bucket:
+            # Only after an out-of-order removal; bounded by distinct frequencies
+            self._min_frequency = min(self._buckets)
+            bucket = self._buckets[self._min_frequency]
+        return next(iter(bucket))
+    
+    def clear(self) -> None:
+        self._frequency.clear()
+        self._buckets.clear()
+        self._min_frequency = 0
+
+
+class CacheEvictionStrategy:
+    """
+    Advanced cache eviction strategies
+    """
+    
+    _POLICIES: Dict[str, Type[EvictionPolicy]] = {
+        'least_recently_used': LRUEvictionPolicy,
+        'first_in_first_out': FIFOEvictionPolicy,
+        'least_frequently_used': LFUEvictionPolicy
+    }
     
     @classmethod
-    def get_strategy(cls, strategy_name: str) -> Callable:
+    def get_strategy(cls, strategy_name: str) -> EvictionPolicy:
         """
         Get eviction strategy by name
         
         :param strategy_name: Name of eviction strategy
-        :return: Eviction strategy function
+        :return: New eviction policy instance
         """
-        strategies = {
-            'least_recently_used': cls.least_recently_used,
-            'first_in_first_out': cls.first_in_first_out,
-            'least_frequently_used': cls.least_frequently_used
-        }
-        
-        return strategies.get(
-            strategy_name, 
-            cls.least_recently_used  # Default strategy
-        )
\ No newline at end of file
+        policy_class = cls._POLICIES.get(
+            strategy_name,
+            LRUEvictionPolicy  # Default strategy
+        )
+        return policy_class()
\ No newline at end of file
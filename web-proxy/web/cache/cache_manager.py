@@ -1,6 +1,11 @@
 # web/cache/cache_manager.py
-from typing import Any, Optional
+import os
+import time
+from typing import Any, Dict, Iterator, Optional, Tuple
 from .cache_storage import CacheStorage
+from .disk_storage import DiskCacheStorage
+from .sharded_storage import ShardedCacheStorage
+from .tiered_storage import TieredCacheStorage
 from ..config.cache_settings import CacheConfig
 
 class CacheManager:
@@ -11,28 +16,80 @@ class CacheManager:
     def __init__(self, 
                  max_size: int = CacheConfig.DEFAULT_CACHE_SIZE,
                  expiration_time: int = CacheConfig.DEFAULT_EXPIRATION_TIME,
-                 eviction_policy: str = CacheConfig.DEFAULT_EVICTION_POLICY):
+                 eviction_policy: str = CacheConfig.DEFAULT_EVICTION_POLICY, 
+                 max_bytes: Optional[int] = CacheConfig.DEFAULT_MAX_BYTES, 
+                 max_object_size: int = CacheConfig.MAX_CACHEABLE_RESPONSE_SIZE, 
+                 storage_type: str = CacheConfig.DEFAULT_STORAGE_TYPE, 
+                 l1_size: Optional[int] = CacheConfig.L1_CACHE_SIZE, 
+                 shards: int = CacheConfig.CACHE_SHARDS, 
+                 disk_directory: str = CacheConfig.DISK_CACHE_DIR, 
+                 shared: bool = False):
         """
         Initialize cache manager
         
         :param max_size: Maximum cache size
         :param expiration_time: Cache entry expiration time
         :param eviction_policy: Cache eviction strategy
+        :param max_bytes: Total bytes budget for cached values (None for no limit)
+        :param max_object_size: Largest single value admitted to the cache
+        :param storage_type: CacheConfig.STORAGE_MEMORY or CacheConfig.STORAGE_DISK
+        :param l1_size: Items kept in an in-memory L1 tier in front of the
+                        storage above (None for a single tier)
+        :param shards: Number of independently locked shards; size budgets
+                       are split evenly between them
+        :param disk_directory: Directory of the disk storage
+        :param shared: Share the disk storage with other processes using
+                       the same directory, e.g. pre-fork workers
         """
-        self._storage = CacheStorage(
-            max_size=max_size,
-            expiration_time=expiration_time,
-            eviction_policy=eviction_policy
-        )
+        if shared and storage_type != CacheConfig.STORAGE_DISK:
+            raise ValueError("Only disk storage can be shared between processes")
+        self._max_object_size = max_object_size
+        
+        def per_shard(total: Optional[int]) -> Optional[int]:
+            return None if total is None else -(-total // shards)
+        
+        def build_shard(index: int) -> Any:
+            options = {}
+            storage_class = CacheStorage
+            if storage_type == CacheConfig.STORAGE_DISK:
+                storage_class = DiskCacheStorage
+                options['shared'] = shared
+                options['directory'] = disk_directory
+                if shards > 1:
+                    options['directory'] = os.path.join(disk_directory, f"shard{index:02d}")
+            storage = storage_class(
+                max_size=per_shard(max_size),
+                expiration_time=expiration_time,
+                eviction_policy=eviction_policy,
+                max_bytes=per_shard(max_bytes),
+                max_object_size=max_object_size,
+                **options
+            )
+            if l1_size is not None:
+                storage = TieredCacheStorage(
+                    l2=storage,
+                    l1_size=per_shard(l1_size),
+                    l1_max_bytes=per_shard(CacheConfig.L1_MAX_BYTES),
+                    expiration_time=expiration_time
+                )
+            return storage
+        
+        self._storage = ShardedCacheStorage(build_shard, shards=shards)
     
-    def cache(self, key: str, value: Any) -> None:
+    def cache(self, 
+              key: str, 
+              value: Any, 
+              ttl: Optional[float] = None, 
+              stale_ttl: float = 0) -> None:
         """
         Cache a value with given key
         
         :param key: Unique cache key
         :param value: Value to cache
+        :param ttl: Seconds until the entry expires (defaults to expiration_time)
+        :param stale_ttl: Seconds the expired entry stays available to lookup()
         """
-        self._storage.set(key, value)
+        self._storage.set(key, value, ttl=ttl, stale_ttl=stale_ttl)
     
     def retrieve(self, key: str) -> Optional[Any]:
         """
@@ -43,19 +100,71 @@ class CacheManager:
         """
         return self._storage.get(key)
     
+    def lookup(self, key: str) -> Optional[Tuple[Any, bool]]:
+        """
+        Retrieve a cached value even if it has expired but is still retained
+        
+        :param key: Cache key to retrieve
+        :return: (value, fresh) or None if not found
+        """
+        return self._storage.lookup(key)
+    
+    def expiry(self, key: str) -> Optional[Tuple[float, float]]:
+        """
+        Get the deadlines of a cached entry
+        
+        :param key: Cache key
+        :return: (expires_at, retain_until) timestamps, or None if not cached
+        """
+        return self._storage.expiry(key)
+    
+    def entries(self) -> Iterator[Tuple[str, Any, float, float]]:
+        """
+        Iterate over cached entries, e.g. to snapshot them
+        
+        :return: Iterator of (key, value, expires_at, retain_until)
+        """
+        return self._storage.entries()
+    
+    def restore(self, key: str, value: Any, expires_at: float, retain_until: float) -> bool:
+        """
+        Cache a value with the deadlines it had when it was saved
+        
+        :param key: Cache key
+        :param value: Value to cache
+        :param expires_at: Timestamp the entry stops being fresh
+        :param retain_until: Timestamp the entry is dropped
+        :return: True if stored, False if already past retention or rejected
+        """
+        now = time.time()
+        if retain_until <= now:
+            return False
+        return self._storage.set(key, value, ttl=expires_at - now, stale_ttl=retain_until - expires_at)
+    
     def invalidate(self, key: str) -> None:
         """
         Remove a specific entry from cache
         
         :param key: Key to remove
         """
-        if key in self._storage._cache:
-            del self._storage._cache[key]
+        self._storage.delete(key)
+    
+    def purge_expired(self) -> int:
+        """
+        Remove all expired entries, e.g. from a periodic maintenance task
+        
+        :return: Number of entries removed
+        """
+        return self._storage.purge_expired()
     
     def clear_cache(self) -> None:
         """Clear entire cache"""
         self._storage.clear()
     
+    def close(self) -> None:
+        """Flush and release the storage, e.g. on shutdown"""
+        self._storage.close()
+    
     @property
     def cache_size(self) -> int:
         """
@@ -63,4 +172,32 @@ class CacheManager:
         
         :return: Number of items in cache
         """
-        return len(self._storage)
\ No newline at end of file
+        return len(self._storage)
+    
+    @property
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get lookup, eviction and expiry counters
+        
+        :return: Hits, misses, evictions and expirations summed over
+                 shards, broken down per tier when tiered
+        """
+        return self._storage.stats
+    
+    @property
+    def cache_bytes(self) -> int:
+        """
+        Get current size of cached values
+        
+        :return: Total bytes held by the cache
+        """
+        return self._storage.size_bytes
+    
+    @property
+    def max_object_size(self) -> int:
+        """
+        Get the admission cutoff for single values
+        
+        :return: Largest value size in bytes the cache accepts
+        """
+        return self._max_object_size
\ No newline at end of file
@@ -1,57 +1,106 @@
 # web/cache/cache_storage.py
+import heapq
+import sys
 import time
-from typing import Any, Dict, Optional
-from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+from .cache_eviction import CacheEvictionStrategy
+from ..config.cache_settings import CacheConfig
 
 class CacheStorage:
     """
-    A flexible caching storage mechanism supporting 
+    A flexible caching storage mechanism supporting
     different storage types and eviction policies
     """
     
     def __init__(self, 
                  max_size: int = 1000, 
                  expiration_time: int = 3600, 
-                 eviction_policy: str = 'least_recently_used'):
+                 eviction_policy: str = 'least_recently_used', 
+                 max_bytes: Optional[int] = None, 
+                 max_object_size: Optional[int] = None, 
+                 on_evict: Optional[Callable[[str, Any, float, float], None]] = None):
         """
         Initialize cache storage
         
         :param max_size: Maximum number of items in cache
         :param expiration_time: Time in seconds before cache item expires
         :param eviction_policy: Policy for removing items when cache is full
+        :param max_bytes: Maximum total size of stored values (None for no limit)
+        :param max_object_size: Largest single value admitted (None for no limit)
+        :param on_evict: Called with (key, value, expires_at, retain_until) for
+                         entries evicted to make room, before they are dropped
         """
         self._cache: Dict[str, Dict[str, Any]] = {}
         self._max_size = max_size
+        self._max_bytes = max_bytes
+        self._max_object_size = max_object_size
+        self._current_bytes = 0
         self._expiration_time = expiration_time
         self._eviction_policy = eviction_policy
+        self._on_evict = on_evict
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._expirations = 0
         
-        # For LRU tracking
-        self._access_order = OrderedDict()
+        # Policy keeps its own key ordering so eviction is O(1)
+        self._policy = CacheEvictionStrategy.get_strategy(eviction_policy)
+        
+        # Min-heap of (retain_until, key); superseded deadlines are skipped lazily
+        self._expiry_heap: List[Tuple[float, str]] = []
     
-    def set(self, key: str, value: Any) -> None:
+    def set(self, 
+            key: str, 
+            value: Any, 
+            ttl: Optional[float] = None, 
+            stale_ttl: float = 0) -> bool:
         """
         Set a value in the cache
         
         :param key: Cache key
         :param value: Value to cache
+        :param ttl: Seconds until the entry expires (defaults to expiration_time)
+        :param stale_ttl: Seconds an expired entry is kept for lookup() after ttl
+        :return: True if stored, False if rejected by the object size cutoff
         """
-        # Remove expired entries
+        size = self._value_size(value)
+        if self._max_object_size is not None and size > self._max_object_size:
+            # Never keep serving an older version of a rejected object
+            self.delete(key)
+            return False
+        
+        # Remove a bounded batch of expired entries
         self._clean_expired_entries()
         
-        # Evict if cache is full
-        if len(self._cache) >= self._max_size:
-            self._evict_entry()
+        # Evict until the new value fits both the entry and byte budgets
+        existing = self._cache.get(key)
+        while self._needs_eviction(size, existing):
+            victim = self._policy.select_victim()
+            if victim is None:
+                break
+            self._evict(victim)
+            if victim == key:
+                existing = None
         
-        # Store the entry with timestamp
-        self._cache[key] = {
-            'value': value,
-            'timestamp': time.time()
-        }
+        if existing is not None:
+            self._policy.record_access(key)
+            self._current_bytes -= existing['size']
+        else:
+            self._policy.record_insert(key)
         
-        # Update access order for LRU
-        if key in self._access_order:
-            del self._access_order[key]
-        self._access_order[key] = None
+        # Store the entry with timestamp and deadline
+        now = time.time()
+        expires_at = now + (self._expiration_time if ttl is None else ttl)
+        retain_until = expires_at + max(stale_ttl, 0)
+        self._cache[key] = self._make_entry(key, value, now, expires_at, retain_until, size)
+        self._current_bytes += size
+        heapq.heappush(self._expiry_heap, (retain_until, key))
+        
+        # Overwrites leave dead heap items behind; rebuild once they dominate
+        if len(self._expiry_heap) > 2 * len(self._cache) + 64:
+            self._rebuild_expiry_heap()
+        
+        return True
     
     def get(self, key: str) -> Optional[Any]:
         """
@@ -60,60 +109,203 @@ class CacheStorage:
         :param key: Cache key
         :return: Cached value or None if not found/expired
         """
+        found = self.lookup(key)
+        if found is None or not found[1]:
+            return None
+        return found[0]
+    
+    def lookup(self, key: str) -> Optional[Tuple[Any, bool]]:
+        """
+        Retrieve a value together with its freshness
+        
+        Expired entries still inside their stale_ttl are returned as
+        stale so callers can revalidate or serve them.
+        
+        :param key: Cache key
+        :return: (value, fresh) or None if not found/past retention
+        """
         entry = self._cache.get(key)
         
         if not entry:
+            self._misses += 1
             return None
-        print(self._cache)
         
-        # Check for expiration
-        if time.time() - entry['timestamp'] > self._expiration_time:
-            del self._cache[key]
+        # Expire lazily on read
+        now = time.time()
+        if now >= entry['retain_until']:
+            self.delete(key)
+            self._expirations += 1
+            self._misses += 1
             return None
         
-        # Update access order for LRU
-        if self._eviction_policy == 'least_recently_used':
-            del self._access_order[key]
-            self._access_order[key] = None
+        fresh = now < entry['expires_at']
+        if fresh:
+            self._hits += 1
+        else:
+            self._misses += 1
+        self._policy.record_access(key)
         
-        return entry['value']
+        return self._entry_value(entry), fresh
+    
+    def delete(self, key: str) -> None:
+        """
+        Remove an entry from the cache
+        
+        :param key: Cache key
+        """
+        entry = self._cache.pop(key, None)
+        if entry is not None:
+            self._current_bytes -= entry['size']
+            self._policy.record_remove(key)
+    
+    def expiry(self, key: str) -> Optional[Tuple[float, float]]:
+        """
+        Get the deadlines of an entry
+        
+        :param key: Cache key
+        :return: (expires_at, retain_until) timestamps, or None if not stored
+        """
+        entry = self._cache.get(key)
+        if entry is None:
+            return None
+        return entry['expires_at'], entry['retain_until']
+    
+    def entries(self) -> Iterator[Tuple[str, Any, float, float]]:
+        """
+        Iterate over entries still within their retention
+        
+        :return: Iterator of (key, value, expires_at, retain_until)
+        """
+        now = time.time()
+        for key, entry in list(self._cache.items()):
+            if entry['retain_until'] > now:
+                yield key, self._entry_value(entry), entry['expires_at'], entry['retain_until']
     
-    def _clean_expired_entries(self) -> None:
-        """Remove all expired entries from cache"""
+    def purge_expired(self) -> int:
+        """
+        Remove every entry whose deadline has passed
+        
+        :return: Number of entries removed
+        """
+        return self._clean_expired_entries(limit=None)
+    
+    def _evict(self, key: str) -> None:
+        """Drop an entry to make room, handing it to on_evict first"""
+        entry = self._cache.get(key)
+        if entry is not None and self._on_evict is not None:
+            self._on_evict(key, self._entry_value(entry), entry['expires_at'], entry['retain_until'])
+        if entry is not None:
+            self._evictions += 1
+        self.delete(key)
+    
+    def _clean_expired_entries(self, limit: Optional[int] = CacheConfig.EXPIRY_SWEEP_BATCH) -> int:
+        """
+        Remove expired entries in deadline order
+        
+        Only entries that actually expired are touched, so the cost is
+        independent of cache size.
+        
+        :param limit: Maximum heap items to process (None for no limit)
+        :return: Number of entries removed
+        """
+        heap = self._expiry_heap
         current_time = time.time()
-        expired_keys = [
-            key for key, entry in self._cache.items()
-            if current_time - entry['timestamp'] > self._expiration_time
-        ]
+        processed = 0
+        removed = 0
+        
+        while heap and heap[0][0] <= current_time:
+            if limit is not None and processed >= limit:
+                break
+            retain_until, key = heapq.heappop(heap)
+            processed += 1
+            
+            # Skip deadlines superseded by a later set() of the same key
+            entry = self._cache.get(key)
+            if entry is not None and entry['retain_until'] == retain_until:
+                self.delete(key)
+                removed += 1
         
-        for key in expired_keys:
-            del self._cache[key]
-            if key in self._access_order:
-                del self._access_order[key]
-    
-    def _evict_entry(self) -> None:
-        """Evict an entry based on the selected policy"""
-        if not self._cache:
-            return
-        
-        if self._eviction_policy == 'least_recently_used':
-            # Remove the least recently used item
-            lru_key = next(iter(self._access_order))
-            del self._cache[lru_key]
-            del self._access_order[lru_key]
-        
-        elif self._eviction_policy == 'first_in_first_out':
-            # Find and remove the oldest entry
-            oldest_key = min(
-                self._cache, 
-                key=lambda k: self._cache[k]['timestamp']
-            )
-            del self._cache[oldest_key]
+        self._expirations += removed
+        return removed
+    
+    def _make_entry(self, 
+                    key: str, 
+                    value: Any, 
+                    timestamp: float, 
+                    expires_at: float, 
+                    retain_until: float, 
+                    size: int) -> Dict[str, Any]:
+        """
+        Build the index entry for a stored value
+        
+        Storage backends override this (and _entry_value) to keep the
+        value somewhere other than the entry itself.
+        """
+        return {
+            'value': value,
+            'timestamp': timestamp,
+            'expires_at': expires_at,
+            'retain_until': retain_until,
+            'size': size
+        }
+    
+    def _entry_value(self, entry: Dict[str, Any]) -> Any:
+        """Get the stored value for an index entry"""
+        return entry['value']
+    
+    def _rebuild_expiry_heap(self) -> None:
+        """Drop superseded deadlines from the expiry heap"""
+        self._expiry_heap = [
+            (entry['retain_until'], key) for key, entry in self._cache.items()
+        ]
+        heapq.heapify(self._expiry_heap)
+    
+    def _needs_eviction(self, size: int, existing: Optional[Dict[str, Any]]) -> bool:
+        """Check whether storing a value of this size exceeds a budget"""
+        if existing is None and len(self._cache) >= self._max_size:
+            return True
+        if self._max_bytes is None:
+            return False
+        freed = existing['size'] if existing is not None else 0
+        return self._current_bytes - freed + size > self._max_bytes
+    
+    @staticmethod
+    def _value_size(value: Any) -> int:
+        """Size in bytes a value is accounted for"""
+        if isinstance(value, (bytes, bytearray)):
+            return len(value)
+        if isinstance(value, memoryview):
+            return value.nbytes
+        return sys.getsizeof(value)
     
     def clear(self) -> None:
         """Clear entire cache"""
         self._cache.clear()
-        self._access_order.clear()
+        self._policy.clear()
+        self._expiry_heap.clear()
+        self._current_bytes = 0
+    
+    def close(self) -> None:
+        """Release resources held by the storage; in-memory storage holds none"""
+    
+    @property
+    def stats(self) -> Dict[str, int]:
+        """Lookup, eviction and expiry counters for this storage"""
+        return {
+            'hits': self._hits,
+            'misses': self._misses,
+            'evictions': self._evictions,
+            'expirations': self._expirations
+        }
+    
+    @property
+    def size_bytes(self) -> int:
+        """Total size in bytes of stored values"""
+        return self._current_bytes
+    
+    def __contains__(self, key: str) -> bool:
+        """Check whether a key is stored (expired or not)"""
+        return key in self._cache
     
     def __len__(self) -> int:
         """Return number of items in cache"""
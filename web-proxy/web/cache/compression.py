@@ -0,0 +1,137 @@
+# web/cache/compression.py
+import struct
+import zlib
+from typing import Optional, Union
+from ..config.cache_settings import CacheConfig
+from ..proxy.request_parser import HTTPRequest
+from ..proxy.response_parser import HTTPResponse
+
+Buffer = Union[bytes, bytearray, memoryview]
+
+# Compressed entry: magic, identity head size, gzip head size; followed
+# by the original head, the gzip head and the gzip body, so the gzip
+# response is one contiguous slice of the entry
+_ENTRY = struct.Struct('<4sII')
+_ENTRY_MAGIC = b'\x00GZ\x01'
+
+# Headers of the original response not carried over to the gzip copy;
+# its bytes differ, so byte ranges and a strong ETag no longer apply
+_REPLACED_HEADERS = (b'content-length', b'content-encoding', b'vary', b'etag', b'accept-ranges')
+
+def is_compressible(response: HTTPResponse, body_size: int) -> bool:
+    """
+    Check whether a response is worth storing gzip-compressed
+    
+    Only uncompressed text-like bodies framed by Content-Length and at
+    least COMPRESSION_MIN_SIZE bytes long qualify.
+    
+    :param response: Response head
+    :param body_size: Size of the body in bytes
+    :return: True if the body should be compressed
+    """
+    if body_size < CacheConfig.COMPRESSION_MIN_SIZE:
+        return False
+    if 'content-length' not in response.headers or 'transfer-encoding' in response.headers:
+        return False
+    if response.get_header('content-encoding', 'identity').strip().lower() != 'identity':
+        return False
+    
+    content_type = response.get_header('content-type', '').partition(';')[0].strip().lower()
+    return (content_type.startswith(CacheConfig.COMPRESSIBLE_TYPE_PREFIXES)
+            or content_type.endswith(('+json', '+xml')))
+
+
+def compress_response(raw_response: Buffer, response: HTTPResponse) -> Optional[bytes]:
+    """
+    Build a compressed cache entry holding a gzip copy of a response
+    
+    :param raw_response: Complete raw response
+    :param response: Its parsed head
+    :return: Compressed entry, or None if the response is not compressible
+             or compression would not save anything
+    """
+    raw_response = memoryview(raw_response).cast('B')
+    head = bytes(raw_response[:response.header_size])
+    body = raw_response[response.header_size:]
+    if not is_compressible(response, len(body)):
+        return None
+    
+    compressor = zlib.compressobj(CacheConfig.COMPRESSION_LEVEL, zlib.DEFLATED, 31)
+    gzip_body = compressor.compress(body) + compressor.flush()
+    if len(gzip_body) >= len(body) * CacheConfig.COMPRESSION_MIN_RATIO:
+        return None
+    
+    lines = [
+        line for line in head[:-4].split(b'\r\n')
+        if line.partition(b':')[0].strip().lower() not in _REPLACED_HEADERS
+    ]
+    vary = [
+        name.strip() for name in response.get_header('vary', '').split(',')
+        if name.strip() and name.strip().lower() != 'accept-encoding'
+    ]
+    vary.append('Accept-Encoding')
+    etag = response.get_header('etag', '').strip()
+    if etag:
+        # A weak ETag still matches the origin's on revalidation
+        lines.append(b'ETag: ' + (etag if etag.startswith('W/') else 'W/' + etag).encode('latin-1'))
+    lines.append(b'Content-Encoding: gzip')
+    lines.append(b'Vary: ' + ', '.join(vary).encode('latin-1'))
+    lines.append(b'Content-Length: %d' % len(gzip_body))
+    gzip_head = b'\r\n'.join(lines) + b'\r\n\r\n'
+    
+    return b''.join((_ENTRY.pack(_ENTRY_MAGIC, len(head), len(gzip_head)), head, gzip_head, gzip_body))
+
+
+def is_compressed(entry: Buffer) -> bool:
+    """
+    Check whether a cache entry was built by compress_response()
+    
+    :param entry: Cached value
+    :return: True for compressed entries, False for plain raw responses
+    """
+    return bytes(entry[:len(_ENTRY_MAGIC)]) == _ENTRY_MAGIC
+
+
+def gzip_response(entry: Buffer) -> memoryview:
+    """
+    Get the gzip-encoded response inside a compressed entry without copying
+    
+    :param entry: Compressed cache entry
+    :return: View of the complete gzip response
+    """
+    _, head_size, _ = _ENTRY.unpack_from(entry)
+    return memoryview(entry)[_ENTRY.size + head_size:]
+
+
+def decompress_response(entry: Buffer) -> bytes:
+    """
+    Rebuild the original response from a compressed entry
+    
+    :param entry: Compressed cache entry
+    :return: Raw response exactly as it was received
+    """
+    _, head_size, gzip_head_size = _ENTRY.unpack_from(entry)
+    entry = memoryview(entry)
+    head = entry[_ENTRY.size:_ENTRY.size + head_size]
+    return bytes(head) + zlib.decompress(entry[_ENTRY.size + head_size + gzip_head_size:], 31)
+
+
+def accepts_gzip(request: HTTPRequest) -> bool:
+    """
+    Check whether a client accepts gzip-encoded responses
+    
+    :param request: Client request
+    :return: True if Accept-Encoding lists gzip (or *) without q=0
+    """
+    for coding in request.headers.get('accept-encoding', '').split(','):
+        name, _, params = coding.partition(';')
+        if name.strip().lower() not in ('gzip', 'x-gzip', '*'):
+            continue
+        quality = params.strip().lower()
+        if quality.startswith('q='):
+            try:
+                return float(quality[2:]) > 0
+            except ValueError:
+                return False
+        return True
+    return False
\ No newline at end of file
@@ -0,0 +1,622 @@
+# web/cache/disk_storage.py
+import fcntl
+import heapq
+import mmap
+import os
+import struct
+import time
+import zlib
+from typing import Any, Dict, Iterator, Optional, Tuple
+from .cache_storage import CacheStorage
+from ..config.cache_settings import CacheConfig
+
+# Segment record: magic, flags, key length, value length, timestamp,
+# expires_at, retain_until, crc32 of key + value; followed by the key
+# and the value
+_RECORD = struct.Struct('<HBHIdddI')
+_RECORD_MAGIC = 0xCA5E
+
+# Hint record: flags, key length, value length, value offset, timestamp,
+# expires_at, retain_until; followed by the key
+_HINT = struct.Struct('<BHIIddd')
+
+_FLAG_PUT = 0
+_FLAG_TOMBSTONE = 1
+
+_SEGMENT_SUFFIX = '.seg'
+_HINT_SUFFIX = '.hint'
+
+class _Segment:
+    """An append-only segment file and its memory map"""
+    
+    __slots__ = ('id', 'path', 'map', 'size', 'dead', 'hints', 'lock_fd', 'tailing')
+    
+    def __init__(self, segment_id: int, path: str, segment_map: Optional[mmap.mmap], size: int):
+        self.id = segment_id
+        self.path = path
+        self.map = segment_map
+        self.size = size
+        self.dead = 0
+        # Hint records accumulated while the segment is active
+        self.hints = bytearray()
+        # Shared mode: descriptor holding the writer's lock on the file
+        self.lock_fd: Optional[int] = None
+        # Shared mode: another process is still appending to the segment
+        self.tailing = False
+    
+    def release_lock(self) -> None:
+        """Let other processes know the segment is no longer written"""
+        if self.lock_fd is not None:
+            os.close(self.lock_fd)
+            self.lock_fd = None
+    
+    def close(self) -> None:
+        """Unmap the segment; views still handed out keep it alive"""
+        self.release_lock()
+        if self.map is not None:
+            try:
+                self.map.close()
+            except BufferError:
+                # A cached response is still being sent from this map;
+                # it is released with the last memoryview
+                pass
+            self.map = None
+
+
+class DiskCacheStorage(CacheStorage):
+    """
+    Disk-backed cache storage built from append-only segment files
+    
+    Values are appended to the active segment and located through the
+    in-memory index; hits are returned as read-only memoryviews over
+    the segment's mmap, so serving them copies nothing into Python.
+    Sealed segments get a hint file listing their keys and offsets,
+    which lets the index be rebuilt on startup without reading values.
+    
+    In shared mode several processes use the same directory. Each one
+    appends to segments of its own, holding an flock on the segment
+    while it writes it, and picks up records written by the others by
+    tailing their segments at most every sync_interval seconds. The
+    newest record of a key wins, whichever process wrote it.
+    """
+    
+    def __init__(self,
+                 directory: str = CacheConfig.DISK_CACHE_DIR,
+                 segment_size: int = CacheConfig.DISK_SEGMENT_SIZE,
+                 compaction_ratio: float = CacheConfig.DISK_COMPACTION_RATIO,
+                 shared: bool = False,
+                 sync_interval: float = CacheConfig.DISK_SYNC_INTERVAL,
+                 **kwargs: Any):
+        """
+        Initialize disk cache storage and load any existing segments
+        
+        :param directory: Directory holding segment and hint files
+        :param segment_size: Size at which the active segment is sealed
+        :param compaction_ratio: Dead fraction that triggers rewriting a sealed segment
+        :param shared: Share the directory with storages in other processes
+        :param sync_interval: Shared mode: seconds between scans for other processes' writes
+        :param kwargs: CacheStorage options (max_size, max_bytes, ...)
+        """
+        super().__init__(**kwargs)
+        self._directory = os.path.abspath(directory)
+        self._segment_size = segment_size
+        self._compaction_ratio = compaction_ratio
+        self._shared = shared
+        self._sync_interval = sync_interval
+        self._last_sync = 0.0
+        self._segments: Dict[int, _Segment] = {}
+        self._active: Optional[_Segment] = None
+        self._next_segment_id = 0
+        self._compaction_candidates = set()
+        
+        os.makedirs(self._directory, exist_ok=True)
+        self._load()
+    
+    def set(self, 
+            key: str, 
+            value: Any, 
+            ttl: Optional[float] = None, 
+            stale_ttl: float = 0) -> bool:
+        """
+        Append a value to the active segment
+        
+        :param key: Cache key
+        :param value: Bytes-like value to cache
+        :param ttl: Seconds until the entry expires (defaults to expiration_time)
+        :param stale_ttl: Seconds an expired entry is kept for lookup() after ttl
+        :return: True if stored, False if rejected by the object size cutoff
+        """
+        if not isinstance(value, (bytes, bytearray, memoryview)):
+            raise TypeError("DiskCacheStorage only stores bytes-like values")
+        stored = super().set(key, value, ttl=ttl, stale_ttl=stale_ttl)
+        self._compact_candidates()
+        return stored
+    
+    def lookup(self, key: str) -> Optional[Tuple[Any, bool]]:
+        """
+        Retrieve a value together with its freshness
+        
+        In shared mode this first picks up other processes' writes once
+        sync_interval has passed since the last scan.
+        
+        :param key: Cache key
+        :return: (value, fresh) or None if not found/past retention
+        """
+        if self._shared and time.monotonic() - self._last_sync >= self._sync_interval:
+            self.sync()
+        return super().lookup(key)
+    
+    def delete(self, key: str) -> None:
+        """
+        Remove an entry and record a tombstone so it stays removed on reopen
+        
+        :param key: Cache key
+        """
+        entry = self._cache.get(key)
+        super().delete(key)
+        if entry is not None:
+            self._mark_dead(entry)
+            now = time.time()
+            # Expired records are dropped on load anyway
+            if entry['retain_until'] > now:
+                tombstone = self._append(_FLAG_TOMBSTONE, key, b'', now, 0.0, 0.0)
+                self._active.dead += tombstone[2]
+    
+    def clear(self) -> None:
+        """
+        Clear entire cache and remove every segment file
+        
+        In shared mode other processes may still be writing segments, so
+        every key is deleted with a tombstone instead.
+        """
+        if self._shared:
+            for key in list(self._cache):
+                self.delete(key)
+            return
+        super().clear()
+        for segment in list(self._segments.values()):
+            self._remove_segment(segment)
+        self._active = None
+        self._compaction_candidates.clear()
+    
+    def compact(self) -> int:
+        """
+        Rewrite every sealed segment whose dead fraction reached the ratio
+        
+        :return: Number of segments compacted
+        """
+        self._compaction_candidates.update(
+            segment.id for segment in self._segments.values()
+            if segment is not self._active and self._is_compactable(segment)
+        )
+        return self._compact_candidates()
+    
+    def close(self) -> None:
+        """Seal the active segment and unmap every segment"""
+        if self._active is not None:
+            self._seal(self._active)
+            self._active = None
+        for segment in self._segments.values():
+            segment.close()
+    
+    def sync(self) -> None:
+        """
+        Index segments and records added to the directory by other processes
+        
+        Segments removed by another process's compaction are forgotten;
+        their live records were copied forward first.
+        """
+        self._last_sync = time.monotonic()
+        now = time.time()
+        segment_ids = sorted(
+            int(name[:-len(_SEGMENT_SUFFIX)])
+            for name in os.listdir(self._directory)
+            if name.endswith(_SEGMENT_SUFFIX) and name[:-len(_SEGMENT_SUFFIX)].isdigit()
+        )
+        
+        for segment_id in segment_ids:
+            segment = self._segments.get(segment_id)
+            if segment is None:
+                segment = self._open_existing(segment_id)
+                if segment is not None:
+                    self._index_segment(segment, now)
+            elif segment.tailing:
+                self._index_segment(segment, now)
+        
+        listed = set(segment_ids)
+        for segment in list(self._segments.values()):
+            if segment.id not in listed and segment is not self._active:
+                self._forget_segment(segment)
+        
+        if self._shared:
+            self._enforce_budgets()
+    
+    def _make_entry(self,
+                    key: str,
+                    value: Any,
+                    timestamp: float,
+                    expires_at: float,
+                    retain_until: float,
+                    size: int) -> Dict[str, Any]:
+        """Append the value and index it by segment and offset"""
+        existing = self._cache.get(key)
+        if existing is not None:
+            self._mark_dead(existing)
+        
+        segment_id, offset, record_size = self._append(_FLAG_PUT, key, value, timestamp, expires_at, retain_until)
+        return {
+            'segment': segment_id,
+            'offset': offset,
+            'record_size': record_size,
+            'timestamp': timestamp,
+            'expires_at': expires_at,
+            'retain_until': retain_until,
+            'size': size
+        }
+    
+    def _entry_value(self, entry: Dict[str, Any]) -> memoryview:
+        """Read-only view of the value inside the segment's map"""
+        segment_map = self._segments[entry['segment']].map
+        return memoryview(segment_map)[entry['offset']:entry['offset'] + entry['size']]
+    
+    def _append(self,
+                flags: int,
+                key: str,
+                value: Any,
+                timestamp: float,
+                expires_at: float,
+                retain_until: float) -> Tuple[int, int, int]:
+        """
+        Write one record to the active segment
+        
+        :return: (segment id, value offset, record size)
+        """
+        key_bytes = key.encode('utf-8')
+        value_size = len(memoryview(value).cast('B'))
+        record_size = _RECORD.size + len(key_bytes) + value_size
+        
+        segment = self._active
+        if segment is None or segment.size + record_size > len(segment.map):
+            if segment is not None:
+                self._seal(segment)
+            segment = self._open_segment(max(self._segment_size, record_size))
+        
+        crc = zlib.crc32(value, zlib.crc32(key_bytes))
+        start = segment.size
+        value_offset = start + _RECORD.size + len(key_bytes)
+        
+        # Writes go straight into the shared mapping; no syscall per record
+        segment_map = segment.map
+        _RECORD.pack_into(segment_map, start, _RECORD_MAGIC, flags, len(key_bytes),
+                          value_size, timestamp, expires_at, retain_until, crc)
+        segment_map[start + _RECORD.size:value_offset] = key_bytes
+        segment_map[value_offset:value_offset + value_size] = value
+        segment.size = start + record_size
+        
+        segment.hints += _HINT.pack(flags, len(key_bytes), value_size, value_offset,
+                                    timestamp, expires_at, retain_until)
+        segment.hints += key_bytes
+        
+        return segment.id, value_offset, record_size
+    
+    def _open_segment(self, capacity: int) -> _Segment:
+        """Create a new active segment preallocated to capacity"""
+        while True:
+            segment_id = self._next_segment_id
+            self._next_segment_id += 1
+            path = self._segment_path(segment_id, _SEGMENT_SUFFIX)
+            try:
+                # Another process sharing the directory may have taken the id
+                fd = os.open(path, os.O_RDWR | os.O_CREAT | os.O_EXCL, 0o644)
+            except FileExistsError:
+                continue
+            break
+        
+        try:
+            if self._shared:
+                # Locked before the file grows, so nobody takes it for a crashed writer's
+                fcntl.flock(fd, fcntl.LOCK_EX)
+            # Sparse preallocation lets a single mapping cover the whole segment
+            os.ftruncate(fd, capacity)
+            segment_map = mmap.mmap(fd, capacity)
+        except BaseException:
+            os.close(fd)
+            raise
+        
+        segment = _Segment(segment_id, path, segment_map, 0)
+        if self._shared:
+            segment.lock_fd = fd
+        else:
+            os.close(fd)
+        self._segments[segment_id] = segment
+        self._active = segment
+        return segment
+    
+    def _seal(self, segment: _Segment) -> None:
+        """Trim a full segment to its written size and write its hint file"""
+        if segment.map is not None:
+            segment.map.flush()
+        if not self._shared:
+            # Other processes may map the whole file; reading past a
+            # truncated end would fault, so shared segments stay sparse
+            os.truncate(segment.path, segment.size)
+        
+        hint_path = self._segment_path(segment.id, _HINT_SUFFIX)
+        tmp_path = f"{hint_path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as hint_file:
+            hint_file.write(segment.hints)
+        os.replace(tmp_path, hint_path)
+        segment.hints = bytearray()
+        segment.release_lock()
+        segment.tailing = False
+        
+        if self._active is segment:
+            self._active = None
+        if self._is_compactable(segment):
+            self._compaction_candidates.add(segment.id)
+    
+    def _mark_dead(self, entry: Dict[str, Any]) -> None:
+        """Account a superseded or removed record against its segment"""
+        segment = self._segments.get(entry['segment'])
+        if segment is None:
+            return
+        segment.dead += entry['record_size']
+        if segment is not self._active and not segment.tailing and self._is_compactable(segment):
+            self._compaction_candidates.add(segment.id)
+    
+    def _is_compactable(self, segment: _Segment) -> bool:
+        """Check whether enough of a segment is dead to rewrite it"""
+        return segment.size > 0 and segment.dead >= segment.size * self._compaction_ratio
+    
+    def _compact_candidates(self) -> int:
+        """Compact segments queued by _mark_dead and _seal"""
+        compacted = 0
+        while self._compaction_candidates:
+            segment = self._segments.get(self._compaction_candidates.pop())
+            if segment is None or segment is self._active or segment.tailing:
+                continue
+            if not self._shared:
+                self._compact_segment(segment)
+                compacted += 1
+                continue
+            
+            # Only one process may rewrite a shared segment
+            fd = self._try_lock(segment.path)
+            if fd is None:
+                continue
+            try:
+                if os.fstat(fd).st_nlink:
+                    self._compact_segment(segment)
+                    compacted += 1
+            finally:
+                os.close(fd)
+        return compacted
+    
+    def _compact_segment(self, segment: _Segment) -> None:
+        """
+        Copy live records of a sealed segment forward and delete it
+        
+        Tombstones are carried forward only while an older segment could
+        still hold a put they cancel.
+        """
+        has_older = any(segment_id < segment.id for segment_id in self._segments)
+        
+        for flags, key, value_offset, value_size, timestamp, expires_at, retain_until in self._read_records(segment):
+            entry = self._cache.get(key)
+            if flags == _FLAG_PUT:
+                if entry is None or entry['segment'] != segment.id or entry['offset'] != value_offset:
+                    continue
+                value = memoryview(segment.map)[value_offset:value_offset + value_size]
+                entry['segment'], entry['offset'], _ = self._append(
+                    _FLAG_PUT, key, value, timestamp, expires_at, retain_until
+                )
+                value.release()
+            elif has_older and entry is None:
+                tombstone = self._append(_FLAG_TOMBSTONE, key, b'', timestamp, 0.0, 0.0)
+                self._active.dead += tombstone[2]
+        
+        self._remove_segment(segment)
+    
+    def _remove_segment(self, segment: _Segment) -> None:
+        """Unmap a segment and delete its files"""
+        segment.close()
+        self._segments.pop(segment.id, None)
+        for suffix in (_SEGMENT_SUFFIX, _HINT_SUFFIX):
+            try:
+                os.remove(self._segment_path(segment.id, suffix))
+            except FileNotFoundError:
+                pass
+    
+    def _read_records(self, 
+                      segment: _Segment, 
+                      start: Optional[int] = None) -> Iterator[Tuple[int, str, int, int, float, float]]:
+        """
+        Iterate over a segment's records in write order
+        
+        Uses the hint file when present; otherwise scans the segment,
+        verifying checksums and stopping at the first torn record.
+        
+        :param start: Scan from this offset even if a hint file exists
+        :return: Iterator of (flags, key, value offset, value size, timestamp, expires_at, retain_until)
+        """
+        hint_path = self._segment_path(segment.id, _HINT_SUFFIX)
+        if start is None and os.path.exists(hint_path):
+            with open(hint_path, 'rb') as hint_file:
+                hints = hint_file.read()
+            pos = 0
+            while pos + _HINT.size <= len(hints):
+                flags, key_size, value_size, value_offset, timestamp, expires_at, retain_until = _HINT.unpack_from(hints, pos)
+                pos += _HINT.size
+                key = hints[pos:pos + key_size].decode('utf-8')
+                pos += key_size
+                segment.size = max(segment.size, value_offset + value_size)
+                yield flags, key, value_offset, value_size, timestamp, expires_at, retain_until
+            return
+        
+        segment_map = segment.map
+        limit = len(segment_map) if segment_map is not None else 0
+        pos = start or 0
+        while pos + _RECORD.size <= limit:
+            magic, flags, key_size, value_size, timestamp, expires_at, retain_until, crc = _RECORD.unpack_from(segment_map, pos)
+            key_start = pos + _RECORD.size
+            value_offset = key_start + key_size
+            end = value_offset + value_size
+            if magic != _RECORD_MAGIC or end > limit:
+                break
+            key_bytes = segment_map[key_start:value_offset]
+            if zlib.crc32(segment_map[value_offset:end], zlib.crc32(key_bytes)) != crc:
+                break
+            segment.hints += _HINT.pack(flags, key_size, value_size, value_offset,
+                                        timestamp, expires_at, retain_until)
+            segment.hints += key_bytes
+            yield flags, key_bytes.decode('utf-8'), value_offset, value_size, timestamp, expires_at, retain_until
+            pos = end
+        segment.size = pos
+    
+    def _load(self) -> None:
+        """Rebuild the index from segment files in write order"""
+        self.sync()
+        self._rebuild_expiry_heap()
+        self._compaction_candidates.update(
+            segment.id for segment in self._segments.values()
+            if not segment.tailing and self._is_compactable(segment)
+        )
+        # Budgets may have shrunk since the segments were written
+        self._enforce_budgets()
+        self._compact_candidates()
+    
+    def _open_existing(self, segment_id: int) -> Optional[_Segment]:
+        """
+        Map a segment found in the directory
+        
+        :return: The segment, or None if it vanished or is still being created
+        """
+        path = self._segment_path(segment_id, _SEGMENT_SUFFIX)
+        try:
+            file_size = os.path.getsize(path)
+        except FileNotFoundError:
+            return None
+        if self._shared and not file_size:
+            return None
+        
+        segment_map = None
+        if file_size:
+            with open(path, 'rb') as segment_file:
+                segment_map = mmap.mmap(segment_file.fileno(), 0, access=mmap.ACCESS_READ)
+        segment = _Segment(segment_id, path, segment_map, 0)
+        self._segments[segment_id] = segment
+        self._next_segment_id = max(self._next_segment_id, segment_id + 1)
+        return segment
+    
+    def _index_segment(self, segment: _Segment, now: float) -> None:
+        """Index a segment's records, or those appended since it was last scanned"""
+        has_hint = os.path.exists(self._segment_path(segment.id, _HINT_SUFFIX))
+        # The writer seals the segment before dropping its lock
+        finished = has_hint or not (self._shared and self._is_being_written(segment))
+        
+        start = segment.size if segment.tailing or not has_hint else None
+        for record in self._read_records(segment, start):
+            self._apply_record(segment, *record, now)
+        
+        if not finished:
+            segment.tailing = True
+        elif not has_hint:
+            # Left active by a crash (or preallocated): trim and seal it now
+            self._seal(segment)
+        else:
+            segment.tailing = False
+            segment.hints = bytearray()
+    
+    def _apply_record(self,
+                      segment: _Segment,
+                      flags: int,
+                      key: str,
+                      value_offset: int,
+                      value_size: int,
+                      timestamp: float,
+                      expires_at: float,
+                      retain_until: float,
+                      now: float) -> None:
+        """Update the index with one record read back from a segment"""
+        record_size = _RECORD.size + len(key.encode('utf-8')) + value_size
+        existing = self._cache.get(key)
+        
+        # Records of different processes interleave; in shared mode the
+        # newest one wins instead of the last one read
+        if self._shared and existing is not None and timestamp < existing['timestamp']:
+            segment.dead += record_size
+            return
+        
+        if existing is not None:
+            super().delete(key)
+            self._mark_dead(existing)
+        
+        if flags != _FLAG_PUT or retain_until <= now:
+            segment.dead += record_size
+            return
+        
+        self._cache[key] = {
+            'segment': segment.id,
+            'offset': value_offset,
+            'record_size': record_size,
+            'timestamp': timestamp,
+            'expires_at': expires_at,
+            'retain_until': retain_until,
+            'size': value_size
+        }
+        self._current_bytes += value_size
+        self._policy.record_insert(key)
+        heapq.heappush(self._expiry_heap, (retain_until, key))
+    
+    def _forget_segment(self, segment: _Segment) -> None:
+        """Drop a segment another process compacted away, with any entries still in it"""
+        for key in [key for key, entry in self._cache.items() if entry['segment'] == segment.id]:
+            super().delete(key)
+        self._compaction_candidates.discard(segment.id)
+        self._segments.pop(segment.id, None)
+        segment.close()
+    
+    def _enforce_budgets(self) -> None:
+        """Evict until the entry and byte budgets are met again"""
+        while len(self._cache) > self._max_size or (
+                self._max_bytes is not None and self._current_bytes > self._max_bytes):
+            victim = self._policy.select_victim()
+            if victim is None:
+                break
+            self._evict(victim)
+    
+    def _is_being_written(self, segment: _Segment) -> bool:
+        """Check whether another process holds the writer's lock on a segment"""
+        fd = self._try_lock(segment.path)
+        if fd is None:
+            return os.path.exists(segment.path)
+        os.close(fd)
+        return False
+    
+    @staticmethod
+    def _try_lock(path: str) -> Optional[int]:
+        """
+        Take the exclusive lock on a segment file without waiting
+        
+        :return: Descriptor holding the lock, or None if it is held elsewhere or the file is gone
+        """
+        try:
+            fd = os.open(path, os.O_RDONLY)
+        except FileNotFoundError:
+            return None
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            os.close(fd)
+            return None
+        return fd
+    
+    def _segment_path(self, segment_id: int, suffix: str) -> str:
+        """Path of a segment's data or hint file"""
+        return os.path.join(self._directory, f"{segment_id:08d}{suffix}")
+    
+    def __del__(self):
+        try:
+            self.close()
+        except Exception:
+            pass
\ No newline at end of file
@@ -0,0 +1,474 @@
+# web/cache/http_cache_policy.py
+import time
+from datetime import timezone
+from email.utils import parsedate_to_datetime
+from typing import Dict, Optional, Tuple, Union
+from .cache_manager import CacheManager
+from .compression import accepts_gzip, compress_response, decompress_response, gzip_response, is_compressed
+from ..config.cache_settings import CacheConfig
+from ..proxy.request_parser import HTTPRequest
+from ..proxy.response_parser import HTTPResponse, ResponseParser
+
+Buffer = Union[bytes, bytearray, memoryview]
+
+_DEFAULT_PORTS = {'http': 80, 'https': 443}
+
+# Statuses a shared cache may store without explicit freshness
+_HEURISTIC_STATUSES = frozenset({200, 203, 204, 300, 301, 308, 404, 405, 410, 414, 501})
+
+# Headers a 304 must not overwrite in the stored response
+_UNREFRESHED_HEADERS = frozenset({
+    'content-length', 'transfer-encoding', 'content-encoding',
+    'connection', 'keep-alive'
+})
+
+def parse_cache_control(value: Optional[str]) -> Dict[str, Optional[str]]:
+    """
+    Split a Cache-Control header into directives
+    
+    :param value: Header value
+    :return: Directive names (lower-case) mapped to their argument, if any
+    """
+    directives: Dict[str, Optional[str]] = {}
+    if value:
+        for part in value.split(','):
+            name, sep, argument = part.partition('=')
+            name = name.strip().lower()
+            if name:
+                directives[name] = argument.strip().strip('"') if sep else None
+    return directives
+
+
+def _parse_date(value: Optional[str]) -> Optional[float]:
+    """Parse an HTTP date into a timestamp"""
+    if not value:
+        return None
+    try:
+        parsed = parsedate_to_datetime(value)
+    except (TypeError, ValueError, IndexError, OverflowError):
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+
+def _parse_seconds(value: Optional[str]) -> Optional[int]:
+    """Parse a delta-seconds value"""
+    if value is None or not value.isdigit():
+        return None
+    return int(value)
+
+
+def freshness_lifetime(response: HTTPResponse, now: float) -> float:
+    """
+    Seconds a response stays fresh after it was generated
+    
+    Uses s-maxage, max-age, then Expires; falls back to a fraction of
+    the Last-Modified age, and to DEFAULT_EXPIRATION_TIME without any
+    freshness information at all.
+    
+    :param response: Response head
+    :param now: Current time, used when the response has no Date
+    :return: Freshness lifetime in seconds
+    """
+    cache_control = parse_cache_control(response.get_header('cache-control'))
+    for directive in ('s-maxage', 'max-age'):
+        seconds = _parse_seconds(cache_control.get(directive))
+        if seconds is not None:
+            return seconds
+    
+    date = _parse_date(response.get_header('date')) or now
+    if 'expires' in response.headers:
+        # An invalid Expires means already expired
+        expires = _parse_date(response.get_header('expires'))
+        return max(expires - date, 0) if expires is not None else 0
+    
+    last_modified = _parse_date(response.get_header('last-modified'))
+    if last_modified is not None:
+        heuristic = (date - last_modified) * CacheConfig.HEURISTIC_FRESHNESS_FRACTION
+        return min(max(heuristic, 0), CacheConfig.DEFAULT_EXPIRATION_TIME)
+    
+    return CacheConfig.DEFAULT_EXPIRATION_TIME
+
+
+def current_age(response: HTTPResponse, now: float) -> float:
+    """
+    Age of a response when it was received
+    
+    :param response: Response head
+    :param now: Time the response was received
+    :return: Age in seconds
+    """
+    date = _parse_date(response.get_header('date'))
+    apparent_age = max(now - date, 0) if date is not None else 0
+    return max(apparent_age, _parse_seconds(response.get_header('age')) or 0)
+
+
+def normalize_url(request: HTTPRequest) -> str:
+    """
+    Canonical absolute URL of a request
+    
+    Lower-cases scheme and host, drops the default port and any
+    fragment, and turns origin-form targets into absolute URLs.
+    
+    :param request: Parsed request
+    :return: Normalized URL
+    """
+    target = request.url
+    if '://' in target:
+        target = target.partition('://')[2]
+        start = min(
+            (index for index in (target.find('/'), target.find('?')) if index >= 0),
+            default=len(target)
+        )
+        target = target[start:]
+    target = target.partition('#')[0]
+    if not target.startswith('/'):
+        target = '/' + target
+    
+    host = f"[{request.host}]" if ':' in request.host else request.host
+    port = '' if request.port == _DEFAULT_PORTS.get(request.scheme) else f":{request.port}"
+    return f"{request.scheme}://{host}{port}{target}"
+
+
+def update_stored_headers(stored: Buffer, not_modified: HTTPResponse) -> bytes:
+    """
+    Apply the headers of a 304 response to a stored response
+    
+    :param stored: Stored raw response
+    :param not_modified: Head of the 304 response
+    :return: Stored response with refreshed headers
+    """
+    stored = bytes(stored)
+    head_end = stored.find(b'\r\n\r\n')
+    lines = stored[:head_end].split(b'\r\n')
+    updates = {
+        name: value for name, value in not_modified.headers.items()
+        if name not in _UNREFRESHED_HEADERS
+    }
+    
+    refreshed = [lines[0]]
+    for line in lines[1:]:
+        name = line.partition(b':')[0].strip()
+        key = name.lower().decode('latin-1')
+        if key not in updates:
+            refreshed.append(line)
+        elif updates[key] is not None:
+            refreshed.append(name + b': ' + updates[key].encode('latin-1'))
+            updates[key] = None
+    for key, value in updates.items():
+        if value is not None:
+            refreshed.append(f"{key.title()}: {value}".encode('latin-1'))
+    
+    return b'\r\n'.join(refreshed) + stored[head_end:]
+
+
+class HTTPCachePolicy:
+    """
+    HTTP caching rules on top of a CacheManager
+    
+    Decides what may be stored and for how long, keys entries by method,
+    normalized URL and the request headers named in Vary, and keeps
+    expired responses that carry validators so they can be revalidated
+    with a conditional request instead of being fetched again.
+    
+    With COMPRESS_RESPONSES, text-like responses are stored gzipped and
+    lookups hand each client the encoding it accepts.
+    """
+    
+    def __init__(self, cache_manager: CacheManager):
+        """
+        Initialize cache policy
+        
+        :param cache_manager: Cache holding raw responses
+        """
+        self._cache_manager = cache_manager
+        # Vary header names last seen for each primary key
+        self._vary: Dict[str, Tuple[str, ...]] = {}
+        # Fresh hits per key, for refresh-ahead
+        self._hits: Dict[str, int] = {}
+        # Responses stored compressed, and their size before and after
+        self._compressed = 0
+        self._raw_bytes = 0
+        self._compressed_bytes = 0
+        
+        # Variants already in a restored or persistent cache stay reachable
+        for key, _, _, _ in cache_manager.entries():
+            primary, sep, _ = key.partition('\n')
+            if sep and len(self._vary) < CacheConfig.DEFAULT_CACHE_SIZE:
+                self._vary[primary] = tuple(line.partition(':')[0] for line in key.split('\n')[1:])
+    
+    def cache_key(self, request: HTTPRequest) -> Optional[str]:
+        """
+        Build the cache key for a request
+        
+        :param request: Parsed request
+        :return: Cache key, or None if the request bypasses the cache
+        """
+        if request.method != 'GET':
+            return None
+        if 'no-store' in parse_cache_control(request.headers.get('cache-control')):
+            return None
+        
+        primary = f"GET {normalize_url(request)}"
+        vary = self._vary.get(primary)
+        return self._variant_key(primary, vary, request) if vary else primary
+    
+    def lookup(self, request: HTTPRequest, key: str) -> Optional[Tuple[Buffer, bool]]:
+        """
+        Look up a stored response for a request
+        
+        :param request: Parsed request
+        :param key: Cache key from cache_key()
+        :return: (raw response, fresh) or None if nothing is stored; a
+                 compressed response is gzip-encoded only if the client
+                 accepts gzip
+        """
+        found = self._cache_manager.lookup(key)
+        if found is None:
+            return None
+        
+        stored, fresh = self._decode(request, found[0]), found[1]
+        if fresh:
+            # The client may insist on revalidation
+            cache_control = parse_cache_control(request.headers.get('cache-control'))
+            if 'no-cache' in cache_control or cache_control.get('max-age') == '0':
+                return stored, False
+        return stored, fresh
+    
+    def store(self, request: HTTPRequest, raw_response: bytes) -> bool:
+        """
+        Store a response if HTTP caching rules allow it
+        
+        :param request: Request the response answers
+        :param raw_response: Complete raw response
+        :return: True if the response was stored
+        """
+        response = ResponseParser.parse_head(raw_response, request.method)
+        if response is None or not self._is_storable(request, response):
+            return False
+        
+        now = time.time()
+        ttl = freshness_lifetime(response, now) - current_age(response, now)
+        cache_control = parse_cache_control(response.get_header('cache-control'))
+        if 'no-cache' in cache_control:
+            ttl = 0
+        
+        # Responses with validators outlive their freshness for revalidation,
+        # and any response may be served stale within its grace window
+        has_validators = 'etag' in response.headers or 'last-modified' in response.headers
+        stale_ttl = max(
+            CacheConfig.REVALIDATION_WINDOW if has_validators else 0,
+            self._stale_grace(cache_control)
+        )
+        if ttl <= 0 and not stale_ttl:
+            return False
+        
+        key = self._key_for_response(request, response)
+        self._hits.pop(key, None)
+        
+        value = raw_response
+        if CacheConfig.COMPRESS_RESPONSES:
+            compressed = compress_response(raw_response, response)
+            if compressed is not None:
+                value = compressed
+                self._compressed += 1
+                self._raw_bytes += len(raw_response)
+                self._compressed_bytes += len(compressed)
+        
+        self._cache_manager.cache(key, value, ttl=max(ttl, 0), stale_ttl=stale_ttl)
+        return True
+    
+    def can_serve_stale(self, request: HTTPRequest, key: str, stored: Buffer) -> bool:
+        """
+        Check whether an expired response may be served while it is refreshed
+        
+        :param request: Client request
+        :param key: Cache key of the stored response
+        :param stored: Stored raw response
+        :return: True if the response is within its stale-while-revalidate window
+        """
+        request_cache_control = parse_cache_control(request.headers.get('cache-control'))
+        if 'no-cache' in request_cache_control or request_cache_control.get('max-age') == '0':
+            return False
+        
+        expiry = self._cache_manager.expiry(key)
+        response = ResponseParser.parse_head(stored, request.method)
+        if expiry is None or response is None:
+            return False
+        
+        cache_control = parse_cache_control(response.get_header('cache-control'))
+        if {'must-revalidate', 'proxy-revalidate', 'no-cache', 's-maxage'} & cache_control.keys():
+            return False
+        return time.time() - expiry[0] <= self._stale_grace(cache_control)
+    
+    def should_refresh_ahead(self, key: str) -> bool:
+        """
+        Count a fresh hit and check whether the entry is hot and close
+        enough to expiry to be refreshed in the background
+        
+        :param key: Cache key that was hit
+        :return: True if a background refresh should be started
+        """
+        if not CacheConfig.REFRESH_AHEAD_SECONDS:
+            return False
+        
+        hits = self._hits.get(key, 0) + 1
+        expiry = self._cache_manager.expiry(key)
+        if (hits < CacheConfig.REFRESH_AHEAD_MIN_HITS or expiry is None
+                or expiry[0] - time.time() > CacheConfig.REFRESH_AHEAD_SECONDS):
+            if len(self._hits) >= CacheConfig.DEFAULT_CACHE_SIZE and key not in self._hits:
+                self._hits.clear()
+            self._hits[key] = hits
+            return False
+        
+        self._hits.pop(key, None)
+        return True
+    
+    def conditional_request(self, request: HTTPRequest, stored: Buffer) -> Optional[bytes]:
+        """
+        Build a request revalidating a stored response
+        
+        :param request: Client request
+        :param stored: Stored raw response
+        :return: Raw request with If-None-Match / If-Modified-Since, or None
+                 if the stored response has no validators or the client
+                 sent conditional headers of its own
+        """
+        headers = request.headers
+        if 'if-none-match' in headers or 'if-modified-since' in headers:
+            return None
+        
+        response = ResponseParser.parse_head(stored, request.method)
+        if response is None:
+            return None
+        
+        conditions = b''
+        etag = response.get_header('etag')
+        if etag:
+            conditions += b'\r\nIf-None-Match: ' + etag.encode('latin-1')
+        last_modified = response.get_header('last-modified')
+        if last_modified:
+            conditions += b'\r\nIf-Modified-Since: ' + last_modified.encode('latin-1')
+        if not conditions:
+            return None
+        
+        head_end = request.raw.find(b'\r\n\r\n')
+        return request.raw[:head_end] + conditions + request.raw[head_end:]
+    
+    def refresh(self,
+                request: HTTPRequest,
+                key: str,
+                stored: Buffer,
+                not_modified: HTTPResponse) -> bytes:
+        """
+        Refresh a stored response after the origin answered 304
+        
+        :param request: Client request
+        :param key: Cache key of the stored response
+        :param stored: Stored raw response, as returned by lookup()
+        :param not_modified: Head of the 304 response
+        :return: Refreshed raw response to serve
+        """
+        current = self._cache_manager.lookup(key)
+        if current is None:
+            # Evicted meanwhile; what the client was given may be a gzip
+            # copy, which must not be stored as the original
+            return update_stored_headers(stored, not_modified)
+        
+        original = decompress_response(current[0]) if is_compressed(current[0]) else current[0]
+        refreshed = update_stored_headers(original, not_modified)
+        if not self.store(request, refreshed):
+            self._cache_manager.invalidate(key)
+        return refreshed
+    
+    @property
+    def compression_stats(self) -> Dict[str, int]:
+        """
+        Get compression counters
+        
+        :return: Responses stored compressed and their total size before
+                 and after compression
+        """
+        return {
+            'compressed': self._compressed,
+            'raw_bytes': self._raw_bytes,
+            'compressed_bytes': self._compressed_bytes
+        }
+    
+    def metrics(self) -> Dict[str, float]:
+        """
+        Get the cache's state for the metrics endpoint
+        
+        A tiered cache counts only evictions from L2, since entries
+        evicted from L1 are demoted rather than dropped.
+        
+        :return: Current values by metric name
+        """
+        stats = self._cache_manager.stats
+        tiers = [stats['l1'], stats['l2']] if 'l2' in stats else [stats]
+        return {
+            'proxy_cache_entries': self._cache_manager.cache_size,
+            'proxy_cache_size_bytes': self._cache_manager.cache_bytes,
+            'proxy_cache_evictions_total': tiers[-1].get('evictions', 0),
+            'proxy_cache_expirations_total': sum(tier.get('expirations', 0) for tier in tiers),
+            'proxy_cache_compression_saved_bytes_total': self._raw_bytes - self._compressed_bytes
+        }
+    
+    @staticmethod
+    def _decode(request: HTTPRequest, stored: Buffer) -> Buffer:
+        """Pick the representation of a stored response the client can use"""
+        if not is_compressed(stored):
+            return stored
+        return gzip_response(stored) if accepts_gzip(request) else decompress_response(stored)
+    
+    @staticmethod
+    def _stale_grace(cache_control: Dict[str, Optional[str]]) -> int:
+        """Seconds a response may be served stale while it is refreshed"""
+        seconds = _parse_seconds(cache_control.get('stale-while-revalidate'))
+        return CacheConfig.STALE_WHILE_REVALIDATE if seconds is None else seconds
+    
+    def _is_storable(self, request: HTTPRequest, response: HTTPResponse) -> bool:
+        """Check whether a shared cache may store a response"""
+        if request.method != 'GET' or response.status not in _HEURISTIC_STATUSES:
+            return False
+        
+        cache_control = parse_cache_control(response.get_header('cache-control'))
+        if 'no-store' in cache_control or 'private' in cache_control:
+            return False
+        if 'no-store' in parse_cache_control(request.headers.get('cache-control')):
+            return False
+        if response.get_header('vary', '').strip() == '*':
+            return False
+        
+        # Authorized responses are only shared when the origin says so
+        if 'authorization' in request.headers:
+            return bool({'public', 's-maxage', 'must-revalidate'} & cache_control.keys())
+        return True
+    
+    def _key_for_response(self, request: HTTPRequest, response: HTTPResponse) -> str:
+        """Key a response under its request's Vary'd header values"""
+        primary = f"GET {normalize_url(request)}"
+        vary = tuple(sorted(
+            name.strip().lower()
+            for name in response.get_header('vary', '').split(',')
+            if name.strip()
+        ))
+        if not vary:
+            self._vary.pop(primary, None)
+            return primary
+        
+        if len(self._vary) >= CacheConfig.DEFAULT_CACHE_SIZE and primary not in self._vary:
+            # Forgotten entries only cost a miss on their next lookup
+            self._vary.clear()
+        self._vary[primary] = vary
+        return self._variant_key(primary, vary, request)
+    
+    @staticmethod
+    def _variant_key(primary: str, vary: Tuple[str, ...], request: HTTPRequest) -> str:
+        """Extend a primary key with the request's values for the Vary headers"""
+        values = (
+            ' '.join(request.headers.get(name, '').split())
+            for name in vary
+        )
+        return primary + ''.join(f"\n{name}: {value}" for name, value in zip(vary, values))
\ No newline at end of file
@@ -0,0 +1,118 @@
+# web/cache/refresh_worker.py
+import asyncio
+import queue
+import threading
+from typing import Awaitable, Callable, Set
+from ..config.cache_settings import CacheConfig
+from ..logging.logger import Logger
+
+class RefreshWorker:
+    """
+    Background threads refreshing cache entries off the request path
+    
+    Jobs are keyed by cache key, so a key already queued or being
+    refreshed is not queued again. When the queue is full new jobs are
+    dropped; the entry is simply refreshed on a later hit or miss.
+    """
+    
+    def __init__(self,
+                 workers: int = CacheConfig.REFRESH_WORKERS,
+                 max_pending: int = CacheConfig.REFRESH_QUEUE_SIZE):
+        """
+        Initialize refresh worker
+        
+        :param workers: Number of refresh threads
+        :param max_pending: Maximum queued refresh jobs
+        """
+        self._workers = workers
+        self._queue: 'queue.Queue' = queue.Queue(max_pending)
+        self._pending: Set[str] = set()
+        self._lock = threading.Lock()
+        self._threads = []
+    
+    def submit(self, key: str, job: Callable[[], None]) -> bool:
+        """
+        Queue a refresh job
+        
+        :param key: Cache key being refreshed
+        :param job: Function performing the refresh
+        :return: True if queued, False if already pending or the queue is full
+        """
+        with self._lock:
+            if key in self._pending:
+                return False
+            try:
+                self._queue.put_nowait((key, job))
+            except queue.Full:
+                return False
+            self._pending.add(key)
+            
+            # Threads are only started once there is something to refresh
+            if not self._threads:
+                for _ in range(self._workers):
+                    thread = threading.Thread(target=self._run, daemon=True)
+                    thread.start()
+                    self._threads.append(thread)
+        return True
+    
+    def _run(self) -> None:
+        """Run queued jobs until the process exits"""
+        while True:
+            key, job = self._queue.get()
+            try:
+                job()
+            except Exception as e:
+                Logger.log_error(f"Cache refresh error for {key}: {e}")
+            finally:
+                with self._lock:
+                    self._pending.discard(key)
+    
+    def __len__(self) -> int:
+        """Return number of refreshes queued or running"""
+        return len(self._pending)
+
+
+class AsyncRefreshWorker:
+    """
+    Refresh cache entries in background tasks on the asyncio event loop
+    """
+    
+    def __init__(self, max_pending: int = CacheConfig.REFRESH_QUEUE_SIZE):
+        """
+        Initialize async refresh worker
+        
+        :param max_pending: Maximum refreshes running at once
+        """
+        self._max_pending = max_pending
+        self._pending: Set[str] = set()
+        # Strong references keep running tasks from being garbage collected
+        self._tasks: Set[asyncio.Task] = set()
+    
+    def submit(self, key: str, job: Callable[[], Awaitable[None]]) -> bool:
+        """
+        Start a refresh task
+        
+        :param key: Cache key being refreshed
+        :param job: Coroutine function performing the refresh
+        :return: True if started, False if already pending or at capacity
+        """
+        if key in self._pending or len(self._pending) >= self._max_pending:
+            return False
+        self._pending.add(key)
+        task = asyncio.ensure_future(self._run(key, job))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return True
+    
+    async def _run(self, key: str, job: Callable[[], Awaitable[None]]) -> None:
+        """Run one refresh job"""
+        try:
+            await job()
+        except Exception as e:
+            Logger.log_error(f"Cache refresh error for {key}: {e}")
+        finally:
+            self._pending.discard(key)
+    
+    def __len__(self) -> int:
+        """Return number of refreshes running"""
+        return len(self._pending)
\ No newline at end of file
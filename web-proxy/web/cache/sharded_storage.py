@@ -0,0 +1,168 @@
+# web/cache/sharded_storage.py
+import threading
+import zlib
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+def _merge_stats(total: Dict[str, Any], stats: Dict[str, Any]) -> Dict[str, Any]:
+    """Add one shard's (possibly nested) counters into a running total"""
+    for name, value in stats.items():
+        if isinstance(value, dict):
+            _merge_stats(total.setdefault(name, {}), value)
+        else:
+            total[name] = total.get(name, 0) + value
+    return total
+
+
+class ShardedCacheStorage:
+    """
+    Thread-safe cache storage split into independently locked shards
+    
+    Keys hash to one of N shards, each a complete storage with its own
+    lock, eviction order and expiry heap, so threads touching different
+    keys rarely contend. Size and byte budgets are divided between the
+    shards, which makes eviction approximate across the whole cache.
+    """
+    
+    def __init__(self, shard_factory: Callable[[int], Any], shards: int = 16):
+        """
+        Initialize sharded storage
+        
+        :param shard_factory: Builds the storage for a shard index
+        :param shards: Number of shards
+        """
+        self._shards: List[Any] = [shard_factory(index) for index in range(shards)]
+        self._locks = [threading.Lock() for _ in range(shards)]
+    
+    def _shard(self, key: str) -> Tuple[Any, threading.Lock]:
+        """Get the storage and lock owning a key"""
+        # hash() of a str differs between processes; disk shards must not
+        index = zlib.crc32(key.encode('utf-8')) % len(self._shards)
+        return self._shards[index], self._locks[index]
+    
+    def set(self, 
+            key: str, 
+            value: Any, 
+            ttl: Optional[float] = None, 
+            stale_ttl: float = 0) -> bool:
+        """
+        Set a value in the key's shard
+        
+        :param key: Cache key
+        :param value: Value to cache
+        :param ttl: Seconds until the entry expires
+        :param stale_ttl: Seconds an expired entry is kept for lookup() after ttl
+        :return: True if stored
+        """
+        shard, lock = self._shard(key)
+        with lock:
+            return shard.set(key, value, ttl=ttl, stale_ttl=stale_ttl)
+    
+    def get(self, key: str) -> Optional[Any]:
+        """
+        Retrieve a fresh value
+        
+        :param key: Cache key
+        :return: Cached value or None if not found/expired
+        """
+        shard, lock = self._shard(key)
+        with lock:
+            return shard.get(key)
+    
+    def lookup(self, key: str) -> Optional[Tuple[Any, bool]]:
+        """
+        Retrieve a value together with its freshness
+        
+        :param key: Cache key
+        :return: (value, fresh) or None if not found/past retention
+        """
+        shard, lock = self._shard(key)
+        with lock:
+            return shard.lookup(key)
+    
+    def delete(self, key: str) -> None:
+        """
+        Remove an entry
+        
+        :param key: Cache key
+        """
+        shard, lock = self._shard(key)
+        with lock:
+            shard.delete(key)
+    
+    def expiry(self, key: str) -> Optional[Tuple[float, float]]:
+        """
+        Get the deadlines of an entry
+        
+        :param key: Cache key
+        :return: (expires_at, retain_until) timestamps, or None if not stored
+        """
+        shard, lock = self._shard(key)
+        with lock:
+            return shard.expiry(key)
+    
+    def entries(self) -> Iterator[Tuple[str, Any, float, float]]:
+        """
+        Iterate over entries shard by shard
+        
+        Each shard's entries are collected under its lock and yielded
+        after it is released, so slow consumers do not block requests.
+        
+        :return: Iterator of (key, value, expires_at, retain_until)
+        """
+        for shard, lock in zip(self._shards, self._locks):
+            with lock:
+                collected = list(shard.entries())
+            yield from collected
+    
+    def purge_expired(self) -> int:
+        """
+        Remove expired entries shard by shard
+        
+        :return: Number of entries removed
+        """
+        removed = 0
+        for shard, lock in zip(self._shards, self._locks):
+            with lock:
+                removed += shard.purge_expired()
+        return removed
+    
+    def clear(self) -> None:
+        """Clear every shard"""
+        for shard, lock in zip(self._shards, self._locks):
+            with lock:
+                shard.clear()
+    
+    def close(self) -> None:
+        """Close every shard"""
+        for shard, lock in zip(self._shards, self._locks):
+            with lock:
+                shard.close()
+    
+    @property
+    def shards(self) -> int:
+        """Number of shards"""
+        return len(self._shards)
+    
+    @property
+    def stats(self) -> Dict[str, Any]:
+        """Lookup counters summed over all shards"""
+        total: Dict[str, Any] = {}
+        for shard, lock in zip(self._shards, self._locks):
+            with lock:
+                _merge_stats(total, shard.stats)
+        return total
+    
+    @property
+    def size_bytes(self) -> int:
+        """Total size in bytes of stored values"""
+        return sum(shard.size_bytes for shard in self._shards)
+    
+    def __contains__(self, key: str) -> bool:
+        """Check whether a key is stored"""
+        shard, lock = self._shard(key)
+        with lock:
+            return key in shard
+    
+    def __len__(self) -> int:
+        """Return number of items across all shards"""
+        return sum(len(shard) for shard in self._shards)
\ No newline at end of file
@@ -0,0 +1,111 @@
+# web/cache/single_flight.py
+import asyncio
+import threading
+from typing import Dict
+
+class SingleFlight:
+    """
+    Collapse concurrent cache misses for the same key into one fetch
+    
+    The first caller to miss becomes the leader and fetches; callers that
+    miss while that fetch is in flight wait for it and then re-read the
+    cache instead of going upstream themselves.
+    """
+    
+    def __init__(self):
+        """Initialize an empty in-flight table"""
+        self._lock = threading.Lock()
+        self._flights: Dict[str, threading.Event] = {}
+    
+    def acquire(self, key: str) -> bool:
+        """
+        Join the fetch for a key
+        
+        :param key: Cache key
+        :return: True if the caller leads and must call release()
+        """
+        with self._lock:
+            if key in self._flights:
+                return False
+            self._flights[key] = threading.Event()
+            return True
+    
+    def wait(self, key: str, timeout: float) -> bool:
+        """
+        Wait for the in-flight fetch of a key to finish
+        
+        :param key: Cache key
+        :param timeout: Maximum seconds to wait
+        :return: True if the fetch finished, False on timeout
+        """
+        with self._lock:
+            event = self._flights.get(key)
+        return event is None or event.wait(timeout)
+    
+    def release(self, key: str) -> None:
+        """
+        Finish the fetch for a key and wake its waiters
+        
+        :param key: Cache key
+        """
+        with self._lock:
+            event = self._flights.pop(key, None)
+        if event is not None:
+            event.set()
+    
+    def __len__(self) -> int:
+        """Return number of keys being fetched"""
+        return len(self._flights)
+
+
+class AsyncSingleFlight:
+    """
+    Single-flight table for handlers running on the asyncio event loop
+    """
+    
+    def __init__(self):
+        """Initialize an empty in-flight table"""
+        self._flights: Dict[str, asyncio.Event] = {}
+    
+    def acquire(self, key: str) -> bool:
+        """
+        Join the fetch for a key
+        
+        :param key: Cache key
+        :return: True if the caller leads and must call release()
+        """
+        if key in self._flights:
+            return False
+        self._flights[key] = asyncio.Event()
+        return True
+    
+    async def wait(self, key: str, timeout: float) -> bool:
+        """
+        Wait for the in-flight fetch of a key to finish
+        
+        :param key: Cache key
+        :param timeout: Maximum seconds to wait
+        :return: True if the fetch finished, False on timeout
+        """
+        event = self._flights.get(key)
+        if event is None:
+            return True
+        try:
+            await asyncio.wait_for(event.wait(), timeout=timeout)
+        except asyncio.TimeoutError:
+            return False
+        return True
+    
+    def release(self, key: str) -> None:
+        """
+        Finish the fetch for a key and wake its waiters
+        
+        :param key: Cache key
+        """
+        event = self._flights.pop(key, None)
+        if event is not None:
+            event.set()
+    
+    def __len__(self) -> int:
+        """Return number of keys being fetched"""
+        return len(self._flights)
\ No newline at end of file
@@ -0,0 +1,229 @@
+# web/cache/snapshot.py
+import mmap
+import os
+import struct
+import threading
+import time
+import zlib
+from typing import Any, Dict, Iterable, Iterator, Optional, Tuple
+from .cache_manager import CacheManager
+from ..config.cache_settings import CacheConfig
+from ..logging.logger import Logger
+
+# Snapshot file: magic, every value back to back, the index, then the
+# footer locating the index. Index record: value offset, value size,
+# expires_at, retain_until, key length; followed by the key
+_MAGIC = b'PXSNAP01'
+_INDEX_RECORD = struct.Struct('<QIddI')
+# Footer: index offset, entry count, crc32 of the index, magic
+_FOOTER = struct.Struct('<QII8s')
+
+def write_snapshot(entries: Iterable[Tuple[str, Any, float, float]], path: str) -> Tuple[int, int]:
+    """
+    Write cache entries to a snapshot file, replacing it atomically
+    
+    Entries whose value is not bytes-like are skipped.
+    
+    :param entries: (key, value, expires_at, retain_until) tuples
+    :param path: Snapshot file path
+    :return: (entries written, file size in bytes)
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    
+    try:
+        with open(tmp_path, 'wb') as snapshot_file:
+            snapshot_file.write(_MAGIC)
+            offset = len(_MAGIC)
+            index = bytearray()
+            count = 0
+            for key, value, expires_at, retain_until in entries:
+                if not isinstance(value, (bytes, bytearray, memoryview)):
+                    continue
+                key_bytes = key.encode('utf-8')
+                size = memoryview(value).nbytes
+                snapshot_file.write(value)
+                index += _INDEX_RECORD.pack(offset, size, expires_at, retain_until, len(key_bytes))
+                index += key_bytes
+                offset += size
+                count += 1
+            
+            snapshot_file.write(index)
+            snapshot_file.write(_FOOTER.pack(offset, count, zlib.crc32(index), _MAGIC))
+            snapshot_file.flush()
+            os.fsync(snapshot_file.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except FileNotFoundError:
+            pass
+        raise
+    
+    return count, offset + len(index) + _FOOTER.size
+
+
+def read_snapshot(path: str) -> Iterator[Tuple[str, memoryview, float, float]]:
+    """
+    Read the entries of a snapshot file
+    
+    Only the index is read up front. Values are views of a read-only
+    map of the file, so their pages are loaded on first access.
+    
+    :param path: Snapshot file path
+    :return: Iterator of (key, value, expires_at, retain_until)
+    :raises ValueError: If the file is not a complete snapshot
+    """
+    with open(path, 'rb') as snapshot_file:
+        size = os.fstat(snapshot_file.fileno()).st_size
+        if size < len(_MAGIC) + _FOOTER.size:
+            raise ValueError(f"Snapshot {path} is truncated")
+        snapshot_map = mmap.mmap(snapshot_file.fileno(), 0, access=mmap.ACCESS_READ)
+    
+    index_end = size - _FOOTER.size
+    index_offset, count, crc, magic = _FOOTER.unpack_from(snapshot_map, index_end)
+    if snapshot_map[:len(_MAGIC)] != _MAGIC or magic != _MAGIC or index_offset > index_end:
+        raise ValueError(f"Snapshot {path} is not a complete snapshot")
+    index = snapshot_map[index_offset:index_end]
+    if zlib.crc32(index) != crc:
+        raise ValueError(f"Snapshot {path} has a corrupt index")
+    
+    values = memoryview(snapshot_map)
+    pos = 0
+    for _ in range(count):
+        offset, value_size, expires_at, retain_until, key_size = _INDEX_RECORD.unpack_from(index, pos)
+        pos += _INDEX_RECORD.size
+        key = index[pos:pos + key_size].decode('utf-8')
+        pos += key_size
+        yield key, values[offset:offset + value_size], expires_at, retain_until
+
+
+class CacheSnapshotter:
+    """
+    Save a cache to a snapshot file and restore it on the next start
+    
+    Snapshots are written at a fixed interval by a background thread
+    and once more when stopped, so a restart begins with a warm cache
+    instead of sending the full load to the origin.
+    """
+    
+    def __init__(self,
+                 cache_manager: CacheManager,
+                 path: str = CacheConfig.SNAPSHOT_PATH,
+                 interval: float = CacheConfig.SNAPSHOT_INTERVAL):
+        """
+        Initialize snapshotter
+        
+        :param cache_manager: Cache to save and restore
+        :param path: Snapshot file path
+        :param interval: Seconds between periodic snapshots (0 saves only on stop)
+        """
+        self._cache_manager = cache_manager
+        self._path = path
+        self._interval = interval
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._stats: Dict[str, float] = {
+            'entries': 0,
+            'bytes': 0,
+            'duration': 0.0,
+            'loaded': 0,
+            'load_duration': 0.0
+        }
+    
+    def load(self) -> int:
+        """
+        Restore the cache from the snapshot file, if there is one
+        
+        :return: Number of entries restored
+        """
+        if not os.path.exists(self._path):
+            return 0
+        started = time.perf_counter()
+        loaded = 0
+        try:
+            for key, value, expires_at, retain_until in read_snapshot(self._path):
+                if self._cache_manager.restore(key, value, expires_at, retain_until):
+                    loaded += 1
+        except (OSError, ValueError) as e:
+            Logger.log_error(f"Cache snapshot not loaded: {e}")
+        
+        self._stats['loaded'] = loaded
+        self._stats['load_duration'] = time.perf_counter() - started
+        Logger.log_info(
+            f"Restored {loaded} cache entries from {self._path} "
+            f"in {self._stats['load_duration'] * 1000:.1f} ms"
+        )
+        return loaded
+    
+    def snapshot(self) -> int:
+        """
+        Write the cache to the snapshot file now
+        
+        :return: Number of entries written
+        """
+        with self._lock:
+            started = time.perf_counter()
+            try:
+                count, size = write_snapshot(self._cache_manager.entries(), self._path)
+            except OSError as e:
+                Logger.log_error(f"Cache snapshot failed: {e}")
+                return 0
+            
+            self._stats['entries'] = count
+            self._stats['bytes'] = size
+            self._stats['duration'] = time.perf_counter() - started
+        Logger.log_info(
+            f"Saved {count} cache entries ({size} bytes) to {self._path} "
+            f"in {self._stats['duration'] * 1000:.1f} ms"
+        )
+        return count
+    
+    def start(self) -> None:
+        """Start periodic snapshots"""
+        if self._interval > 0 and self._thread is None:
+            self._stopped.clear()
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+    
+    def stop(self) -> None:
+        """Stop periodic snapshots and write a final one"""
+        if self._stopped.is_set():
+            return
+        self._stopped.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join()
+        self._thread = None
+        self.snapshot()
+    
+    def _run(self) -> None:
+        """Write a snapshot every interval until stopped"""
+        while not self._stopped.wait(self._interval):
+            self.snapshot()
+    
+    @property
+    def stats(self) -> Dict[str, float]:
+        """
+        Get the size and duration of the last snapshot and of the last load
+        
+        :return: entries, bytes and duration (seconds) of the last
+                 snapshot; loaded and load_duration of the last load
+        """
+        return dict(self._stats)
+    
+    def metrics(self) -> Dict[str, float]:
+        """
+        Get the last snapshot and load, for the metrics endpoint
+        
+        :return: Current values by metric name
+        """
+        stats = self.stats
+        return {
+            'proxy_cache_snapshot_duration_seconds': stats['duration'],
+            'proxy_cache_snapshot_bytes': stats['bytes'],
+            'proxy_cache_snapshot_entries': stats['entries'],
+            'proxy_cache_snapshot_load_duration_seconds': stats['load_duration'],
+            'proxy_cache_snapshot_loaded_entries': stats['loaded']
+        }
\ No newline at end of file
@@ -0,0 +1,198 @@
+# web/cache/tiered_storage.py
+import time
+from typing import Any, Dict, Iterator, Optional, Tuple
+from .cache_storage import CacheStorage
+from ..config.cache_settings import CacheConfig
+
+class TieredCacheStorage:
+    """
+    Two-tier cache storage: a small in-memory L1 in front of a larger L2
+    
+    Writes land in L1. Entries evicted from L1 are demoted to L2 instead
+    of being dropped, and L2 entries read often enough are promoted back
+    to L1. The tiers are exclusive, so every key lives in at most one.
+    """
+    
+    def __init__(self,
+                 l2: CacheStorage,
+                 l1_size: int = 100,
+                 l1_max_bytes: Optional[int] = CacheConfig.L1_MAX_BYTES,
+                 l1_eviction_policy: str = CacheConfig.L1_EVICTION_POLICY,
+                 expiration_time: int = CacheConfig.DEFAULT_EXPIRATION_TIME,
+                 promotion_hits: int = CacheConfig.L2_PROMOTION_HITS):
+        """
+        Initialize tiered storage
+        
+        :param l2: Larger backing storage (memory or disk)
+        :param l1_size: Maximum number of items in L1
+        :param l1_max_bytes: Maximum total size of L1 values (None for no limit)
+        :param l1_eviction_policy: Eviction policy of the L1 tier
+        :param expiration_time: Default entry lifetime in seconds
+        :param promotion_hits: L2 hits before an entry is promoted to L1
+        """
+        self._l2 = l2
+        self._l1 = CacheStorage(
+            max_size=l1_size,
+            expiration_time=expiration_time,
+            eviction_policy=l1_eviction_policy,
+            max_bytes=l1_max_bytes,
+            max_object_size=l1_max_bytes,
+            on_evict=self._demote
+        )
+        self._promotion_hits = promotion_hits
+        self._l2_hits: Dict[str, int] = {}
+        self._promotions = 0
+        self._demotions = 0
+    
+    def set(self, 
+            key: str, 
+            value: Any, 
+            ttl: Optional[float] = None, 
+            stale_ttl: float = 0) -> bool:
+        """
+        Store a value in L1, or directly in L2 if it is too big for L1
+        
+        :param key: Cache key
+        :param value: Value to cache
+        :param ttl: Seconds until the entry expires
+        :param stale_ttl: Seconds an expired entry is kept for lookup() after ttl
+        :return: True if stored in either tier
+        """
+        self._l2_hits.pop(key, None)
+        if self._l1.set(key, value, ttl=ttl, stale_ttl=stale_ttl):
+            # Also drops a stale copy demoted while making room
+            self._l2.delete(key)
+            return True
+        return self._l2.set(key, value, ttl=ttl, stale_ttl=stale_ttl)
+    
+    def get(self, key: str) -> Optional[Any]:
+        """
+        Retrieve a value, promoting it once it is hit often enough in L2
+        
+        :param key: Cache key
+        :return: Cached value or None if not found/expired
+        """
+        found = self.lookup(key)
+        if found is None or not found[1]:
+            return None
+        return found[0]
+    
+    def lookup(self, key: str) -> Optional[Tuple[Any, bool]]:
+        """
+        Retrieve a value together with its freshness from either tier
+        
+        :param key: Cache key
+        :return: (value, fresh) or None if not found/past retention
+        """
+        found = self._l1.lookup(key)
+        if found is not None:
+            return found
+        
+        found = self._l2.lookup(key)
+        if found is None:
+            self._l2_hits.pop(key, None)
+            return None
+        
+        hits = self._l2_hits.get(key, 0) + 1
+        if hits < self._promotion_hits:
+            self._l2_hits[key] = hits
+            # Counters of keys that left L2 on their own are dropped wholesale
+            if len(self._l2_hits) > len(self._l2):
+                self._l2_hits.clear()
+            return found
+        
+        self._l2_hits.pop(key, None)
+        value, fresh = found
+        value = bytes(value) if isinstance(value, memoryview) else value
+        expires_at, retain_until = self._l2.expiry(key)
+        if self._move(self._l1, key, value, expires_at, retain_until):
+            self._l2.delete(key)
+            self._promotions += 1
+        return value, fresh
+    
+    def delete(self, key: str) -> None:
+        """
+        Remove an entry from both tiers
+        
+        :param key: Cache key
+        """
+        self._l2_hits.pop(key, None)
+        self._l1.delete(key)
+        self._l2.delete(key)
+    
+    def expiry(self, key: str) -> Optional[Tuple[float, float]]:
+        """
+        Get the deadlines of an entry
+        
+        :param key: Cache key
+        :return: (expires_at, retain_until) timestamps, or None if not stored
+        """
+        expiry = self._l1.expiry(key)
+        return expiry if expiry is not None else self._l2.expiry(key)
+    
+    def entries(self) -> Iterator[Tuple[str, Any, float, float]]:
+        """
+        Iterate over entries of both tiers, L1 first
+        
+        :return: Iterator of (key, value, expires_at, retain_until)
+        """
+        yield from self._l1.entries()
+        yield from self._l2.entries()
+    
+    def purge_expired(self) -> int:
+        """
+        Remove every expired entry from both tiers
+        
+        :return: Number of entries removed
+        """
+        return self._l1.purge_expired() + self._l2.purge_expired()
+    
+    def clear(self) -> None:
+        """Clear both tiers"""
+        self._l2_hits.clear()
+        self._l1.clear()
+        self._l2.clear()
+    
+    def close(self) -> None:
+        """Close the L2 storage; L1 contents are dropped"""
+        self._l2.close()
+    
+    def _demote(self, key: str, value: Any, expires_at: float, retain_until: float) -> None:
+        """Move an entry evicted from L1 down to L2"""
+        if self._move(self._l2, key, value, expires_at, retain_until):
+            self._demotions += 1
+    
+    @staticmethod
+    def _move(tier: CacheStorage, 
+              key: str, 
+              value: Any, 
+              expires_at: float, 
+              retain_until: float) -> bool:
+        """Store an entry in a tier keeping its original deadlines"""
+        now = time.time()
+        if retain_until <= now:
+            return False
+        return tier.set(key, value, ttl=expires_at - now, stale_ttl=retain_until - expires_at)
+    
+    @property
+    def stats(self) -> Dict[str, Any]:
+        """Per-tier lookup counters plus promotion and demotion counts"""
+        return {
+            'l1': self._l1.stats,
+            'l2': self._l2.stats,
+            'promotions': self._promotions,
+            'demotions': self._demotions
+        }
+    
+    @property
+    def size_bytes(self) -> int:
+        """Total size in bytes of values in both tiers"""
+        return self._l1.size_bytes + self._l2.size_bytes
+    
+    def __contains__(self, key: str) -> bool:
+        """Check whether a key is stored in either tier"""
+        return key in self._l1 or key in self._l2
+    
+    def __len__(self) -> int:
+        """Return number of items across both tiers"""
+        return len(self._l1) + len(self._l2)
\ No newline at end of file
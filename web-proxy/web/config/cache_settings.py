@@ -1,3 +1,5 @@
+import os
+
 
 class CacheConfig:
     """Configuration for caching mechanism"""
@@ -6,12 +8,83 @@ class CacheConfig:
     
     DEFAULT_EXPIRATION_TIME = 360  # 1 hour
     
+    # Maximum expired entries removed per cache write
+    EXPIRY_SWEEP_BATCH = 64
+    
+    # Responses larger than this are relayed but not cached
+    MAX_CACHEABLE_RESPONSE_SIZE = 10 * 1024 * 1024  # 10 MB
+    
+    # Total bytes of cached values; None limits by entry count only
+    DEFAULT_MAX_BYTES = None
+    
     STORAGE_MEMORY = 'memory'
     STORAGE_DISK = 'disk'
     
     DEFAULT_STORAGE_TYPE = STORAGE_MEMORY
     
+    # Independently locked shards the cache is split into; keys hash to
+    # a shard and size budgets are divided evenly between them
+    CACHE_SHARDS = 16
+    
+    # Disk storage settings
+    DISK_CACHE_DIR = os.path.join(os.path.dirname(__file__), '..', 'cache_data')
+    DISK_SEGMENT_SIZE = 64 * 1024 * 1024  # 64 MB
+    DISK_COMPACTION_RATIO = 0.5  # Rewrite sealed segments once half is dead
+    # Seconds between scans for entries written by other processes when
+    # the disk cache is shared (pre-fork workers)
+    DISK_SYNC_INTERVAL = 0.05
+    
+    # Snapshot of the memory cache, restored at startup and saved every
+    # SNAPSHOT_INTERVAL seconds and at shutdown; None disables snapshots
+    SNAPSHOT_PATH = None
+    SNAPSHOT_INTERVAL = 300  # 0 saves only at shutdown
+    
+    # Store text-like responses gzip-compressed; clients accepting gzip
+    # are sent the compressed copy as-is, others a decompressed one
+    COMPRESS_RESPONSES = False
+    COMPRESSION_MIN_SIZE = 1024  # bytes of body
+    COMPRESSION_LEVEL = 6
+    # The compressed copy is kept only below this share of the original size
+    COMPRESSION_MIN_RATIO = 0.9
+    COMPRESSIBLE_TYPE_PREFIXES = (
+        'text/', 'application/json', 'application/javascript',
+        'application/xml', 'application/xhtml+xml', 'image/svg+xml'
+    )
+    
+    # Expired responses carrying ETag/Last-Modified are kept this long
+    # so they can be revalidated with a conditional request
+    REVALIDATION_WINDOW = 24 * 3600  # 1 day
+    
+    # Share of a response's Last-Modified age it is considered fresh for
+    # when the origin gives no explicit lifetime
+    HEURISTIC_FRESHNESS_FRACTION = 0.1
+    
+    # Seconds an expired entry is still served while it is refreshed in
+    # the background (responses may set their own stale-while-revalidate)
+    STALE_WHILE_REVALIDATE = 0
+    
+    # Entries hit at least REFRESH_AHEAD_MIN_HITS times are refreshed in
+    # the background once within REFRESH_AHEAD_SECONDS of expiring;
+    # 0 disables refresh-ahead
+    REFRESH_AHEAD_SECONDS = 0
+    REFRESH_AHEAD_MIN_HITS = 10
+    
+    # Background refresh threads and maximum queued refreshes
+    REFRESH_WORKERS = 2
+    REFRESH_QUEUE_SIZE = 256
+    
+    # Seconds a miss waits for a concurrent fetch of the same URL
+    COALESCE_WAIT_TIMEOUT = 10
+    
+    # Two-tier cache: a small in-memory L1 in front of the storage above,
+    # which becomes L2; None disables the L1 tier
+    L1_CACHE_SIZE = None
+    L1_MAX_BYTES = 64 * 1024 * 1024  # 64 MB
+    L1_EVICTION_POLICY = 'least_recently_used'
+    L2_PROMOTION_HITS = 2  # L2 hits before an entry moves up to L1
+    
     EVICTION_LRU = 'least_recently_used'
     EVICTION_FIFO = 'first_in_first_out'
+    EVICTION_LFU = 'least_frequently_used'
     
     DEFAULT_EVICTION_POLICY = EVICTION_LRU
\ No newline at end of file
@@ -6,16 +6,84 @@ class ServerConfig:
     HOST = '127.0.0.1'
     PORT = 8080
     
+    # Server mode settings
+    MODE_THREADED = 'threaded'
+    MODE_ASYNCIO = 'asyncio'
+    
+    SERVER_MODE = MODE_ASYNCIO
+    
+    # Pre-fork settings: worker processes each running a server on the
+    # same port; 1 keeps everything in a single process
+    WORKERS = 1
+    # Workers bind the port themselves with SO_REUSEPORT where available
+    # instead of sharing the master's listening socket
+    REUSE_PORT = True
+    # Workers serve from one disk cache instead of a private memory cache each
+    SHARED_CACHE = True
+    WORKER_RESTART_DELAY = 1  # seconds before restarting a worker that keeps crashing
+    
     # Connection settings
     BUFFER_SIZE = 4096
-    MAX_CONNECTIONS = 100
+    MAX_CONNECTIONS = 100  # listen backlog
+    MAX_REQUEST_BODY_SIZE = 10 * 1024 * 1024  # 10 MB
+    
+    # Admission settings: at most MAX_ACTIVE_CLIENTS connections are served
+    # at once (worker threads in threaded mode, tasks in asyncio mode) and
+    # up to ACCEPT_QUEUE_SIZE more wait, for ACCEPT_QUEUE_TIMEOUT seconds at
+    # most, before being answered with 503. OVERLOAD_POLICY says what
+    # happens beyond that: queue stops accepting until there is room, shed
+    # answers 503 right away, pause stops accepting as soon as every
+    # worker is busy
+    OVERLOAD_QUEUE = 'queue'
+    OVERLOAD_SHED = 'shed'
+    OVERLOAD_PAUSE = 'pause'
+    OVERLOAD_POLICY = OVERLOAD_QUEUE
+    MAX_ACTIVE_CLIENTS = 64
+    ACCEPT_QUEUE_SIZE = 256
+    ACCEPT_QUEUE_TIMEOUT = 10  # seconds
+    MAX_CONNECTIONS_PER_CLIENT = 32  # connections open at once per client IP; None for no limit
     
     # Timeout settings
     CONNECTION_TIMEOUT = 10  # seconds
     READ_TIMEOUT = 30  # seconds
     
+    # Seconds a client connection may stay open without a new request. In
+    # threaded mode an idle connection holds a worker, so keep this short
+    KEEP_ALIVE_TIMEOUT = 5  # seconds
+    
+    # CONNECT tunnel settings: a tunnel relays through one reusable buffer
+    # per direction and is closed after TUNNEL_IDLE_TIMEOUT seconds with
+    # no bytes either way. In threaded mode an open tunnel holds a worker
+    TUNNEL_PORTS = (443,)  # ports CONNECT may reach; None for any
+    TUNNEL_BUFFER_SIZE = 64 * 1024
+    TUNNEL_IDLE_TIMEOUT = 60  # seconds
+    
+    # Upstream connection pool settings
+    POOL_MAX_IDLE_PER_HOST = 8
+    POOL_MAX_PER_HOST = 32
+    POOL_IDLE_TIMEOUT = 30  # seconds
+    
+    # URL blocking settings: blocklist files hold one entry per line, either
+    # a host name (blocking it and its subdomains) or a URL regex
+    BLOCKLIST_FILES = ()
+    BLOCKLIST_VERDICT_CACHE_SIZE = 10000  # recently checked URLs remembered
+    # Seconds between checks of the blocklist files for changes, which are
+    # then reloaded in the background; 0 disables reloading
+    BLOCKLIST_RELOAD_INTERVAL = 5
+    
+    # Admin endpoint serving /metrics in the Prometheus text format; None
+    # disables it. Pre-fork worker N listens on ADMIN_PORT + N
+    ADMIN_HOST = '127.0.0.1'
+    ADMIN_PORT = None
+    
     # Logging settings
     LOG_LEVEL = 'INFO'
+    # Queue log records for a background thread that writes them in
+    # batches; records beyond LOG_QUEUE_SIZE waiting ones are dropped
+    LOG_ASYNC = True
+    LOG_QUEUE_SIZE = 10000
+    LOG_BATCH_SIZE = 512
+    LOG_FLUSH_INTERVAL = 0.1  # seconds
     
     # Caching settings
     ENABLE_CACHING = True
@@ -1,4 +1,5 @@
 # web/logging/__init__.py
+from .async_writer import AsyncLogWriter
 from .logger import Logger
 
-__all__ = ['Logger']
\ No newline at end of file
+__all__ = ['AsyncLogWriter', 'Logger']
\ No newline at end of file
@@ -0,0 +1,198 @@
+# web/logging/async_writer.py
+import collections
+import logging
+import os
+import threading
+import time
+from logging.handlers import RotatingFileHandler
+from typing import Any, Deque, Dict, List, Tuple
+
+# Queued record: creation time, level, message template, template args
+_Entry = Tuple[float, int, str, Tuple[Any, ...]]
+
+class AsyncLogWriter:
+    """
+    Write log records to a logger's handlers from a background thread
+    
+    Logging threads only append a compact (time, level, message, args)
+    tuple to a bounded queue, which takes no lock. The writer thread
+    drains the queue every flush interval, builds the log records,
+    formats them and writes each stream handler's share of a batch with
+    a single write and flush. Records arriving while the queue is full
+    are dropped and counted, so logging never blocks a request.
+    """
+    
+    def __init__(self,
+                 logger: logging.Logger,
+                 queue_size: int = 10000,
+                 batch_size: int = 512,
+                 flush_interval: float = 0.1):
+        """
+        Initialize writer
+        
+        :param logger: Logger whose handlers the records are written to
+        :param queue_size: Records held before new ones are dropped
+        :param batch_size: Records written per batch at most
+        :param flush_interval: Seconds between checks for new records
+        """
+        self._logger = logger
+        self._queue_size = queue_size
+        self._batch_size = batch_size
+        self._flush_interval = flush_interval
+        self._queue: Deque[_Entry] = collections.deque()
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = None
+        # Held while writing; the drop counters have their own lock so a
+        # full queue never makes a logging thread wait for a write
+        self._write_lock = threading.Lock()
+        self._drop_lock = threading.Lock()
+        self._dropped: Dict[int, int] = {}
+        self._reported_drops = 0
+        self._written = 0
+        self._batches = 0
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._after_fork)
+    
+    def submit(self, level: int, message: str, args: Tuple[Any, ...] = ()) -> bool:
+        """
+        Queue a record for writing
+        
+        :param level: Logging level
+        :param message: Message, or %-style template for args
+        :param args: Template arguments, formatted on the writer thread
+        :return: True if queued, False if dropped because the queue is full
+        """
+        if len(self._queue) >= self._queue_size:
+            with self._drop_lock:
+                self._dropped[level] = self._dropped.get(level, 0) + 1
+            return False
+        self._queue.append((time.time(), level, message, args))
+        return True
+    
+    def start(self) -> None:
+        """Start the writer thread"""
+        if self._thread is None:
+            self._stopped.clear()
+            self._thread = threading.Thread(target=self._run, name='AsyncLogWriter', daemon=True)
+            self._thread.start()
+    
+    def stop(self) -> None:
+        """Write every queued record and stop the writer thread"""
+        self._stopped.set()
+        self._wakeup.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join()
+        self._thread = None
+        self._drain()
+    
+    def flush(self, timeout: float = 5.0) -> bool:
+        """
+        Wait until the records queued so far are written
+        
+        :param timeout: Seconds to wait at most
+        :return: True if the queue was emptied in time
+        """
+        deadline = time.monotonic() + timeout
+        if self._thread is None:
+            self._drain()
+        while self._queue and time.monotonic() < deadline:
+            self._wakeup.set()
+            time.sleep(0.001)
+        # The last batch may still be in the middle of being written
+        with self._write_lock:
+            return not self._queue
+    
+    def _run(self) -> None:
+        """Write queued records in batches until stopped"""
+        while not self._stopped.is_set():
+            self._wakeup.wait(self._flush_interval)
+            self._wakeup.clear()
+            self._drain()
+    
+    def _drain(self) -> None:
+        """Write every queued record, one batch at a time"""
+        with self._write_lock:
+            while self._queue:
+                batch = []
+                while self._queue and len(batch) < self._batch_size:
+                    batch.append(self._queue.popleft())
+                self._write(batch)
+            
+            dropped = sum(self._dropped.values())
+            if dropped > self._reported_drops:
+                message = f"Log queue full, dropped {dropped - self._reported_drops} records"
+                self._reported_drops = dropped
+                self._write([(time.time(), logging.WARNING, message, ())])
+    
+    def _write(self, batch: List[_Entry]) -> None:
+        """Format a batch and hand it to every handler of the logger"""
+        records = []
+        for created, level, message, args in batch:
+            record = self._logger.makeRecord(self._logger.name, level, '', 0, message, args or None, None)
+            record.created = created
+            record.msecs = (created - int(created)) * 1000
+            records.append(record)
+        
+        for handler in self._logger.handlers:
+            # A stream closed at interpreter exit is skipped, not reported
+            if getattr(getattr(handler, 'stream', None), 'closed', False):
+                continue
+            if not isinstance(handler, logging.StreamHandler):
+                for record in records:
+                    if record.levelno >= handler.level:
+                        handler.handle(record)
+                continue
+            
+            try:
+                text = ''.join(
+                    handler.format(record) + handler.terminator
+                    for record in records if record.levelno >= handler.level
+                )
+                if not text:
+                    continue
+                # Files are rolled over between batches, so they may end up
+                # one batch larger than maxBytes
+                with handler.lock:
+                    handler.stream.write(text)
+                    handler.stream.flush()
+                    if (isinstance(handler, RotatingFileHandler) and handler.maxBytes > 0
+                            and handler.stream.tell() >= handler.maxBytes):
+                        handler.doRollover()
+            except Exception:
+                handler.handleError(records[-1])
+        
+        self._written += len(records)
+        self._batches += 1
+    
+    def _after_fork(self) -> None:
+        """Restart in a forked child without the parent's queued records"""
+        self._queue.clear()
+        self._write_lock = threading.Lock()
+        self._drop_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        restart = self._thread is not None
+        self._thread = None
+        if restart:
+            self.start()
+    
+    @property
+    def stats(self) -> Dict[str, int]:
+        """
+        Get writer counters
+        
+        :return: queued, written, batches and dropped record counts, plus
+                 dropped counts per level name
+        """
+        with self._drop_lock:
+            dropped = dict(self._dropped)
+        stats = {
+            'queued': len(self._queue),
+            'written': self._written,
+            'batches': self._batches,
+            'dropped': sum(dropped.values())
+        }
+        for level, count in dropped.items():
+            stats[f'dropped_{logging.getLevelName(level).lower()}'] = count
+        return stats
\ No newline at end of file
@@ -1,14 +1,23 @@
 # web/logging/logger.py
+import atexit
 import os
 import logging
 from logging.handlers import RotatingFileHandler
 from datetime import datetime
 from typing import Dict, Any, Optional
+from .async_writer import AsyncLogWriter
+from ..config.settings import ServerConfig
 
 class Logger:
     """
     Centralized logging system for the proxy server
     Supports file and console logging with multiple log levels
+    
+    With ServerConfig.LOG_ASYNC, records are queued and written in
+    batches by a background thread (see AsyncLogWriter), so logging
+    costs a request thread a queue append instead of a file write.
+    Messages may be %-style templates with arguments, which are then
+    only formatted by the writer.
     """
     
     # Class variable to store logger instance
@@ -48,12 +57,42 @@ class Logger:
             backupCount=5
         )
         file_handler.setLevel(logging.DEBUG)
+        # Queued records carry no caller location, finding it is too costly
         file_formatter = logging.Formatter(
-            '%(asctime)s - %(levelname)s - [%(filename)s:%(lineno)d] - %(message)s', 
+            '%(asctime)s - %(levelname)s - %(message)s' if ServerConfig.LOG_ASYNC
+            else '%(asctime)s - %(levelname)s - [%(filename)s:%(lineno)d] - %(message)s', 
             datefmt='%Y-%m-%d %H:%M:%S'
         )
         file_handler.setFormatter(file_formatter)
         self._logger.addHandler(file_handler)
+        
+        # Background writer for the handlers above
+        self._writer: Optional[AsyncLogWriter] = None
+        if ServerConfig.LOG_ASYNC:
+            self._writer = AsyncLogWriter(
+                self._logger,
+                queue_size=ServerConfig.LOG_QUEUE_SIZE,
+                batch_size=ServerConfig.LOG_BATCH_SIZE,
+                flush_interval=ServerConfig.LOG_FLUSH_INTERVAL
+            )
+            self._writer.start()
+            atexit.register(self._writer.stop)
+    
+    def _log(self, level: int, message: str, args: tuple) -> None:
+        """
+        Log a record, queueing it in async mode
+        
+        :param level: Logging level
+        :param message: Message or %-style template
+        :param args: Template arguments
+        """
+        if not self._logger.isEnabledFor(level):
+            return
+        if self._writer is not None:
+            self._writer.submit(level, message, args)
+        else:
+            # stacklevel skips _log and the Logger.log_* method calling it
+            self._logger.log(level, message, *args, stacklevel=3)
     
     @classmethod
     def get_instance(cls):
@@ -67,40 +106,44 @@ class Logger:
         return cls._instance
     
     @classmethod
-    def log_info(cls, message: str) -> None:
+    def log_info(cls, message: str, *args: Any) -> None:
         """
         Log an informational message
         
         :param message: Message to log
+        :param args: Arguments for a %-style message template
         """
-        cls.get_instance()._logger.info(message)
+        cls.get_instance()._log(logging.INFO, message, args)
     
     @classmethod
-    def log_error(cls, message: str) -> None:
+    def log_error(cls, message: str, *args: Any) -> None:
         """
         Log an error message
         
         :param message: Error message to log
+        :param args: Arguments for a %-style message template
         """
-        cls.get_instance()._logger.error(message)
+        cls.get_instance()._log(logging.ERROR, message, args)
     
     @classmethod
-    def log_debug(cls, message: str) -> None:
+    def log_debug(cls, message: str, *args: Any) -> None:
         """
         Log a debug message
         
         :param message: Debug message to log
+        :param args: Arguments for a %-style message template
         """
-        cls.get_instance()._logger.debug(message)
+        cls.get_instance()._log(logging.DEBUG, message, args)
     
     @classmethod
-    def log_warning(cls, message: str) -> None:
+    def log_warning(cls, message: str, *args: Any) -> None:
         """
         Log a warning message
         
         :param message: Warning message to log
+        :param args: Arguments for a %-style message template
         """
-        cls.get_instance()._logger.warning(message)
+        cls.get_instance()._log(logging.WARNING, message, args)
     
     @classmethod
     def log_request(cls, request: Dict[str, Any]) -> None:
@@ -109,8 +152,38 @@ class Logger:
         
         :param request: Request dictionary to log
         """
-        request_log = f"Request: {request.get('method', 'UNKNOWN')} {request.get('url', 'N/A')}"
-        cls.get_instance()._logger.info(request_log)
+        cls.get_instance()._log(
+            logging.INFO, "Request: %s %s",
+            (request.get('method', 'UNKNOWN'), request.get('url', 'N/A'))
+        )
+    
+    @classmethod
+    def flush(cls, timeout: float = 5.0) -> bool:
+        """
+        Wait until queued records are written (immediate in sync mode)
+        
+        :param timeout: Seconds to wait at most
+        :return: True if everything queued was written
+        """
+        writer = cls.get_instance()._writer
+        return writer.flush(timeout) if writer is not None else True
+    
+    @classmethod
+    def shutdown(cls) -> None:
+        """Write queued records and stop the background writer"""
+        if cls._instance is not None and cls._instance._writer is not None:
+            cls._instance._writer.stop()
+    
+    @classmethod
+    def stats(cls) -> Dict[str, int]:
+        """
+        Get background writer counters
+        
+        :return: queued, written, batches and dropped record counts (empty
+                 in sync mode)
+        """
+        writer = cls.get_instance()._writer
+        return writer.stats if writer is not None else {}
     
     @classmethod
     def configure(cls, log_level: Optional[str] = None) -> None:
@@ -16,8 +16,7 @@ class RequestLogger:
         :param method: HTTP method
         :param url: Requested URL
         """
-        log_message = f"Connection from {client_address}: {method} {url}"
-        Logger.log_info(log_message)
+        Logger.log_info("Connection from %s: %s %s", client_address, method, url)
     
     @staticmethod
     def log_error_response(client_address: str, error_code: int, error_message: str) -> None:
@@ -28,8 +27,7 @@ class RequestLogger:
         :param error_code: HTTP error code
         :param error_message: Error description
         """
-        log_message = f"Error Response to {client_address}: {error_code} - {error_message}"
-        Logger.log_error(log_message)
+        Logger.log_error("Error Response to %s: %s - %s", client_address, error_code, error_message)
     
     @staticmethod
     def log_cache_event(event_type: str, url: str) -> None:
@@ -39,5 +37,4 @@ class RequestLogger:
         :param event_type: Type of cache event (hit/miss/store)
         :param url: URL involved in cache event
         """
-        log_message = f"Cache {event_type}: {url}"
-        Logger.log_debug(log_message)
\ No newline at end of file
+        Logger.log_debug("Cache %s: %s", event_type, url)
\ No newline at end of file
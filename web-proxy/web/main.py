@@ -1,3 +1,4 @@
+from web.proxy.prefork import PreforkServer
 from web.proxy.server import ProxyServer
 from web.config.settings import ServerConfig
 from web.logging.logger import Logger
@@ -10,11 +11,18 @@ def main():
         # Configure logging
         Logger.configure(log_level=ServerConfig.LOG_LEVEL)
         
-        # Create and start proxy server
-        proxy_server = ProxyServer(
-            host=ServerConfig.HOST, 
-            port=ServerConfig.PORT
-        )
+        # Create and start proxy server, pre-forking workers if configured
+        if ServerConfig.WORKERS > 1:
+            proxy_server = PreforkServer(
+                host=ServerConfig.HOST, 
+                port=ServerConfig.PORT, 
+                workers=ServerConfig.WORKERS
+            )
+        else:
+            proxy_server = ProxyServer(
+                host=ServerConfig.HOST, 
+                port=ServerConfig.PORT
+            )
         
         Logger.log_info("Starting proxy server...")
         proxy_server.start()
@@ -0,0 +1,74 @@
+# web/proxy/admin_server.py
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+from web.config.settings import ServerConfig
+from web.logging.logger import Logger
+from web.utils.metrics import Metrics
+
+class _AdminRequestHandler(BaseHTTPRequestHandler):
+    """Answer scrapes of the metrics endpoint"""
+    
+    def do_GET(self) -> None:
+        """Serve /metrics in the Prometheus text format"""
+        if self.path.split('?', 1)[0] != '/metrics':
+            self.send_error(404)
+            return
+        
+        body = Metrics.render().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+    
+    def log_message(self, format: str, *args) -> None:
+        """Keep scrapes out of the access log"""
+
+
+class AdminServer:
+    """
+    Serve the proxy's metrics on a separate admin port
+    
+    Scrapes are answered by their own thread, apart from the proxy's
+    client connections, so a busy proxy can still be observed.
+    """
+    
+    def __init__(self, host: str = ServerConfig.ADMIN_HOST, port: int = 0):
+        """
+        Initialize admin server
+        
+        :param host: Interface to listen on
+        :param port: Port to listen on (0 picks a free one)
+        """
+        self._host = host
+        self._port = port
+        self._server: Optional[ThreadingHTTPServer] = None
+        self._thread: Optional[threading.Thread] = None
+    
+    def start(self) -> None:
+        """Bind the admin port and serve it in a background thread"""
+        if self._server is not None:
+            return
+        self._server = ThreadingHTTPServer((self._host, self._port), _AdminRequestHandler)
+        self._server.daemon_threads = True
+        self._port = self._server.server_address[1]
+        self._thread = threading.Thread(target=self._server.serve_forever, name='AdminServer', daemon=True)
+        self._thread.start()
+        Logger.log_info(f"Metrics served on http://{self._host}:{self._port}/metrics")
+    
+    def stop(self) -> None:
+        """Stop serving and release the admin port"""
+        # The proxy may be stopped from several threads at once
+        server, self._server = self._server, None
+        thread, self._thread = self._thread, None
+        if server is None:
+            return
+        server.shutdown()
+        server.server_close()
+        thread.join()
+    
+    @property
+    def port(self) -> int:
+        """Port the admin server listens on"""
+        return self._port
\ No newline at end of file
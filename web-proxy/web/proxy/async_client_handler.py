@@ -0,0 +1,320 @@
+import asyncio
+import socket
+from typing import Dict, Optional, Tuple
+from web.proxy.client_handler import ClientHandler
+from web.proxy.request_flow import Buffer, RequestFlow
+from web.proxy.request_parser import HTTPRequest, RequestParser
+from web.proxy.server_connector import AsyncServerConnector
+from web.proxy.tunnel import AsyncTunnel, Tunnel
+from web.config.settings import ServerConfig
+from web.cache.cache_manager import CacheManager
+from web.cache.refresh_worker import AsyncRefreshWorker
+from web.cache.single_flight import AsyncSingleFlight
+from web.config.cache_settings import CacheConfig
+from web.logging.logger import Logger
+from web.security.url_blocking import URLBlocker
+from web.utils.metrics import Metrics
+from web.utils.timer import StageTimer
+
+class AsyncClientHandler:
+    """Handle client connections and requests on the asyncio event loop"""
+    
+    def __init__(self, 
+                 cache_manager: Optional[CacheManager] = None, 
+                 url_blocker: Optional[URLBlocker] = None):
+        """
+        Initialize async client handler
+        
+        :param cache_manager: Cache to serve from (a private in-memory cache by default)
+        :param url_blocker: Blocklist to apply (the default blocklist by default)
+        """
+        self._flow = RequestFlow(
+            cache_manager if cache_manager is not None else CacheManager(),
+            url_blocker if url_blocker is not None else URLBlocker()
+        )
+        self._refresher = AsyncRefreshWorker()
+        self._flights = AsyncSingleFlight()
+    
+    async def handle_client(self,
+                            reader: asyncio.StreamReader,
+                            writer: asyncio.StreamWriter) -> None:
+        """
+        Handle individual client connection
+        
+        Requests are served one after another for as long as the client
+        keeps the connection open, as in ClientHandler.handle_client.
+        
+        :param reader: Client stream reader
+        :param writer: Client stream writer
+        """
+        parser = RequestParser()
+        try:
+            # As in ClientHandler; accepted sockets do not get this from asyncio
+            client_socket = writer.get_extra_info('socket')
+            if client_socket is not None:
+                client_socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            while True:
+                timer = StageTimer()
+                # Receive and parse client request, which may span several reads
+                parsed_request = await self._read_request(reader, parser, timer)
+                if not parsed_request:
+                    return
+                if parsed_request.method == 'CONNECT':
+                    await self._open_tunnel(reader, writer, parsed_request, parser.take_buffered(), timer)
+                    return
+                if not await self._serve_request(writer, parsed_request, timer):
+                    return
+        
+        except Exception as e:
+            Logger.log_error(f"Client handler error: {e}")
+            try:
+                await self._send(writer, ClientHandler.ERROR_RESPONSE)
+            except Exception:
+                pass
+        finally:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except Exception:
+                pass
+    
+    async def _serve_request(self, 
+                             writer: asyncio.StreamWriter, 
+                             parsed_request: HTTPRequest, 
+                             timer: StageTimer) -> bool:
+        """
+        Answer one request on a client connection
+        
+        :param writer: Client stream writer
+        :param parsed_request: Parsed client request
+        :param timer: Request timer, started when the request began to arrive
+        :return: True if the connection can carry another request
+        """
+        flow = self._flow
+        if flow.is_blocked(parsed_request, timer):
+            await self._send(writer, ClientHandler.BLOCKED_RESPONSE)
+            return False
+        keep_alive = flow.keep_alive(parsed_request)
+        
+        # Check cache, joining any fetch of the same key on a miss
+        lookup = flow.lookup(parsed_request, timer)
+        if lookup.refresh:
+            self._schedule_refresh(parsed_request, lookup.key, lookup.response)
+        if lookup.missed:
+            response, leader = await self._join_fetch(parsed_request, lookup.key)
+            flow.joined(lookup, parsed_request, response, leader, timer)
+        
+        try:
+            if lookup.response:
+                # Serve cached response
+                await self._send(writer, lookup.response)
+                persistent = flow.served_from_cache(parsed_request, lookup.response, keep_alive, timer)
+            else:
+                persistent = await self._relay_response(
+                    writer, parsed_request, lookup.key, lookup.stale, timer, keep_alive
+                )
+                if persistent is None:
+                    await self._send(writer, ClientHandler.ERROR_RESPONSE)
+        finally:
+            if lookup.leader:
+                self._flights.release(lookup.key)
+        
+        flow.record(parsed_request, timer)
+        return bool(persistent)
+    
+    async def _open_tunnel(self, 
+                           reader: asyncio.StreamReader, 
+                           writer: asyncio.StreamWriter, 
+                           parsed_request: HTTPRequest, 
+                           pending: bytes, 
+                           timer: StageTimer) -> None:
+        """
+        Connect the client to the target of a CONNECT request and relay
+        bytes both ways until the tunnel ends
+        
+        :param reader: Client stream reader
+        :param writer: Client stream writer
+        :param parsed_request: Parsed CONNECT request
+        :param pending: Bytes the client sent after the request
+        :param timer: Request timer, recorded once the tunnel is established
+        """
+        if self._flow.is_blocked(parsed_request, timer):
+            await self._send(writer, ClientHandler.BLOCKED_RESPONSE)
+            return
+        if not Tunnel.allows_port(parsed_request.port):
+            Metrics.increment('proxy_tunnels_total', result='forbidden')
+            await self._send(writer, Tunnel.FORBIDDEN_PORT_RESPONSE)
+            return
+        
+        server = await AsyncServerConnector.connect_to_server(parsed_request.host, parsed_request.port)
+        timer.lap('upstream_connect')
+        if server is None:
+            Metrics.increment('proxy_tunnels_total', result='unreachable')
+            await self._send(writer, Tunnel.BAD_GATEWAY_RESPONSE)
+            return
+        
+        server_reader, server_writer = server
+        try:
+            await self._send(writer, Tunnel.ESTABLISHED_RESPONSE)
+            timer.lap('client_send')
+            self._flow.record(parsed_request, timer)
+            await AsyncTunnel(reader, writer, server_reader, server_writer).relay(pending)
+        finally:
+            server_writer.close()
+    
+    def metrics(self) -> Dict[str, float]:
+        """
+        Get the state of the cache served from, for the metrics endpoint
+        
+        :return: Current values by metric name
+        """
+        return self._flow.cache_policy.metrics()
+    
+    def _schedule_refresh(self, 
+                          parsed_request: HTTPRequest, 
+                          cache_key: str, 
+                          stored: Buffer) -> None:
+        """
+        Refresh a cached response in the background
+        
+        :param parsed_request: Request the cached response answers
+        :param cache_key: Cache key of the response
+        :param stored: Currently cached response
+        """
+        self._refresher.submit(
+            cache_key,
+            lambda: self._refresh_entry(parsed_request, cache_key, stored)
+        )
+    
+    async def _refresh_entry(self, 
+                             parsed_request: HTTPRequest, 
+                             cache_key: str, 
+                             stored: Buffer) -> None:
+        """
+        Fetch a cached response again, conditionally when it has validators
+        
+        :param parsed_request: Request the cached response answers
+        :param cache_key: Cache key of the response
+        :param stored: Currently cached response
+        """
+        request, revalidating = self._flow.upstream_request(parsed_request, stored)
+        for host, port in RequestFlow.upstreams(parsed_request):
+            if not host:
+                continue
+            response = await AsyncServerConnector.fetch(host, request, port=port)
+            if response is not None:
+                self._flow.refreshed(parsed_request, cache_key, stored, revalidating, response)
+                return
+    
+    async def _join_fetch(self, 
+                          parsed_request: HTTPRequest, 
+                          key: str) -> Tuple[Optional[Buffer], bool]:
+        """
+        Coalesce a cache miss with any fetch of the same key in flight
+        
+        :param parsed_request: Missed request
+        :param key: Cache key of the missed request
+        :return: (response cached by the in-flight fetch, whether this
+                 request leads and must fetch itself)
+        """
+        if self._flights.acquire(key):
+            return None, True
+        
+        # Another client is fetching this URL; serve what it caches
+        if await self._flights.wait(key, CacheConfig.COALESCE_WAIT_TIMEOUT):
+            return self._flow.cached_after_wait(parsed_request, key), False
+        return None, False
+    
+    async def _read_request(self, 
+                            reader: asyncio.StreamReader, 
+                            parser: RequestParser, 
+                            timer: Optional[StageTimer] = None) -> Optional[HTTPRequest]:
+        """
+        Read from the client until a complete request is buffered
+        
+        :param reader: Client stream reader
+        :param parser: Incremental parser holding any buffered bytes
+        :param timer: Request timer, restarted when a new request begins
+                      to arrive so that idle time is not counted
+        :return: Parsed request or None if the client closed the connection
+                 or stayed idle too long
+        """
+        while True:
+            parsed_request = parser.next_request()
+            if parsed_request:
+                return parsed_request
+            
+            idle = not parser.buffered
+            try:
+                data = await asyncio.wait_for(
+                    reader.read(ServerConfig.BUFFER_SIZE),
+                    timeout=ServerConfig.KEEP_ALIVE_TIMEOUT if idle else ServerConfig.READ_TIMEOUT
+                )
+            except asyncio.TimeoutError:
+                return None
+            if not data:
+                return None
+            if idle and timer is not None:
+                timer.restart()
+            parser.feed(data)
+    
+    async def _relay_response(self, 
+                              writer: asyncio.StreamWriter, 
+                              parsed_request: HTTPRequest, 
+                              cache_key: Optional[str] = None, 
+                              stale: Optional[Buffer] = None, 
+                              timer: Optional[StageTimer] = None, 
+                              keep_alive: bool = True) -> Optional[bool]:
+        """
+        Stream the upstream response to the client as it arrives, as
+        ClientHandler._relay_response does
+        
+        :param writer: Client stream writer
+        :param parsed_request: Parsed client request
+        :param cache_key: Cache key of the request (None if not cacheable)
+        :param stale: Expired cached response to revalidate
+        :param timer: Request timer the upstream and client stages are lapped on
+        :param keep_alive: Whether the client wants the connection kept open
+        :return: None if no response was sent to the client, otherwise
+                 whether the connection can carry another request
+        """
+        if timer is None:
+            timer = StageTimer()
+        request, revalidating = self._flow.upstream_request(parsed_request, stale)
+        
+        for host, port in RequestFlow.upstreams(parsed_request):
+            if not host:
+                continue
+            
+            relay = self._flow.relay(parsed_request, cache_key, stale, revalidating, keep_alive)
+            try:
+                async for chunk in AsyncServerConnector.stream(host, request, port=port, timer=timer):
+                    timer.lap('upstream_transfer')
+                    data = relay.feed(chunk)
+                    if data is not None:
+                        # drain() applies backpressure from slow clients
+                        await self._send(writer, data)
+                        timer.lap('client_send')
+                        relay.sent_to_client(data)
+            except Exception as relay_error:
+                if relay.sent:
+                    Logger.log_error(f"Relay error from {host}:{port}: {relay_error}")
+                    return False
+                if relay.not_modified is None:
+                    raise
+            finally:
+                relay.count_relayed()
+            
+            data, persistent = relay.finish()
+            if data:
+                await self._send(writer, data)
+                timer.lap('client_send')
+            if persistent is not None:
+                return persistent
+        
+        return None
+    
+    async def _send(self, writer: asyncio.StreamWriter, data: bytes) -> None:
+        """Write data to the client and wait for the transport to drain"""
+        writer.write(data)
+        await writer.drain()
\ No newline at end of file
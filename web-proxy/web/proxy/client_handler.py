@@ -1,85 +1,69 @@
 import socket
-from typing import Tuple
-from web.proxy.request_parser import RequestParser
+from typing import Dict, Optional, Tuple
+from web.proxy.request_flow import Buffer, RequestFlow
+from web.proxy.request_parser import HTTPRequest, RequestParser
 from web.proxy.server_connector import ServerConnector
+from web.proxy.tunnel import Tunnel
 from web.config.settings import ServerConfig
 from web.cache.cache_manager import CacheManager
+from web.cache.refresh_worker import RefreshWorker
+from web.cache.single_flight import SingleFlight
+from web.config.cache_settings import CacheConfig
 from web.logging.logger import Logger
 from web.security.url_blocking import URLBlocker
+from web.utils.metrics import Metrics
+from web.utils.timer import StageTimer
 
 class ClientHandler:
     """Handle client connections and requests"""
     
-    def __init__(self):
-        """Initialize client handler"""
-        self._cache_manager = CacheManager()
-        self._url_blocker = URLBlocker()
+    BLOCKED_RESPONSE = b"HTTP/1.1 403 Forbidden\r\nContent-Type: text/plain\r\n\r\nURL is blocked"
+    ERROR_RESPONSE = b"HTTP/1.1 500 Internal Server Error\r\nContent-Type: text/plain\r\n\r\nProxy error occurred"
+    
+    def __init__(self, 
+                 cache_manager: Optional[CacheManager] = None, 
+                 url_blocker: Optional[URLBlocker] = None):
+        """
+        Initialize client handler
+        
+        :param cache_manager: Cache to serve from (a private in-memory cache by default)
+        :param url_blocker: Blocklist to apply (the default blocklist by default)
+        """
+        self._flow = RequestFlow(
+            cache_manager if cache_manager is not None else CacheManager(),
+            url_blocker if url_blocker is not None else URLBlocker()
+        )
+        self._refresher = RefreshWorker()
+        self._flights = SingleFlight()
     
     def handle_client(self, client_socket: socket.socket) -> None:
         """
         Handle individual client connection
         
+        Requests are served one after another for as long as the client
+        keeps the connection open, including pipelined requests that
+        arrived in one read. The connection is closed when a request or
+        response asks for it, when a response's end is only marked by the
+        close, or after KEEP_ALIVE_TIMEOUT idle seconds.
+        
         :param client_socket: Connected client socket
         """
+        parser = RequestParser()
         try:
-            # Receive client request
-            request = client_socket.recv(ServerConfig.BUFFER_SIZE)
-            print(request)
-
-            # Parse request
-            parsed_request = RequestParser.parse_request(request)
-            print(parsed_request)
-            
-            # Check URL blocking
-            if self._url_blocker.is_blocked(parsed_request.get('url', '')):
-                self._send_blocked_response(client_socket)
-                return
-            
-            # Check cache
-            response = None
-            if ServerConfig.ENABLE_CACHING:
-                response = self._cache_manager.retrieve(parsed_request.get('url', ''))
-            
-            # If cache is not available, try localhost
-            if not response:
-                try:
-                    # Attempt to fetch from localhost
-                    localhost_socket = ServerConnector.connect_to_server('localhost', port=7070)
-                    if localhost_socket:
-                        response = ServerConnector.send_request(localhost_socket, request)
-                        localhost_socket.close()
-                except Exception as localhost_error:
-                    Logger.log_error(f"Localhost fetch error: {localhost_error}")
-            
-            # If localhost fails, connect to target server
-            if not response:
-                server_socket = ServerConnector.connect_to_server(
-                    parsed_request.get('host', ''),
-                    port=443 if parsed_request.get('scheme') == 'https' else 80
-                )
-                
-                if not server_socket:
-                    self._send_error_response(client_socket)
+            # Responses go out in several writes; Nagle's algorithm would hold
+            # the last one back until the client acknowledges the previous
+            client_socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            while True:
+                timer = StageTimer()
+                # Receive and parse client request, which may span several reads
+                parsed_request = self._read_request(client_socket, parser, timer)
+                if not parsed_request:
+                    return
+                if parsed_request.method == 'CONNECT':
+                    self._open_tunnel(client_socket, parsed_request, parser.take_buffered(), timer)
+                    return
+                if not self._serve_request(client_socket, parsed_request, timer):
                     return
-                
-                # Forward request and get response
-                response = ServerConnector.send_request(server_socket, request)
-            
-            if response:
-                # Cache response if enabled and not already in cache
-                if ServerConfig.ENABLE_CACHING:
-                    self._cache_manager.cache(
-                        parsed_request.get('url', ''), 
-                        response
-                    )
-                
-                # Send response to client
-                client_socket.sendall(response)
-            else:
-                self._send_error_response(client_socket)
-            
-            # Log request
-            Logger.log_request(parsed_request)
         
         except Exception as e:
             Logger.log_error(f"Client handler error: {e}")
@@ -87,12 +71,248 @@ class ClientHandler:
         finally:
             client_socket.close()
     
+    def _serve_request(self, 
+                       client_socket: socket.socket, 
+                       parsed_request: HTTPRequest, 
+                       timer: StageTimer) -> bool:
+        """
+        Answer one request on a client connection
+        
+        :param client_socket: Connected client socket
+        :param parsed_request: Parsed client request
+        :param timer: Request timer, started when the request began to arrive
+        :return: True if the connection can carry another request
+        """
+        flow = self._flow
+        if flow.is_blocked(parsed_request, timer):
+            self._send_blocked_response(client_socket)
+            return False
+        keep_alive = flow.keep_alive(parsed_request)
+        
+        # Check cache, joining any fetch of the same key on a miss
+        lookup = flow.lookup(parsed_request, timer)
+        if lookup.refresh:
+            self._schedule_refresh(parsed_request, lookup.key, lookup.response)
+        if lookup.missed:
+            response, leader = self._join_fetch(parsed_request, lookup.key)
+            flow.joined(lookup, parsed_request, response, leader, timer)
+        
+        try:
+            if lookup.response:
+                # Serve cached response
+                client_socket.sendall(lookup.response)
+                persistent = flow.served_from_cache(parsed_request, lookup.response, keep_alive, timer)
+            else:
+                persistent = self._relay_response(
+                    client_socket, parsed_request, lookup.key, lookup.stale, timer, keep_alive
+                )
+                if persistent is None:
+                    self._send_error_response(client_socket)
+        finally:
+            if lookup.leader:
+                self._flights.release(lookup.key)
+        
+        flow.record(parsed_request, timer)
+        return bool(persistent)
+    
+    def _open_tunnel(self, 
+                     client_socket: socket.socket, 
+                     parsed_request: HTTPRequest, 
+                     pending: bytes, 
+                     timer: StageTimer) -> None:
+        """
+        Connect the client to the target of a CONNECT request and relay
+        bytes both ways until the tunnel ends
+        
+        :param client_socket: Connected client socket
+        :param parsed_request: Parsed CONNECT request
+        :param pending: Bytes the client sent after the request
+        :param timer: Request timer, recorded once the tunnel is established
+        """
+        if self._flow.is_blocked(parsed_request, timer):
+            self._send_blocked_response(client_socket)
+            return
+        if not Tunnel.allows_port(parsed_request.port):
+            Metrics.increment('proxy_tunnels_total', result='forbidden')
+            client_socket.sendall(Tunnel.FORBIDDEN_PORT_RESPONSE)
+            return
+        
+        server_socket = ServerConnector.connect_to_server(parsed_request.host, parsed_request.port)
+        timer.lap('upstream_connect')
+        if server_socket is None:
+            Metrics.increment('proxy_tunnels_total', result='unreachable')
+            client_socket.sendall(Tunnel.BAD_GATEWAY_RESPONSE)
+            return
+        
+        try:
+            client_socket.sendall(Tunnel.ESTABLISHED_RESPONSE)
+            timer.lap('client_send')
+            self._flow.record(parsed_request, timer)
+            Tunnel(client_socket, server_socket).relay(pending)
+        finally:
+            server_socket.close()
+    
+    def metrics(self) -> Dict[str, float]:
+        """
+        Get the state of the cache served from, for the metrics endpoint
+        
+        :return: Current values by metric name
+        """
+        return self._flow.cache_policy.metrics()
+    
+    def _schedule_refresh(self, 
+                          parsed_request: HTTPRequest, 
+                          cache_key: str, 
+                          stored: Buffer) -> None:
+        """
+        Refresh a cached response in the background
+        
+        :param parsed_request: Request the cached response answers
+        :param cache_key: Cache key of the response
+        :param stored: Currently cached response
+        """
+        self._refresher.submit(
+            cache_key,
+            lambda: self._refresh_entry(parsed_request, cache_key, stored)
+        )
+    
+    def _refresh_entry(self, 
+                       parsed_request: HTTPRequest, 
+                       cache_key: str, 
+                       stored: Buffer) -> None:
+        """
+        Fetch a cached response again, conditionally when it has validators
+        
+        :param parsed_request: Request the cached response answers
+        :param cache_key: Cache key of the response
+        :param stored: Currently cached response
+        """
+        request, revalidating = self._flow.upstream_request(parsed_request, stored)
+        for host, port in RequestFlow.upstreams(parsed_request):
+            if not host:
+                continue
+            response = ServerConnector.fetch(host, request, port=port)
+            if response is not None:
+                self._flow.refreshed(parsed_request, cache_key, stored, revalidating, response)
+                return
+    
+    def _join_fetch(self, 
+                    parsed_request: HTTPRequest, 
+                    key: str) -> Tuple[Optional[Buffer], bool]:
+        """
+        Coalesce a cache miss with any fetch of the same key in flight
+        
+        :param parsed_request: Missed request
+        :param key: Cache key of the missed request
+        :return: (response cached by the in-flight fetch, whether this
+                 request leads and must fetch itself)
+        """
+        if self._flights.acquire(key):
+            return None, True
+        
+        # Another thread is fetching this URL; serve what it caches
+        if self._flights.wait(key, CacheConfig.COALESCE_WAIT_TIMEOUT):
+            return self._flow.cached_after_wait(parsed_request, key), False
+        return None, False
+    
+    def _read_request(self, 
+                      client_socket: socket.socket, 
+                      parser: RequestParser, 
+                      timer: Optional[StageTimer] = None) -> Optional[HTTPRequest]:
+        """
+        Read from the client until a complete request is buffered
+        
+        :param client_socket: Connected client socket
+        :param parser: Incremental parser holding any buffered bytes
+        :param timer: Request timer, restarted when a new request begins
+                      to arrive so that idle time is not counted
+        :return: Parsed request or None if the client closed the connection
+                 or stayed idle too long
+        """
+        buffer = bytearray(ServerConfig.BUFFER_SIZE)
+        view = memoryview(buffer)
+        while True:
+            parsed_request = parser.next_request()
+            if parsed_request:
+                # Sending the response may take longer than an idle client may wait
+                client_socket.settimeout(ServerConfig.READ_TIMEOUT)
+                return parsed_request
+            
+            idle = not parser.buffered
+            client_socket.settimeout(ServerConfig.KEEP_ALIVE_TIMEOUT if idle else ServerConfig.READ_TIMEOUT)
+            try:
+                received = client_socket.recv_into(buffer)
+            except socket.timeout:
+                return None
+            if not received:
+                return None
+            if idle and timer is not None:
+                timer.restart()
+            parser.feed(view[:received])
+    
+    def _relay_response(self, 
+                        client_socket: socket.socket, 
+                        parsed_request: HTTPRequest, 
+                        cache_key: Optional[str] = None, 
+                        stale: Optional[Buffer] = None, 
+                        timer: Optional[StageTimer] = None, 
+                        keep_alive: bool = True) -> Optional[bool]:
+        """
+        Stream the upstream response to the client as it arrives,
+        teeing it into the cache when the request is cacheable
+        
+        With a stale cached response the request is sent conditionally;
+        a 304 refreshes and serves the stored response instead.
+        
+        :param client_socket: Connected client socket
+        :param parsed_request: Parsed client request
+        :param cache_key: Cache key of the request (None if not cacheable)
+        :param stale: Expired cached response to revalidate
+        :param timer: Request timer the upstream and client stages are lapped on
+        :param keep_alive: Whether the client wants the connection kept open
+        :return: None if no response was sent to the client, otherwise
+                 whether the connection can carry another request
+        """
+        if timer is None:
+            timer = StageTimer()
+        request, revalidating = self._flow.upstream_request(parsed_request, stale)
+        
+        for host, port in RequestFlow.upstreams(parsed_request):
+            if not host:
+                continue
+            
+            relay = self._flow.relay(parsed_request, cache_key, stale, revalidating, keep_alive)
+            try:
+                for chunk in ServerConnector.stream(host, request, port=port, timer=timer):
+                    timer.lap('upstream_transfer')
+                    data = relay.feed(chunk)
+                    if data is not None:
+                        client_socket.sendall(data)
+                        timer.lap('client_send')
+                        relay.sent_to_client(data)
+            except Exception as relay_error:
+                if relay.sent:
+                    # Response is truncated; the client sees the connection close
+                    Logger.log_error(f"Relay error from {host}:{port}: {relay_error}")
+                    return False
+                if relay.not_modified is None:
+                    raise
+            finally:
+                relay.count_relayed()
+            
+            data, persistent = relay.finish()
+            if data:
+                client_socket.sendall(data)
+                timer.lap('client_send')
+            if persistent is not None:
+                return persistent
+        
+        return None
+    
     def _send_blocked_response(self, socket: socket.socket) -> None:
         """Send response for blocked URL"""
-        response = b"HTTP/1.1 403 Forbidden\r\nContent-Type: text/plain\r\n\r\nURL is blocked"
-        socket.sendall(response)
+        socket.sendall(self.BLOCKED_RESPONSE)
     
     def _send_error_response(self, socket: socket.socket) -> None:
         """Send error response"""
-        response = b"HTTP/1.1 500 Internal Server Error\r\nContent-Type: text/plain\r\n\r\nProxy error occurred"
-        socket.sendall(response)
\ No newline at end of file
+        socket.sendall(self.ERROR_RESPONSE)
\ No newline at end of file
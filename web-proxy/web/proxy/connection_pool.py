@@ -0,0 +1,297 @@
+# web/proxy/connection_pool.py
+import asyncio
+import select
+import socket
+import threading
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional, Tuple
+from web.config.settings import ServerConfig
+
+PoolKey = Tuple[str, int, bool]
+
+class _PoolState:
+    """
+    Bookkeeping shared by the threaded and asyncio pools
+    
+    Idle connections are kept per (host, port, use_ssl) key in a deque
+    ordered by release time, so reaping only ever looks at the oldest end.
+    Every key is reaped at most once per REAP_INTERVAL, on whichever
+    acquire or release comes first, so origins that are not asked for
+    again do not keep their sockets open.
+    """
+    
+    REAP_INTERVAL = 1.0  # seconds
+    
+    def __init__(self,
+                 max_idle_per_host: int,
+                 max_per_host: int,
+                 idle_timeout: float):
+        self._max_idle_per_host = max_idle_per_host
+        self._max_per_host = max_per_host
+        self._idle_timeout = idle_timeout
+        self._idle: Dict[PoolKey, Deque[Tuple[float, Any]]] = {}
+        self._in_use: Dict[PoolKey, int] = {}
+        self._next_reap = time.monotonic() + self.REAP_INTERVAL
+    
+    def _reap(self, key: PoolKey, now: float) -> None:
+        """Close idle connections for a key that exceeded the idle timeout"""
+        idle = self._idle.get(key)
+        while idle and now - idle[0][0] > self._idle_timeout:
+            _, conn = idle.popleft()
+            self._close(conn)
+    
+    def _pop_idle(self, key: PoolKey) -> Optional[Any]:
+        """Return the most recently released healthy connection, if any"""
+        now = time.monotonic()
+        self._reap(key, now)
+        self._reap_due(now)
+        idle = self._idle.get(key)
+        while idle:
+            _, conn = idle.pop()
+            if self._is_healthy(conn):
+                return conn
+            self._close(conn)
+        return None
+    
+    def _has_capacity(self, key: PoolKey) -> bool:
+        """Check whether another connection may be opened for a key"""
+        total = self._in_use.get(key, 0) + len(self._idle.get(key, ()))
+        return total < self._max_per_host
+    
+    def _put_idle(self, key: PoolKey, conn: Any, reusable: bool) -> None:
+        """Return a connection to the idle set or close it"""
+        in_use = self._in_use.get(key, 0) - 1
+        if in_use > 0:
+            self._in_use[key] = in_use
+        else:
+            self._in_use.pop(key, None)
+        self._reap_due(time.monotonic())
+        if conn is None:
+            return
+        idle = self._idle.setdefault(key, deque())
+        if reusable and len(idle) < self._max_idle_per_host:
+            idle.append((time.monotonic(), conn))
+        else:
+            self._close(conn)
+    
+    def _reap_due(self, now: float) -> None:
+        """Reap every key if REAP_INTERVAL has passed since the last time"""
+        if now >= self._next_reap:
+            self._next_reap = now + self.REAP_INTERVAL
+            self.reap_idle()
+    
+    def reap_idle(self) -> None:
+        """Close idle connections for every key that exceeded the idle timeout"""
+        now = time.monotonic()
+        for key in list(self._idle):
+            self._reap(key, now)
+            if not self._idle[key]:
+                del self._idle[key]
+    
+    def close_all(self) -> None:
+        """Close every idle connection"""
+        for idle in self._idle.values():
+            while idle:
+                self._close(idle.pop()[1])
+        self._idle.clear()
+    
+    def idle_count(self, host: str, port: int, use_ssl: bool = False) -> int:
+        """
+        Get number of idle pooled connections for an origin
+        
+        :return: Idle connection count
+        """
+        return len(self._idle.get((host, port, use_ssl), ()))
+    
+    def _is_healthy(self, conn: Any) -> bool:
+        raise NotImplementedError
+    
+    def _close(self, conn: Any) -> None:
+        raise NotImplementedError
+
+
+class ConnectionPool(_PoolState):
+    """
+    Thread-safe keep-alive pool of upstream sockets
+    keyed by (host, port, use_ssl)
+    
+    Waiters for every origin share one condition, so a release wakes
+    them all and each rechecks its own origin.
+    """
+    
+    def __init__(self,
+                 connect: Callable[[str, int, bool], Optional[socket.socket]],
+                 max_idle_per_host: int = ServerConfig.POOL_MAX_IDLE_PER_HOST,
+                 max_per_host: int = ServerConfig.POOL_MAX_PER_HOST,
+                 idle_timeout: float = ServerConfig.POOL_IDLE_TIMEOUT):
+        """
+        Initialize connection pool
+        
+        :param connect: Factory opening a new connection (host, port, use_ssl)
+        :param max_idle_per_host: Maximum idle connections kept per origin
+        :param max_per_host: Maximum open connections (idle + in use) per origin
+        :param idle_timeout: Seconds an idle connection may stay pooled
+        """
+        super().__init__(max_idle_per_host, max_per_host, idle_timeout)
+        self._connect = connect
+        self._lock = threading.Condition()
+    
+    def acquire(self,
+                host: str,
+                port: int,
+                use_ssl: bool = False) -> Optional[Tuple[socket.socket, bool]]:
+        """
+        Check out a connection, reusing an idle one when possible
+        
+        Blocks up to CONNECTION_TIMEOUT when the origin is at max_per_host.
+        
+        :return: (socket, reused) or None if no connection could be made
+        """
+        key = (host, port, use_ssl)
+        deadline = time.monotonic() + ServerConfig.CONNECTION_TIMEOUT
+        
+        with self._lock:
+            while True:
+                conn = self._pop_idle(key)
+                if conn is not None:
+                    self._in_use[key] = self._in_use.get(key, 0) + 1
+                    return conn, True
+                
+                if self._has_capacity(key):
+                    self._in_use[key] = self._in_use.get(key, 0) + 1
+                    break
+                
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return None
+                self._lock.wait(remaining)
+        
+        # Connect outside the lock so other origins are not held up
+        conn = self._connect(host, port, use_ssl)
+        if conn is None:
+            self.release(host, port, use_ssl, None, reusable=False)
+            return None
+        return conn, False
+    
+    def release(self,
+                host: str,
+                port: int,
+                use_ssl: bool,
+                conn: Optional[socket.socket],
+                reusable: bool) -> None:
+        """
+        Return a checked out connection to the pool
+        
+        :param conn: Connection being returned (None if it was lost)
+        :param reusable: Whether the connection can serve another request
+        """
+        with self._lock:
+            self._put_idle((host, port, use_ssl), conn, reusable)
+            self._lock.notify_all()
+    
+    def close_all(self) -> None:
+        """Close every idle connection"""
+        with self._lock:
+            super().close_all()
+    
+    def _is_healthy(self, conn: socket.socket) -> bool:
+        """
+        An idle HTTP connection must have nothing to read: readable
+        means the origin closed it or sent unsolicited data
+        """
+        try:
+            # poll() is not limited to descriptors below FD_SETSIZE
+            if hasattr(select, 'poll'):
+                poller = select.poll()
+                poller.register(conn, select.POLLIN)
+                return not poller.poll(0)
+            readable, _, _ = select.select([conn], [], [], 0)
+            return not readable
+        except (OSError, ValueError):
+            return False
+    
+    def _close(self, conn: socket.socket) -> None:
+        try:
+            conn.close()
+        except OSError:
+            pass
+
+
+class AsyncConnectionPool(_PoolState):
+    """
+    Keep-alive pool of upstream stream pairs for the asyncio event loop
+    """
+    
+    def __init__(self,
+                 connect: Callable[[str, int, bool], Awaitable[Optional[Tuple[asyncio.StreamReader, asyncio.StreamWriter]]]],
+                 max_idle_per_host: int = ServerConfig.POOL_MAX_IDLE_PER_HOST,
+                 max_per_host: int = ServerConfig.POOL_MAX_PER_HOST,
+                 idle_timeout: float = ServerConfig.POOL_IDLE_TIMEOUT):
+        """
+        Initialize async connection pool
+        
+        :param connect: Coroutine factory opening a new connection (host, port, use_ssl)
+        :param max_idle_per_host: Maximum idle connections kept per origin
+        :param max_per_host: Maximum open connections (idle + in use) per origin
+        :param idle_timeout: Seconds an idle connection may stay pooled
+        """
+        super().__init__(max_idle_per_host, max_per_host, idle_timeout)
+        self._connect = connect
+        self._condition = asyncio.Condition()
+    
+    async def acquire(self,
+                      host: str,
+                      port: int,
+                      use_ssl: bool = False) -> Optional[Tuple[Tuple[asyncio.StreamReader, asyncio.StreamWriter], bool]]:
+        """
+        Check out a connection, reusing an idle one when possible
+        
+        :return: ((reader, writer), reused) or None if no connection could be made
+        """
+        key = (host, port, use_ssl)
+        
+        async with self._condition:
+            try:
+                await asyncio.wait_for(
+                    self._condition.wait_for(
+                        lambda: self._idle.get(key) or self._has_capacity(key)
+                    ),
+                    timeout=ServerConfig.CONNECTION_TIMEOUT
+                )
+            except asyncio.TimeoutError:
+                return None
+            
+            self._in_use[key] = self._in_use.get(key, 0) + 1
+            conn = self._pop_idle(key)
+            if conn is not None:
+                return conn, True
+        
+        conn = await self._connect(host, port, use_ssl)
+        if conn is None:
+            await self.release(host, port, use_ssl, None, reusable=False)
+            return None
+        return conn, False
+    
+    async def release(self,
+                      host: str,
+                      port: int,
+                      use_ssl: bool,
+                      conn: Optional[Tuple[asyncio.StreamReader, asyncio.StreamWriter]],
+                      reusable: bool) -> None:
+        """
+        Return a checked out connection to the pool
+        
+        :param conn: (reader, writer) being returned (None if it was lost)
+        :param reusable: Whether the connection can serve another request
+        """
+        async with self._condition:
+            self._put_idle((host, port, use_ssl), conn, reusable)
+            self._condition.notify_all()
+    
+    def _is_healthy(self, conn: Tuple[asyncio.StreamReader, asyncio.StreamWriter]) -> bool:
+        reader, writer = conn
+        return not (reader.at_eof() or writer.is_closing())
+    
+    def _close(self, conn: Tuple[asyncio.StreamReader, asyncio.StreamWriter]) -> None:
+        conn[1].close()
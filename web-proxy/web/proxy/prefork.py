@@ -0,0 +1,180 @@
+import os
+import signal
+import socket
+import threading
+import time
+from typing import Dict, Optional
+
+from web.cache.cache_manager import CacheManager
+from web.config.cache_settings import CacheConfig
+from web.config.settings import ServerConfig
+from web.logging.logger import Logger
+from web.proxy.server import ProxyServer
+
+class PreforkServer:
+    """
+    Pre-forking master running one ProxyServer per worker process
+    
+    Workers either bind the port themselves with SO_REUSEPORT, letting
+    the kernel spread connections between them, or accept from a single
+    listening socket inherited from the master. The master only
+    supervises: it restarts workers that exit unexpectedly and passes
+    SIGTERM/SIGINT on to them at shutdown. With a shared cache every
+    worker serves from the same disk cache instead of a cold private one.
+    """
+    
+    def __init__(self,
+                 host: str = ServerConfig.HOST,
+                 port: int = ServerConfig.PORT,
+                 workers: int = ServerConfig.WORKERS,
+                 mode: str = ServerConfig.SERVER_MODE,
+                 reuse_port: bool = ServerConfig.REUSE_PORT,
+                 shared_cache: bool = ServerConfig.SHARED_CACHE,
+                 cache_directory: str = CacheConfig.DISK_CACHE_DIR):
+        """
+        Initialize pre-fork master
+        
+        :param host: Server host
+        :param port: Server port
+        :param workers: Number of worker processes
+        :param mode: Serving mode of each worker ('asyncio' or 'threaded')
+        :param reuse_port: Let workers bind with SO_REUSEPORT when the
+                           platform supports it
+        :param shared_cache: Serve every worker from one disk cache
+        :param cache_directory: Directory of the shared disk cache
+        """
+        self._host = host
+        self._port = port
+        self._worker_count = workers
+        self._mode = mode
+        self._reuse_port = reuse_port and hasattr(socket, 'SO_REUSEPORT')
+        self._shared_cache = shared_cache
+        self._cache_directory = cache_directory
+        self._listen_socket: Optional[socket.socket] = None
+        self._is_running = False
+        
+        # Worker index by pid, and when each index was last started
+        self._workers: Dict[int, int] = {}
+        self._started: Dict[int, float] = {}
+    
+    def start(self) -> None:
+        """Fork the workers and supervise them until stopped"""
+        if not self._reuse_port:
+            self._listen_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            self._listen_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            self._listen_socket.bind((self._host, self._port))
+            self._listen_socket.listen(ServerConfig.MAX_CONNECTIONS)
+        
+        self._is_running = True
+        previous_handlers = {
+            signum: signal.signal(signum, self._handle_signal)
+            for signum in (signal.SIGTERM, signal.SIGINT)
+        }
+        Logger.log_info(
+            f"Pre-fork master {os.getpid()} starting {self._worker_count} workers "
+            f"on {self._host}:{self._port} ({'SO_REUSEPORT' if self._reuse_port else 'shared socket'})"
+        )
+        
+        try:
+            for index in range(self._worker_count):
+                self._spawn(index)
+            self._supervise()
+        finally:
+            self.stop()
+            for signum, handler in previous_handlers.items():
+                signal.signal(signum, handler)
+            if self._listen_socket is not None:
+                self._listen_socket.close()
+                self._listen_socket = None
+            Logger.log_info("Pre-fork master stopped")
+    
+    def stop(self) -> None:
+        """Ask every worker to shut down; start() returns once they have"""
+        self._is_running = False
+        for pid in list(self._workers):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+    
+    def _handle_signal(self, signum: int, frame) -> None:
+        """Stop the workers on SIGTERM/SIGINT"""
+        self.stop()
+    
+    def _supervise(self) -> None:
+        """Reap workers, restarting those that exit while the server runs"""
+        while self._workers:
+            try:
+                pid, status = os.wait()
+            except ChildProcessError:
+                break
+            
+            index = self._workers.pop(pid, None)
+            if index is None or not self._is_running:
+                continue
+            
+            Logger.log_error(
+                f"Worker {index} (pid {pid}) exited with status "
+                f"{os.waitstatus_to_exitcode(status)}; restarting"
+            )
+            # Back off instead of fork-looping on a worker that dies at startup
+            if time.monotonic() - self._started[index] < ServerConfig.WORKER_RESTART_DELAY:
+                time.sleep(ServerConfig.WORKER_RESTART_DELAY)
+            if self._is_running:
+                self._spawn(index)
+    
+    def _spawn(self, index: int) -> None:
+        """Fork worker process number index"""
+        pid = os.fork()
+        if pid == 0:
+            exit_code = 0
+            try:
+                self._run_worker(index)
+            except BaseException as e:
+                Logger.log_error(f"Worker {index} error: {e}")
+                exit_code = 1
+            finally:
+                # os._exit skips atexit, so write out queued log records first
+                Logger.shutdown()
+                # Never return into the master's stack
+                os._exit(exit_code)
+        
+        self._workers[pid] = index
+        self._started[index] = time.monotonic()
+    
+    def _run_worker(self, index: int) -> None:
+        """Serve connections in a worker until it is told to stop"""
+        # The master's handlers were inherited; until the server exists a
+        # signal simply ends the worker
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        signal.signal(signal.SIGINT, signal.SIG_DFL)
+        
+        cache_manager = None
+        if self._shared_cache:
+            cache_manager = CacheManager(
+                storage_type=CacheConfig.STORAGE_DISK,
+                disk_directory=self._cache_directory,
+                shared=True
+            )
+        server = ProxyServer(
+            host=self._host,
+            port=self._port,
+            mode=self._mode,
+            reuse_port=self._reuse_port,
+            listen_socket=self._listen_socket,
+            cache_manager=cache_manager,
+            admin_port=ServerConfig.ADMIN_PORT + index if ServerConfig.ADMIN_PORT is not None else None
+        )
+        for signum in (signal.SIGTERM, signal.SIGINT):
+            signal.signal(signum, lambda signum, frame: server.stop())
+        
+        Logger.log_info(f"Worker {index} started with pid {os.getpid()}")
+        try:
+            server.start()
+            # Let connections still being served finish before the cache closes
+            for thread in threading.enumerate():
+                if thread is not threading.current_thread() and not thread.daemon:
+                    thread.join()
+        finally:
+            if cache_manager is not None:
+                cache_manager.close()
\ No newline at end of file
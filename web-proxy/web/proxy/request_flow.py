@@ -0,0 +1,374 @@
+# web/proxy/request_flow.py
+from typing import List, Optional, Tuple, Union
+from web.proxy.request_parser import HTTPRequest
+from web.proxy.response_parser import HTTPResponse, ResponseParser
+from web.config.settings import ServerConfig
+from web.cache.cache_manager import CacheManager
+from web.cache.http_cache_policy import HTTPCachePolicy
+from web.logging.logger import Logger
+from web.logging.request_logger import RequestLogger
+from web.security.url_blocking import URLBlocker
+from web.utils.metrics import Metrics
+from web.utils.timer import StageTimer
+
+Buffer = Union[bytes, bytearray, memoryview]
+
+class CacheLookup:
+    """Outcome of looking a request up in the cache"""
+    
+    __slots__ = ('key', 'response', 'refresh', 'missed', 'expired', 'leader', 'stale')
+    
+    def __init__(self, key: Optional[str] = None):
+        """
+        Initialize lookup
+        
+        :param key: Cache key of the request (None if not cacheable)
+        """
+        self.key = key
+        # Response to serve from the cache, if any
+        self.response: Optional[Buffer] = None
+        # Whether the served response should be refreshed in the background
+        self.refresh = False
+        # Whether the response must be fetched, possibly by another client
+        self.missed = False
+        # Expired response retained for revalidation, if any
+        self.expired: Optional[Buffer] = None
+        # Whether this request leads the fetch of its key
+        self.leader = False
+        # Expired response this request revalidates as the leader
+        self.stale: Optional[Buffer] = None
+
+
+class ResponseRelay:
+    """
+    What to send a client while one upstream response streams in
+    
+    Fed each upstream chunk, it says what to pass on, holds back a
+    revalidation response until its status is known, tees what was sent
+    into the cache buffer and tracks whether the client connection may
+    carry another request. The handlers do only the I/O around it.
+    """
+    
+    def __init__(self,
+                 cache_policy: HTTPCachePolicy,
+                 parsed_request: HTTPRequest,
+                 cache_key: Optional[str],
+                 stale: Optional[Buffer],
+                 revalidating: bool,
+                 keep_alive: bool,
+                 max_cached_size: int):
+        """
+        Initialize relay
+        
+        :param cache_policy: Cache policy the response is stored with
+        :param parsed_request: Client request being answered
+        :param cache_key: Cache key of the request (None if not cacheable)
+        :param stale: Expired cached response being revalidated
+        :param revalidating: Whether the request was sent conditionally
+        :param keep_alive: Whether the client wants the connection kept open
+        :param max_cached_size: Largest response teed into the cache
+        """
+        self._cache_policy = cache_policy
+        self._request = parsed_request
+        self._cache_key = cache_key
+        self._stale = stale
+        self._keep_alive = keep_alive
+        self._max_cached_size = max_cached_size
+        self._cache_buffer = bytearray() if cache_key is not None else None
+        # A revalidation response is held back until its status is known
+        self._held = bytearray() if revalidating else None
+        # Start of what the client was sent, until its framing is known
+        self._sent_head = bytearray()
+        self._persistent: Optional[bool] = None if keep_alive else False
+        self.not_modified: Optional[HTTPResponse] = None
+        self.sent = False
+        self.relayed = 0
+    
+    def feed(self, chunk: Buffer) -> Optional[Buffer]:
+        """
+        Take the next upstream chunk
+        
+        :param chunk: Bytes received from upstream
+        :return: Bytes to send the client now, or None to send nothing
+        """
+        self.relayed += len(chunk)
+        if self._held is not None:
+            self._held += chunk
+            revalidation_head = ResponseParser.parse_head(self._held, self._request.method)
+            if revalidation_head is None and len(self._held) <= ResponseParser.MAX_HEADER_SIZE:
+                return None
+            if revalidation_head is not None and revalidation_head.status == 304:
+                self.not_modified = revalidation_head
+            chunk, self._held = self._held, None
+        if self.not_modified is not None:
+            return None
+        return chunk
+    
+    def sent_to_client(self, data: Buffer) -> None:
+        """
+        Account for bytes returned by feed() once they were sent
+        
+        :param data: Bytes sent to the client
+        """
+        self.sent = True
+        if self._persistent is None:
+            self._sent_head += data
+            self._persistent = ResponseParser.persistent(self._sent_head, self._request.method)
+        
+        # Stop teeing once the response is too large to cache
+        if self._cache_buffer is not None:
+            self._cache_buffer += data
+            if len(self._cache_buffer) > self._max_cached_size:
+                self._cache_buffer = None
+    
+    def count_relayed(self) -> None:
+        """Count the upstream bytes received, once the stream has ended or failed"""
+        if self.relayed:
+            Metrics.increment('proxy_upstream_bytes_total', self.relayed)
+    
+    def finish(self) -> Tuple[Optional[bytes], Optional[bool]]:
+        """
+        Complete the response once the upstream stream has ended
+        
+        :return: (bytes still to send the client, None if the response
+                 came from no upstream and the next should be tried,
+                 otherwise whether the connection can carry another request)
+        """
+        if self.not_modified is not None:
+            refreshed = self._cache_policy.refresh(self._request, self._cache_key, self._stale, self.not_modified)
+            Metrics.increment('proxy_cache_served_bytes_total', len(refreshed))
+            persistent = ResponseParser.persistent(refreshed, self._request.method)
+            return refreshed, self._keep_alive and bool(persistent)
+        
+        if self._held:
+            # Upstream closed before completing the response head
+            return bytes(self._held), False
+        
+        if self.sent:
+            if self._cache_buffer:
+                self._cache_policy.store(self._request, bytes(self._cache_buffer))
+            return None, bool(self._persistent)
+        return None, None
+
+
+class RequestFlow:
+    """
+    Request, cache and relay decisions shared by ClientHandler and
+    AsyncClientHandler
+    
+    The handlers differ only in how they read, write and wait, so every
+    decision about a request (blocking, cache lookup and coalescing,
+    revalidation, keep-alive, what to store) is made here once.
+    """
+    
+    def __init__(self, cache_manager: CacheManager, url_blocker: URLBlocker):
+        """
+        Initialize request flow
+        
+        :param cache_manager: Cache to serve from
+        :param url_blocker: Blocklist to apply
+        """
+        self.cache_manager = cache_manager
+        self.cache_policy = HTTPCachePolicy(cache_manager)
+        self._url_blocker = url_blocker
+    
+    @staticmethod
+    def upstreams(parsed_request: HTTPRequest) -> List[Tuple[str, int]]:
+        """Upstreams to try in order: localhost first, then the target server"""
+        return [
+            ('localhost', 7070),
+            (parsed_request.host, parsed_request.port)
+        ]
+    
+    @staticmethod
+    def keep_alive(parsed_request: HTTPRequest) -> bool:
+        """
+        Check whether the client connection may stay open after the response
+        
+        Relayed responses are not rewritten, so HTTP/1.0 clients, which
+        would need a keep-alive header in them, always see a close.
+        
+        :param parsed_request: Parsed client request
+        :return: True if the client may send another request
+        """
+        return parsed_request.version == 'HTTP/1.1' and parsed_request.keep_alive
+    
+    def is_blocked(self, parsed_request: HTTPRequest, timer: StageTimer) -> bool:
+        """
+        Count a parsed request and check it against the blocklist
+        
+        :param parsed_request: Parsed client request
+        :param timer: Request timer; parsing and the check are lapped
+        :return: True if the request must be refused
+        """
+        timer.lap('parse')
+        Metrics.increment('proxy_requests_total')
+        
+        blocked = self._url_blocker.is_blocked(parsed_request.url, parsed_request.host)
+        timer.lap('blocklist')
+        if blocked:
+            Metrics.increment('proxy_blocked_requests_total')
+        return blocked
+    
+    def lookup(self, parsed_request: HTTPRequest, timer: StageTimer) -> CacheLookup:
+        """
+        Look a request up in the cache
+        
+        A miss is not counted until joined() says how it was resolved.
+        
+        :param parsed_request: Parsed client request
+        :param timer: Request timer; the lookup is lapped
+        :return: Lookup outcome
+        """
+        key = self.cache_policy.cache_key(parsed_request) if ServerConfig.ENABLE_CACHING else None
+        lookup = CacheLookup(key)
+        if key is None:
+            timer.lap('cache_lookup')
+            return lookup
+        
+        found = self.cache_policy.lookup(parsed_request, key)
+        if found is not None and found[1]:
+            lookup.response = found[0]
+            lookup.refresh = self.cache_policy.should_refresh_ahead(key)
+            result = 'hit'
+        elif found is not None and self.cache_policy.can_serve_stale(parsed_request, key, found[0]):
+            # Serve stale now; the refresh happens off the request path
+            lookup.response = found[0]
+            lookup.refresh = True
+            result = 'stale'
+        else:
+            lookup.missed = True
+            lookup.expired = found[0] if found is not None else None
+            result = None
+        timer.lap('cache_lookup')
+        
+        if result is not None:
+            self._count_cache_result(result, parsed_request)
+        return lookup
+    
+    def joined(self,
+               lookup: CacheLookup,
+               parsed_request: HTTPRequest,
+               response: Optional[Buffer],
+               leader: bool,
+               timer: StageTimer) -> None:
+        """
+        Record how a miss was resolved by joining the fetch of its key
+        
+        :param lookup: Lookup that missed
+        :param parsed_request: Parsed client request
+        :param response: Response cached by the fetch that was waited for
+        :param leader: Whether this request leads and must fetch itself
+        :param timer: Request timer; the wait is lapped
+        """
+        timer.lap('coalesce_wait')
+        lookup.response = response
+        lookup.leader = leader
+        if leader and lookup.expired is not None:
+            # Expired but retained: revalidate instead of refetching
+            lookup.stale = lookup.expired
+        self._count_cache_result('coalesced' if response else 'miss', parsed_request)
+    
+    def cached_after_wait(self, parsed_request: HTTPRequest, key: str) -> Optional[Buffer]:
+        """
+        Get the response a coalesced fetch cached
+        
+        :param parsed_request: Parsed client request
+        :param key: Cache key of the request
+        :return: Fresh cached response, or None if the fetch cached nothing
+        """
+        found = self.cache_policy.lookup(parsed_request, key)
+        return found[0] if found is not None and found[1] else None
+    
+    def served_from_cache(self,
+                          parsed_request: HTTPRequest,
+                          response: Buffer,
+                          keep_alive: bool,
+                          timer: StageTimer) -> bool:
+        """
+        Account for a cached response once it was sent
+        
+        :param parsed_request: Parsed client request
+        :param response: Cached response sent
+        :param keep_alive: Whether the client wants the connection kept open
+        :param timer: Request timer; the send is lapped
+        :return: True if the connection can carry another request
+        """
+        timer.lap('client_send')
+        Metrics.increment('proxy_cache_served_bytes_total', len(response))
+        return keep_alive and bool(ResponseParser.persistent(response, parsed_request.method))
+    
+    def upstream_request(self,
+                         parsed_request: HTTPRequest,
+                         stale: Optional[Buffer]) -> Tuple[bytes, bool]:
+        """
+        Build the request sent upstream
+        
+        :param parsed_request: Parsed client request
+        :param stale: Expired cached response to revalidate
+        :return: (raw request, whether it is conditional)
+        """
+        conditional = None
+        if stale is not None:
+            conditional = self.cache_policy.conditional_request(parsed_request, stale)
+        return conditional or parsed_request.raw, conditional is not None
+    
+    def relay(self,
+              parsed_request: HTTPRequest,
+              cache_key: Optional[str],
+              stale: Optional[Buffer],
+              revalidating: bool,
+              keep_alive: bool) -> ResponseRelay:
+        """
+        Start relaying a response from one upstream
+        
+        :param parsed_request: Parsed client request
+        :param cache_key: Cache key of the request (None if not cacheable)
+        :param stale: Expired cached response being revalidated
+        :param revalidating: Whether the request was sent conditionally
+        :param keep_alive: Whether the client wants the connection kept open
+        :return: Relay to feed the upstream chunks to
+        """
+        return ResponseRelay(
+            self.cache_policy, parsed_request, cache_key, stale, revalidating,
+            keep_alive, self.cache_manager.max_object_size
+        )
+    
+    def refreshed(self,
+                  parsed_request: HTTPRequest,
+                  cache_key: str,
+                  stored: Buffer,
+                  revalidating: bool,
+                  response: bytes) -> None:
+        """
+        Update the cache with the response to a background refresh
+        
+        :param parsed_request: Request the cached response answers
+        :param cache_key: Cache key of the response
+        :param stored: Response cached when the refresh started
+        :param revalidating: Whether the refresh was sent conditionally
+        :param response: Complete upstream response
+        """
+        head = ResponseParser.parse_head(response, parsed_request.method)
+        if head is not None and head.status == 304:
+            if revalidating:
+                self.cache_policy.refresh(parsed_request, cache_key, stored, head)
+        elif len(response) <= self.cache_manager.max_object_size:
+            self.cache_policy.store(parsed_request, response)
+    
+    @staticmethod
+    def record(parsed_request: HTTPRequest, timer: StageTimer) -> None:
+        """
+        Log a served request and record its timings
+        
+        :param parsed_request: Parsed client request
+        :param timer: Request timer
+        """
+        Logger.log_request(parsed_request)
+        Metrics.record_request(timer)
+    
+    @staticmethod
+    def _count_cache_result(result: str, parsed_request: HTTPRequest) -> None:
+        """Count and log how the cache answered a request"""
+        Metrics.increment('proxy_cache_requests_total', result=result)
+        RequestLogger.log_cache_event(result, parsed_request.url)
\ No newline at end of file
@@ -1,48 +1,305 @@
 # web/proxy/request_parser.py
-import urllib.parse
-from typing import Dict, Any
+import re
+from typing import Any, Dict, Optional, Tuple, Union
+from web.config.settings import ServerConfig
+from web.proxy.response_parser import HTTPParseError
+
+Buffer = Union[bytes, bytearray, memoryview]
+
+_DEFAULT_PORTS = {'http': 80, 'https': 443}
+
+# Only the two framing headers are looked at before a request is complete
+_FRAMING_HEADERS = re.compile(
+    rb'\r\n(content-length|transfer-encoding)[ \t]*:[ \t]*([^\r\n]*)',
+    re.IGNORECASE
+)
+
+_HEX_DIGITS = b'0123456789abcdefABCDEF'
+
+class HTTPRequest:
+    """
+    Compact parsed HTTP request
+    
+    The request line is parsed eagerly; headers are only decoded the
+    first time they are accessed, since most requests are routed on the
+    URL alone.
+    """
+    
+    __slots__ = ('method', 'url', 'version', 'scheme', 'host', 'port',
+                 'path', 'raw', 'body', '_head', '_headers')
+    
+    def __init__(self,
+                 method: str,
+                 url: str,
+                 version: str,
+                 head: bytes,
+                 raw: bytes,
+                 body: bytes = b''):
+        """
+        Initialize parsed request
+        
+        :param method: HTTP method
+        :param url: Request target as sent by the client
+        :param version: HTTP version (e.g. 'HTTP/1.1')
+        :param head: Raw header block (without the request line)
+        :param raw: Complete raw request bytes, ready to forward
+        :param body: Raw request body (still chunk-encoded if chunked)
+        """
+        self.method = method
+        self.url = url
+        self.version = version
+        self.raw = raw
+        self.body = body
+        self._head = head
+        self._headers: Optional[Dict[str, str]] = None
+        self.scheme, self.host, self.port, self.path = _split_target(method, url)
+        
+        # Origin-form targets name the host in the Host header
+        if not self.host:
+            host_header = self.headers.get('host', '').lower()
+            self.host, _, port = host_header.partition(':')
+            self.port = int(port) if port.isdigit() else _DEFAULT_PORTS.get(self.scheme, 80)
+    
+    @property
+    def headers(self) -> Dict[str, str]:
+        """Headers keyed by lower-case name, decoded on first access"""
+        if self._headers is None:
+            headers: Dict[str, str] = {}
+            for line in self._head.split(b'\r\n'):
+                name, sep, value = line.partition(b':')
+                if sep:
+                    headers[name.strip().lower().decode('latin-1')] = value.strip().decode('latin-1')
+            self._headers = headers
+        return self._headers
+    
+    @property
+    def keep_alive(self) -> bool:
+        """Whether the client wants the connection kept open"""
+        connection = self.headers.get('connection', '').lower()
+        if self.version == 'HTTP/1.1':
+            return 'close' not in connection
+        return 'keep-alive' in connection
+    
+    def get(self, key: str, default: Any = None) -> Any:
+        """
+        Dictionary-style access kept for callers of the old parser
+        
+        :param key: Attribute name (e.g. 'url', 'host')
+        :param default: Value returned when the attribute is empty
+        :return: Attribute value
+        """
+        value = getattr(self, key, None)
+        return value if value is not None else default
+
+
+def _split_target(method: str, url: str):
+    """
+    Split a request target into (scheme, host, port, path)
+    
+    Handles absolute-form (proxy requests), authority-form (CONNECT)
+    and origin-form targets without going through urllib.
+    """
+    if method == 'CONNECT':
+        scheme, authority, path = 'https', url, ''
+    else:
+        scheme, sep, rest = url.partition('://')
+        if not sep:
+            return 'http', '', 80, url.partition('?')[0]
+        scheme = scheme.lower()
+        authority, _, path = rest.partition('/')
+        path = '/' + path.partition('?')[0]
+    
+    host, _, port = authority.rpartition('@')[2].rpartition(':')
+    if not host or not port.isdigit():
+        # No port given (or an unbracketed IPv6 literal)
+        host, port = authority.rpartition('@')[2], ''
+    host = host.strip('[]').lower()
+    
+    return scheme, host, int(port) if port else _DEFAULT_PORTS.get(scheme, 80), path
+
+
+def _chunked_body_end(buffer: Buffer, body_start: int, pos: int) -> Tuple[int, int]:
+    """
+    Find the end of a chunked body without decoding it
+    
+    The scan can be resumed after more bytes arrive, so each chunk is
+    looked at once however many reads the body takes.
+    
+    :param buffer: Buffered bytes
+    :param body_start: Offset the body starts at
+    :param pos: Offset of the first chunk-size line not yet scanned
+    :return: (offset just past the final CRLF or -1 if incomplete,
+             offset to resume the scan from)
+    :raises HTTPParseError: If a chunk size is invalid or the body, framing
+                            included, exceeds MAX_REQUEST_BODY_SIZE
+    """
+    limit = body_start + ServerConfig.MAX_REQUEST_BODY_SIZE
+    while True:
+        line_end = buffer.find(b'\r\n', pos)
+        if line_end < 0:
+            break
+        size = bytes(buffer[pos:line_end]).split(b';', 1)[0].strip()
+        if not size or size.strip(_HEX_DIGITS):
+            raise HTTPParseError("Invalid chunk size in request body")
+        size = int(size, 16)
+        if size == 0:
+            # Skip optional trailers up to the terminating blank line
+            trailer = line_end + 2
+            end = buffer.find(b'\r\n', trailer)
+            while end > trailer:
+                trailer = end + 2
+                end = buffer.find(b'\r\n', trailer)
+            if end >= 0:
+                return end + 2, end + 2
+            break
+        chunk_end = line_end + 2 + size + 2
+        if chunk_end > limit:
+            raise HTTPParseError("Request body too large")
+        if chunk_end > len(buffer):
+            break
+        pos = chunk_end
+    
+    # Everything buffered belongs to this body
+    if len(buffer) > limit:
+        raise HTTPParseError("Request body too large")
+    return -1, pos
+
+
+def _parse_message(buffer: Buffer, head_end: int, chunk_pos: int = 0) -> Tuple[Optional[HTTPRequest], int]:
+    """
+    Parse the request at the start of buffer whose headers end at head_end
+    
+    :param buffer: Buffered bytes
+    :param head_end: Offset of the blank line ending the headers
+    :param chunk_pos: Offset a previous scan of a chunked body stopped at
+                      (0 to scan from the start of the body)
+    :return: (parsed request or None if its body is not fully buffered,
+             offset to resume a chunked body scan from)
+    :raises HTTPParseError: If the request is malformed or too large
+    """
+    line_end = buffer.find(b'\r\n')
+    parts = buffer[:line_end].decode('latin-1').split(' ')
+    if len(parts) != 3 or not parts[2].startswith('HTTP/'):
+        raise HTTPParseError(f"Malformed request line: {bytes(buffer[:min(line_end, 100)])!r}")
+    
+    # Header block keeps its leading CRLF so every header starts with one
+    head = bytes(buffer[line_end:head_end])
+    body_start = head_end + 4
+    message_end = body_start
+    
+    lengths = set()
+    codings = []
+    for name, value in _FRAMING_HEADERS.findall(head):
+        if name.lower() == b'content-length':
+            lengths.add(value.strip())
+        else:
+            # Repeated Transfer-Encoding headers form one list of codings
+            codings += [coding.strip().lower() for coding in value.split(b',')]
+    if len(lengths) > 1:
+        raise HTTPParseError("Conflicting Content-Length headers in request")
+    if codings and lengths:
+        # Hops that frame by one header or the other would split the
+        # stream differently, which is how requests are smuggled
+        raise HTTPParseError("Request has both Transfer-Encoding and Content-Length")
+    
+    if codings:
+        # Only a body whose final coding is chunked can be delimited
+        if codings[-1] != b'chunked':
+            raise HTTPParseError("Request Transfer-Encoding does not end with chunked")
+        message_end, chunk_pos = _chunked_body_end(buffer, body_start, chunk_pos or body_start)
+        if message_end < 0:
+            return None, chunk_pos
+    elif lengths:
+        length = lengths.pop()
+        if not length.isdigit():
+            raise HTTPParseError("Invalid Content-Length in request")
+        if int(length) > ServerConfig.MAX_REQUEST_BODY_SIZE:
+            raise HTTPParseError("Request body too large")
+        message_end = body_start + int(length)
+        if len(buffer) < message_end:
+            return None, 0
+    
+    raw = bytes(buffer[:message_end])
+    return HTTPRequest(parts[0], parts[1], parts[2], head, raw, raw[body_start:]), 0
+
 
 class RequestParser:
-    """Parse and process incoming HTTP requests"""
+    """
+    Incremental HTTP request parser
+    
+    Bytes are fed as they are received; complete requests (headers and
+    any Content-Length or chunked body) are taken off the front of the
+    buffer one at a time, leaving pipelined bytes in place.
+    """
+    
+    MAX_HEADER_SIZE = 64 * 1024
+    
+    def __init__(self):
+        """Initialize an empty request buffer"""
+        self._buffer = bytearray()
+        self._scan_from = 0
+        # Where the scan of a partly received chunked body stopped
+        self._chunk_pos = 0
+    
+    def feed(self, data: Buffer) -> None:
+        """
+        Append received bytes
+        
+        :param data: Received bytes
+        """
+        self._buffer += data
+    
+    @property
+    def buffered(self) -> int:
+        """Number of bytes received but not yet returned as a request"""
+        return len(self._buffer)
+    
+    def take_buffered(self) -> bytes:
+        """
+        Take the bytes received after the last request returned, e.g. when
+        the connection stops carrying HTTP after a CONNECT
+        
+        :return: Buffered bytes; the buffer is left empty
+        """
+        data = bytes(self._buffer)
+        del self._buffer[:]
+        self._scan_from = self._chunk_pos = 0
+        return data
+    
+    def next_request(self) -> Optional[HTTPRequest]:
+        """
+        Take the next complete request off the buffer
+        
+        :return: Parsed request, or None if more bytes are needed
+        :raises HTTPParseError: If the request is malformed or too large
+        """
+        buffer = self._buffer
+        head_end = buffer.find(b'\r\n\r\n', self._scan_from)
+        if head_end < 0:
+            if len(buffer) > self.MAX_HEADER_SIZE:
+                raise HTTPParseError("Request headers too large")
+            # Resume the search where the terminator could still begin
+            self._scan_from = max(len(buffer) - 3, 0)
+            return None
+        
+        request, self._chunk_pos = _parse_message(buffer, head_end, self._chunk_pos)
+        if request is None:
+            return None
+        
+        del buffer[:len(request.raw)]
+        self._scan_from = 0
+        return request
     
     @staticmethod
-    def parse_request(request: bytes) -> Dict[str, Any]:
+    def parse_request(request: bytes) -> Optional[HTTPRequest]:
         """
         Parse raw HTTP request
         
         :param request: Raw request bytes
-        :return: Parsed request dictionary
+        :return: Parsed request or None if incomplete/malformed
         """
         try:
-            # Convert bytes to string
-            request_str = request.decode('utf-8', errors='ignore')
-            
-            # Split request into lines
-            lines = request_str.split('\n')
-            if not lines:
-                return {}
-            
-            # Parse request line
-            method, full_url, _ = lines[0].split(' ')
-            
-            # Parse URL
-            parsed_url = urllib.parse.urlparse(full_url)
-            
-            # Extract headers
-            headers = {}
-            for line in lines[1:]:
-                if ':' in line:
-                    key, value = line.split(':', 1)
-                    headers[key.strip()] = value.strip()
-            
-            return {
-                'method': method,
-                'url': full_url,
-                'scheme': parsed_url.scheme,
-                'host': parsed_url.hostname,
-                'path': parsed_url.path,
-                'headers': headers
-            }
-        except Exception as e:
-            print(f"Error parsing request: {e}")
-            return {}
\ No newline at end of file
+            head_end = request.find(b'\r\n\r\n')
+            return _parse_message(request, head_end)[0] if head_end >= 0 else None
+        except HTTPParseError:
+            return None
@@ -0,0 +1,351 @@
+# web/proxy/response_parser.py
+from collections import deque
+from typing import Deque, Dict, Iterator, Optional, Tuple, Union
+
+Buffer = Union[bytes, bytearray, memoryview]
+
+class HTTPParseError(ValueError):
+    """Raised when an HTTP message is malformed"""
+
+
+class HTTPResponse:
+    """Status line and headers of a parsed HTTP response"""
+    
+    __slots__ = ('version', 'status', 'reason', 'headers', 'header_size')
+    
+    def __init__(self,
+                 version: str,
+                 status: int,
+                 reason: str,
+                 headers: Dict[str, str],
+                 header_size: int):
+        """
+        Initialize response head
+        
+        :param version: HTTP version (e.g. 'HTTP/1.1')
+        :param status: Status code
+        :param reason: Reason phrase
+        :param headers: Headers keyed by lower-case name
+        :param header_size: Size of status line and headers in bytes
+        """
+        self.version = version
+        self.status = status
+        self.reason = reason
+        self.headers = headers
+        self.header_size = header_size
+    
+    def get_header(self, name: str, default: Optional[str] = None) -> Optional[str]:
+        """
+        Get a header value by case-insensitive name
+        
+        :param name: Header name
+        :param default: Value returned when the header is missing
+        :return: Header value
+        """
+        return self.headers.get(name.lower(), default)
+    
+    @property
+    def keep_alive(self) -> bool:
+        """Whether the connection may stay open after this response"""
+        connection = self.headers.get('connection', '').lower()
+        if self.version == 'HTTP/1.1':
+            return 'close' not in connection
+        return 'keep-alive' in connection
+
+
+class ResponseParser:
+    """
+    Incremental HTTP/1.1 response parser
+    
+    Bytes are fed as they arrive from the network; the parser tracks
+    message framing (Content-Length, chunked or close-delimited) so the
+    caller knows exactly where a response ends without waiting for the
+    origin to close the connection.
+    """
+    
+    # Parser states
+    _HEAD = 0
+    _BODY_LENGTH = 1
+    _CHUNK_SIZE = 2
+    _CHUNK_DATA = 3
+    _CHUNK_DATA_END = 4
+    _TRAILERS = 5
+    _BODY_CLOSE = 6
+    _DONE = 7
+    
+    MAX_HEADER_SIZE = 64 * 1024
+    
+    def __init__(self, method: str = 'GET', collect_body: bool = False):
+        """
+        Initialize response parser
+        
+        :param method: Method of the request being answered
+        :param collect_body: Keep decoded body chunks for body_chunks()
+        """
+        self._method = method.upper()
+        self._collect_body = collect_body
+        self._state = self._HEAD
+        self._head = bytearray()
+        self._line = bytearray()
+        self._remaining = 0
+        self._body: Deque[bytes] = deque()
+        self._keep_alive = False
+        self.response: Optional[HTTPResponse] = None
+        self.body_size = 0
+    
+    @property
+    def headers_complete(self) -> bool:
+        """Whether the status line and headers have been parsed"""
+        return self.response is not None
+    
+    @property
+    def message_complete(self) -> bool:
+        """Whether the whole response has been parsed"""
+        return self._state == self._DONE
+    
+    @property
+    def keep_alive(self) -> bool:
+        """Whether the connection can carry another request after this response"""
+        return self._state == self._DONE and self._keep_alive
+    
+    def feed(self, data: Buffer) -> int:
+        """
+        Feed received bytes to the parser
+        
+        Parsing stops at the end of the message; any further bytes in
+        data belong to the next message and are not consumed.
+        
+        :param data: Received bytes
+        :return: Number of bytes consumed by this message
+        """
+        data = memoryview(data)
+        size = len(data)
+        pos = 0
+        
+        while pos < size and self._state != self._DONE:
+            if self._state == self._HEAD:
+                pos = self._parse_head(data, pos)
+            
+            elif self._state == self._BODY_LENGTH:
+                take = min(self._remaining, size - pos)
+                self._on_body(data[pos:pos + take])
+                self._remaining -= take
+                pos += take
+                if not self._remaining:
+                    self._state = self._DONE
+            
+            elif self._state == self._BODY_CLOSE:
+                self._on_body(data[pos:])
+                pos = size
+            
+            elif self._state == self._CHUNK_DATA:
+                take = min(self._remaining, size - pos)
+                self._on_body(data[pos:pos + take])
+                self._remaining -= take
+                pos += take
+                if not self._remaining:
+                    self._state = self._CHUNK_DATA_END
+            
+            else:
+                # Line-oriented states: chunk size, chunk CRLF, trailers
+                line, pos = self._read_line(data, pos)
+                if line is not None:
+                    self._on_line(line)
+        
+        return pos
+    
+    def feed_eof(self) -> None:
+        """
+        Signal that the connection was closed
+        
+        :raises HTTPParseError: If the response was cut short
+        """
+        if self._state == self._BODY_CLOSE:
+            self._state = self._DONE
+            self._keep_alive = False
+        elif self._state != self._DONE:
+            raise HTTPParseError("Connection closed before response was complete")
+    
+    def body_chunks(self) -> Iterator[bytes]:
+        """
+        Iterate over decoded body chunks received so far
+        
+        Requires collect_body=True; chunks are yielded once.
+        
+        :return: Iterator over body chunks
+        """
+        while self._body:
+            yield self._body.popleft()
+    
+    @classmethod
+    def parse(cls, data: Buffer, method: str = 'GET') -> Optional[Tuple[HTTPResponse, bytes]]:
+        """
+        Parse a complete buffered response
+        
+        :param data: Raw response bytes
+        :param method: Method of the request being answered
+        :return: (response head, decoded body) or None if incomplete/malformed
+        """
+        parser = cls(method=method, collect_body=True)
+        try:
+            parser.feed(data)
+            parser.feed_eof()
+        except HTTPParseError:
+            return None
+        return parser.response, b''.join(parser.body_chunks())
+    
+    @classmethod
+    def parse_head(cls, data: Buffer, method: str = 'GET') -> Optional[HTTPResponse]:
+        """
+        Parse only the status line and headers at the start of data
+        
+        :param data: Raw response bytes (the body, if any, is ignored)
+        :param method: Method of the request being answered
+        :return: Response head or None if incomplete/malformed
+        """
+        end = bytes(data[:cls.MAX_HEADER_SIZE]).find(b'\r\n\r\n')
+        if end < 0:
+            return None
+        parser = cls(method=method)
+        try:
+            parser._on_head(bytes(data[:end + 4]))
+        except HTTPParseError:
+            return None
+        return parser.response
+    
+    @classmethod
+    def persistent(cls, data: Buffer, method: str = 'GET') -> Optional[bool]:
+        """
+        Check whether a connection may carry another message after a response
+        
+        Interim 1xx responses at the start of data are skipped. The final
+        response must allow keep-alive and end at a length its head gives
+        (or have no body), not where the connection closes.
+        
+        :param data: Raw response bytes, starting with the status line
+        :param method: Method of the request being answered
+        :return: Whether the connection may stay open, or None if the
+                 final response head is not complete yet
+        """
+        start = 0
+        while True:
+            # Heads are small; avoid copying a large cached body to find one
+            size = 4096
+            while True:
+                head = bytes(data[start:start + size])
+                end = head.find(b'\r\n\r\n')
+                if end >= 0:
+                    break
+                if size >= cls.MAX_HEADER_SIZE or start + size >= len(data):
+                    return None if size < cls.MAX_HEADER_SIZE else False
+                size *= 4
+            
+            parser = cls(method=method)
+            try:
+                parser._on_head(head[:end + 4])
+            except HTTPParseError:
+                return False
+            status = parser.response.status
+            if status == 101:
+                # The connection switches to another protocol
+                return False
+            if status >= 200:
+                return parser._keep_alive
+            start += end + 4
+    
+    def _parse_head(self, data: memoryview, pos: int) -> int:
+        """Accumulate header bytes until the blank line"""
+        search_from = max(len(self._head) - 3, 0)
+        self._head += data[pos:]
+        end = self._head.find(b'\r\n\r\n', search_from)
+        
+        if end < 0:
+            if len(self._head) > self.MAX_HEADER_SIZE:
+                raise HTTPParseError("Response headers too large")
+            return len(data)
+        
+        end += 4
+        consumed = len(data) - (len(self._head) - end)
+        del self._head[end:]
+        self._on_head(bytes(self._head))
+        return consumed
+    
+    def _on_head(self, head: bytes) -> None:
+        """Parse status line and headers and choose the body framing"""
+        lines = head[:-4].split(b'\r\n')
+        parts = lines[0].split(b' ', 2)
+        if len(parts) < 2 or not parts[0].startswith(b'HTTP/') or not parts[1].isdigit():
+            raise HTTPParseError(f"Malformed status line: {lines[0][:100]!r}")
+        
+        headers: Dict[str, str] = {}
+        for line in lines[1:]:
+            name, sep, value = line.partition(b':')
+            if not sep:
+                continue
+            key = name.strip().lower().decode('latin-1')
+            value = value.strip().decode('latin-1')
+            headers[key] = f"{headers[key]}, {value}" if key in headers else value
+        
+        self.response = HTTPResponse(
+            version=parts[0].decode('latin-1'),
+            status=int(parts[1]),
+            reason=parts[2].decode('latin-1') if len(parts) > 2 else '',
+            headers=headers,
+            header_size=len(head)
+        )
+        self._keep_alive = self.response.keep_alive
+        status = self.response.status
+        
+        if self._method == 'HEAD' or status in (204, 304) or 100 <= status < 200:
+            self._state = self._DONE
+        elif 'chunked' in headers.get('transfer-encoding', '').lower():
+            self._state = self._CHUNK_SIZE
+        elif 'content-length' in headers:
+            # Repeated headers were joined; they must all give one length
+            lengths = {value.strip() for value in headers['content-length'].split(',')}
+            length = lengths.pop()
+            if lengths or not length.isdigit() or not length.isascii():
+                raise HTTPParseError(f"Invalid Content-Length: {headers['content-length'][:20]!r}")
+            self._remaining = int(length)
+            self._state = self._BODY_LENGTH if self._remaining else self._DONE
+        else:
+            # Body runs until the origin closes the connection
+            self._state = self._BODY_CLOSE
+            self._keep_alive = False
+    
+    def _read_line(self, data: memoryview, pos: int) -> Tuple[Optional[bytes], int]:
+        """Read a CRLF-terminated line, buffering partial lines across feeds"""
+        end = bytes(data[pos:pos + 1024]).find(b'\n')
+        if end < 0:
+            self._line += data[pos:pos + 1024]
+            if len(self._line) > 1024:
+                raise HTTPParseError("Chunk line too long")
+            return None, min(pos + 1024, len(data))
+        
+        self._line += data[pos:pos + end + 1]
+        line = bytes(self._line).rstrip(b'\r\n')
+        self._line.clear()
+        return line, pos + end + 1
+    
+    def _on_line(self, line: bytes) -> None:
+        """Advance chunked framing by one line"""
+        if self._state == self._CHUNK_SIZE:
+            size = line.split(b';', 1)[0].strip()
+            if not size or size.strip(b'0123456789abcdefABCDEF'):
+                raise HTTPParseError(f"Invalid chunk size: {line[:20]!r}")
+            self._remaining = int(size, 16)
+            self._state = self._CHUNK_DATA if self._remaining else self._TRAILERS
+        
+        elif self._state == self._CHUNK_DATA_END:
+            if line:
+                raise HTTPParseError("Missing CRLF after chunk data")
+            self._state = self._CHUNK_SIZE
+        
+        elif self._state == self._TRAILERS and not line:
+            self._state = self._DONE
+    
+    def _on_body(self, chunk: memoryview) -> None:
+        """Account for (and optionally keep) a piece of decoded body"""
+        self.body_size += len(chunk)
+        if self._collect_body and chunk:
+            self._body.append(bytes(chunk))
@@ -1,64 +1,197 @@
+import asyncio
 import socket
-import threading
-from typing import Optional
+from typing import Dict, Optional
 
+from web.cache.cache_manager import CacheManager
+from web.cache.snapshot import CacheSnapshotter
+from web.config.cache_settings import CacheConfig
+from web.proxy.admin_server import AdminServer
 from web.proxy.client_handler import ClientHandler
+from web.proxy.worker_pool import AsyncAdmission, ClientLimits, ClientWorkerPool
+from web.proxy.async_client_handler import AsyncClientHandler
+from web.proxy.server_connector import AsyncServerConnector, ServerConnector
 from web.config.settings import ServerConfig
 from web.logging.logger import Logger
+from web.security.url_blocking import URLBlocker
+from web.utils.metrics import Metrics
 
 class ProxyServer:
     """Proxy server implementation"""
     
     def __init__(self, 
                  host: str = ServerConfig.HOST, 
-                 port: int = ServerConfig.PORT):
+                 port: int = ServerConfig.PORT, 
+                 mode: str = ServerConfig.SERVER_MODE, 
+                 reuse_port: bool = False, 
+                 listen_socket: Optional[socket.socket] = None, 
+                 cache_manager: Optional[CacheManager] = None, 
+                 snapshot_path: Optional[str] = CacheConfig.SNAPSHOT_PATH, 
+                 admin_port: Optional[int] = ServerConfig.ADMIN_PORT):
         """
         Initialize proxy server
         
         :param host: Server host
         :param port: Server port
+        :param mode: Serving mode ('asyncio' or 'threaded')
+        :param reuse_port: Bind with SO_REUSEPORT so several processes can
+                           listen on the same port
+        :param listen_socket: Already listening socket to serve instead of
+                              binding one (e.g. inherited from a pre-fork master)
+        :param cache_manager: Cache shared by the client handler (a new
+                              memory cache by default)
+        :param snapshot_path: Snapshot file the server's own cache is
+                              restored from and saved to (None to disable)
+        :param admin_port: Port serving /metrics (None to disable, 0 for
+                           any free port)
         """
         self._host = host
         self._port = port
-        self._server_socket: Optional[socket.socket] = None
-        self._client_handler = ClientHandler()
+        self._mode = mode
+        self._reuse_port = reuse_port
+        self._server_socket: Optional[socket.socket] = listen_socket
         self._is_running = False
+        
+        # asyncio mode state
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._async_server: Optional[asyncio.AbstractServer] = None
+        
+        # A cache of our own starts warm from the last snapshot
+        self._snapshotter: Optional[CacheSnapshotter] = None
+        if cache_manager is None:
+            cache_manager = CacheManager()
+            if snapshot_path:
+                self._snapshotter = CacheSnapshotter(cache_manager, snapshot_path)
+                self._snapshotter.load()
+        
+        self._url_blocker = URLBlocker()
+        if self._mode == ServerConfig.MODE_ASYNCIO:
+            self._client_handler = AsyncClientHandler(cache_manager, self._url_blocker)
+        else:
+            self._client_handler = ClientHandler(cache_manager, self._url_blocker)
+        
+        # Serve a bounded number of clients at once; the rest wait or are turned away
+        admission_options = dict(
+            queue_size=ServerConfig.ACCEPT_QUEUE_SIZE,
+            overload=ServerConfig.OVERLOAD_POLICY,
+            queue_timeout=ServerConfig.ACCEPT_QUEUE_TIMEOUT,
+            client_limits=ClientLimits(ServerConfig.MAX_CONNECTIONS_PER_CLIENT)
+        )
+        if self._mode == ServerConfig.MODE_ASYNCIO:
+            self._admission = AsyncAdmission(
+                self._client_handler.handle_client, ServerConfig.MAX_ACTIVE_CLIENTS, **admission_options
+            )
+        else:
+            self._admission = ClientWorkerPool(
+                self._client_handler.handle_client, ServerConfig.MAX_ACTIVE_CLIENTS, **admission_options
+            )
+        
+        self._admin_server: Optional[AdminServer] = None
+        if admin_port is not None:
+            self._admin_server = AdminServer(ServerConfig.ADMIN_HOST, admin_port)
+        Metrics.register_collector('cache', self._client_handler.metrics)
+        Metrics.register_collector('logging', self._log_metrics)
+        Metrics.register_collector('clients', self._admission.metrics)
+        if self._snapshotter is not None:
+            Metrics.register_collector('snapshot', self._snapshotter.metrics)
     
     def start(self) -> None:
         """Start the proxy server"""
         try:
-            # Create server socket
-            self._server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            self._server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-            self._server_socket.bind((self._host, self._port))
-            self._server_socket.listen(ServerConfig.MAX_CONNECTIONS)
+            # Create server socket unless one was handed over
+            if self._server_socket is None:
+                self._server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+                self._server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+                if self._reuse_port:
+                    self._server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+                self._server_socket.bind((self._host, self._port))
+                self._server_socket.listen(ServerConfig.MAX_CONNECTIONS)
             
             self._is_running = True
-            Logger.log_info(f"Proxy server started on {self._host}:{self._port}")
+            self._url_blocker.start()
+            if self._snapshotter is not None:
+                self._snapshotter.start()
+            if self._admin_server is not None:
+                self._admin_server.start()
+            Logger.log_info(f"Proxy server started on {self._host}:{self._port} ({self._mode} mode)")
             
-            # Accept client connections
-            while self._is_running:
-                try:
-                    client_socket, address = self._server_socket.accept()
-                    
-                    # Handle client in a separate thread
-                    client_thread = threading.Thread(
-                        target=self._client_handler.handle_client, 
-                        args=(client_socket,)
-                    )
-                    client_thread.start()
-                
-                except Exception as client_error:
-                    Logger.log_error(f"Client connection error: {client_error}")
+            if self._mode == ServerConfig.MODE_ASYNCIO:
+                asyncio.run(self._serve_async())
+            else:
+                self._serve_threaded()
         
         except Exception as e:
             Logger.log_error(f"Proxy server error: {e}")
         finally:
             self.stop()
     
+    def _serve_threaded(self) -> None:
+        """Accept client connections and hand them to the worker pool"""
+        self._admission.start()
+        while self._is_running:
+            try:
+                client_socket, address = self._server_socket.accept()
+                self._admission.dispatch(client_socket, address)
+            
+            except Exception as client_error:
+                if self._is_running:
+                    Logger.log_error(f"Client connection error: {client_error}")
+    
+    async def _serve_async(self) -> None:
+        """Accept and serve client connections on a single event loop"""
+        self._loop = asyncio.get_running_loop()
+        self._server_socket.setblocking(False)
+        self._async_server = await asyncio.start_server(
+            self._admission,
+            sock=self._server_socket
+        )
+        
+        async with self._async_server:
+            try:
+                await self._async_server.serve_forever()
+            except asyncio.CancelledError:
+                pass
+        # The pool's streams belong to this loop, so they are closed on it
+        AsyncServerConnector.close_pool()
+    
     def stop(self) -> None:
         """Stop the proxy server"""
         self._is_running = False
-        if self._server_socket:
+        
+        # The asyncio server owns the listening socket once serving, and
+        # stop() may be called from another thread
+        if self._async_server and self._loop and not self._loop.is_closed():
+            try:
+                self._loop.call_soon_threadsafe(self._async_server.close)
+            except RuntimeError:
+                pass
+        elif self._server_socket:
             self._server_socket.close()
-        Logger.log_info("Proxy server stopped")
\ No newline at end of file
+        
+        if self._mode != ServerConfig.MODE_ASYNCIO:
+            self._admission.stop()
+            ServerConnector.close_pool()
+        self._url_blocker.stop()
+        if self._snapshotter is not None:
+            self._snapshotter.stop()
+        if self._admin_server is not None:
+            self._admin_server.stop()
+        Metrics.unregister_collector('cache', self._client_handler.metrics)
+        Metrics.unregister_collector('logging', self._log_metrics)
+        Metrics.unregister_collector('clients', self._admission.metrics)
+        if self._snapshotter is not None:
+            Metrics.unregister_collector('snapshot', self._snapshotter.metrics)
+        Logger.log_info("Proxy server stopped")
+    
+    @staticmethod
+    def _log_metrics() -> Dict[str, float]:
+        """Log writer state for the metrics endpoint"""
+        stats = Logger.stats()
+        return {
+            'proxy_log_records_dropped_total': stats.get('dropped', 0),
+            'proxy_log_queue_depth': stats.get('queued', 0)
+        }
+    
+    @property
+    def admin_port(self) -> Optional[int]:
+        """Port serving /metrics, or None if disabled"""
+        return self._admin_server.port if self._admin_server is not None else None
\ No newline at end of file
@@ -1,13 +1,173 @@
 # web/proxy/server_connector.py
+import asyncio
 import socket
 import ssl
-from typing import Tuple, Optional
+from typing import AsyncIterator, Generator, Iterator, Tuple, Optional
 from web.config.settings import ServerConfig
 from web.logging.logger import Logger
+from web.proxy.connection_pool import ConnectionPool, AsyncConnectionPool
+from web.proxy.response_parser import ResponseParser
+from web.utils.timer import StageTimer
+
+# Methods a request may be sent again for when the connection fails
+_IDEMPOTENT_METHODS = frozenset({'GET', 'HEAD', 'OPTIONS', 'TRACE', 'PUT', 'DELETE'})
+
+def _request_method(request: bytes) -> str:
+    """Extract the method from a raw request line"""
+    return request[:request.find(b' ')].decode('ascii', errors='ignore') or 'GET'
+
+
+def _retryable(request: bytes, error: Exception) -> bool:
+    """
+    Check whether a request that failed before any response byte may be
+    sent again on a fresh connection
+    
+    Only an origin closing a reused connection is retried: a timeout
+    may mean the request is still being processed.
+    """
+    return isinstance(error, ConnectionError) and _request_method(request) in _IDEMPOTENT_METHODS
+
 
 class ServerConnector:
     """Manage connections to target servers"""
     
+    # Shared keep-alive pool of upstream connections
+    _pool: Optional[ConnectionPool] = None
+    
+    @classmethod
+    def get_pool(cls) -> ConnectionPool:
+        """
+        Get the shared upstream connection pool
+        
+        :return: ConnectionPool instance
+        """
+        if cls._pool is None:
+            cls._pool = ConnectionPool(connect=cls.connect_to_server)
+        return cls._pool
+    
+    @classmethod
+    def close_pool(cls) -> None:
+        """Close the idle connections of the shared upstream pool"""
+        if cls._pool is not None:
+            cls._pool.close_all()
+    
+    @classmethod
+    def stream(cls, 
+               host: str, 
+               request: bytes, 
+               port: int = 80, 
+               use_ssl: bool = False, 
+               timer: Optional[StageTimer] = None) -> Iterator[memoryview]:
+        """
+        Send a request over a pooled keep-alive connection and yield
+        the response as it arrives
+        
+        Chunks are views into a reusable receive buffer and are only
+        valid until the next chunk is requested. An idempotent request on
+        a reused connection the origin has closed without answering is
+        retried once on a fresh connection.
+        
+        :param host: Target server hostname
+        :param request: Request bytes to send
+        :param port: Target server port
+        :param use_ssl: Whether to use SSL/HTTPS
+        :param timer: Request timer; acquiring the connection is lapped
+                      as the upstream_connect stage
+        :return: Iterator over response chunks
+        """
+        pool = cls.get_pool()
+        for _ in range(2):
+            lease = pool.acquire(host, port, use_ssl)
+            if timer is not None:
+                timer.lap('upstream_connect')
+            if not lease:
+                return
+            
+            sock, reused = lease
+            reusable = False
+            started = False
+            retry = False
+            try:
+                exchange = cls._stream_exchange(sock, request)
+                while True:
+                    try:
+                        chunk = next(exchange)
+                    except StopIteration as done:
+                        reusable = done.value
+                        break
+                    started = True
+                    yield chunk
+            except Exception as e:
+                if started:
+                    raise
+                Logger.log_error(f"Request send error: {e}")
+                retry = reused and _retryable(request, e)
+            finally:
+                pool.release(host, port, use_ssl, sock, reusable)
+            
+            if not retry:
+                return
+    
+    @classmethod
+    def fetch(cls, host: str, request: bytes, port: int = 80, use_ssl: bool = False) -> Optional[bytes]:
+        """
+        Send a request over a pooled keep-alive connection and buffer
+        the whole response
+        
+        :param host: Target server hostname
+        :param request: Request bytes to send
+        :param port: Target server port
+        :param use_ssl: Whether to use SSL/HTTPS
+        :return: Server response or None
+        """
+        response = bytearray()
+        try:
+            for chunk in cls.stream(host, request, port=port, use_ssl=use_ssl):
+                response += chunk
+        except Exception as e:
+            Logger.log_error(f"Request send error: {e}")
+        return bytes(response) or None
+    
+    @staticmethod
+    def _stream_exchange(sock: socket.socket, request: bytes) -> Generator[memoryview, None, bool]:
+        """
+        Send one request and yield exactly one framed response
+        
+        :param sock: Connected socket
+        :param request: Request bytes to send
+        :return: Whether the connection can be reused afterwards
+        """
+        buffer = bytearray(ServerConfig.BUFFER_SIZE)
+        view = memoryview(buffer)
+        method = _request_method(request)
+        sock.sendall(request)
+        
+        parser = ResponseParser(method)
+        answered = False
+        while True:
+            received = sock.recv_into(buffer)
+            if not received:
+                if not answered:
+                    raise ConnectionResetError("Connection closed before a response")
+                # Body delimited by the origin closing the connection
+                parser.feed_eof()
+                return False
+            answered = True
+            
+            chunk = view[:received]
+            while chunk:
+                consumed = parser.feed(chunk)
+                if consumed:
+                    yield chunk[:consumed]
+                chunk = chunk[consumed:]
+                
+                if parser.message_complete:
+                    if parser.response.status >= 200:
+                        # Leftover bytes mean the origin sent something unasked
+                        return parser.keep_alive and not chunk
+                    # Interim 1xx response; the final one follows
+                    parser = ResponseParser(method)
+    
     @staticmethod
     def connect_to_server(host: str, port: int = 80, use_ssl: bool = False) -> Optional[socket.socket]:
         """
@@ -39,32 +199,165 @@ class ServerConnector:
         except Exception as e:
             Logger.log_error(f"Connection error to {host}:{port} - {e}")
             return None
+
+
+class AsyncServerConnector:
+    """Manage connections to target servers from the asyncio event loop"""
     
-    @staticmethod
-    def send_request(sock: socket.socket, request: bytes) -> Optional[bytes]:
+    # Keep-alive pool bound to the event loop that created it
+    _pool: Optional[AsyncConnectionPool] = None
+    _pool_loop: Optional[asyncio.AbstractEventLoop] = None
+    
+    @classmethod
+    def get_pool(cls) -> AsyncConnectionPool:
         """
-        Send request to server and receive response
+        Get the upstream connection pool for the running event loop
         
-        :param sock: Connected socket
+        :return: AsyncConnectionPool instance
+        """
+        loop = asyncio.get_running_loop()
+        if cls._pool is None or cls._pool_loop is not loop:
+            cls._pool = AsyncConnectionPool(connect=cls.connect_to_server)
+            cls._pool_loop = loop
+        return cls._pool
+    
+    @classmethod
+    def close_pool(cls) -> None:
+        """Close the idle connections of the pool, from its event loop"""
+        if cls._pool is not None and cls._pool_loop is asyncio.get_running_loop():
+            cls._pool.close_all()
+    
+    @classmethod
+    async def stream(cls, 
+                     host: str, 
+                     request: bytes, 
+                     port: int = 80, 
+                     use_ssl: bool = False, 
+                     timer: Optional[StageTimer] = None) -> AsyncIterator[memoryview]:
+        """
+        Send a request over a pooled keep-alive connection and yield
+        the response as it arrives
+        
+        :param host: Target server hostname
         :param request: Request bytes to send
+        :param port: Target server port
+        :param use_ssl: Whether to use SSL/HTTPS
+        :param timer: Request timer; acquiring the connection is lapped
+                      as the upstream_connect stage
+        :return: Async iterator over response chunks
+        """
+        pool = cls.get_pool()
+        for _ in range(2):
+            lease = await pool.acquire(host, port, use_ssl)
+            if timer is not None:
+                timer.lap('upstream_connect')
+            if not lease:
+                return
+            
+            conn, reused = lease
+            state = {'reusable': False}
+            started = False
+            retry = False
+            try:
+                async for chunk in cls._stream_exchange(conn[0], conn[1], request, state):
+                    started = True
+                    yield chunk
+            except Exception as e:
+                if started:
+                    raise
+                Logger.log_error(f"Request send error: {e}")
+                retry = reused and _retryable(request, e)
+            finally:
+                await pool.release(host, port, use_ssl, conn, state['reusable'])
+            
+            if not retry:
+                return
+    
+    @classmethod
+    async def fetch(cls, host: str, request: bytes, port: int = 80, use_ssl: bool = False) -> Optional[bytes]:
+        """
+        Send a request over a pooled keep-alive connection and buffer
+        the whole response
+        
+        :param host: Target server hostname
+        :param request: Request bytes to send
+        :param port: Target server port
+        :param use_ssl: Whether to use SSL/HTTPS
         :return: Server response or None
         """
+        response = bytearray()
         try:
-            # Send request
-            sock.sendall(request)
-            
-            # Receive response
-            response = b''
-            while True:
-                chunk = sock.recv(ServerConfig.BUFFER_SIZE)
-                if not chunk:
-                    break
+            async for chunk in cls.stream(host, request, port=port, use_ssl=use_ssl):
                 response += chunk
+        except Exception as e:
+            Logger.log_error(f"Request send error: {e}")
+        return bytes(response) or None
+    
+    @staticmethod
+    async def _stream_exchange(reader: asyncio.StreamReader, 
+                               writer: asyncio.StreamWriter, 
+                               request: bytes, 
+                               state: dict) -> AsyncIterator[memoryview]:
+        """
+        Send one request and yield exactly one framed response
+        
+        Sets state['reusable'] once the response has been fully read.
+        """
+        method = _request_method(request)
+        writer.write(request)
+        await writer.drain()
+        
+        parser = ResponseParser(method)
+        answered = False
+        while True:
+            data = await asyncio.wait_for(
+                reader.read(ServerConfig.BUFFER_SIZE),
+                timeout=ServerConfig.READ_TIMEOUT
+            )
+            if not data:
+                if not answered:
+                    raise ConnectionResetError("Connection closed before a response")
+                parser.feed_eof()
+                return
+            answered = True
             
-            return response
+            chunk = memoryview(data)
+            while chunk:
+                consumed = parser.feed(chunk)
+                if consumed:
+                    yield chunk[:consumed]
+                chunk = chunk[consumed:]
+                
+                if parser.message_complete:
+                    if parser.response.status >= 200:
+                        state['reusable'] = parser.keep_alive and not chunk
+                        return
+                    parser = ResponseParser(method)
+    
+    @staticmethod
+    async def connect_to_server(host: str, 
+                                port: int = 80, 
+                                use_ssl: bool = False) -> Optional[Tuple[asyncio.StreamReader, asyncio.StreamWriter]]:
+        """
+        Establish connection to target server without blocking the loop
+        
+        :param host: Target server hostname
+        :param port: Target server port
+        :param use_ssl: Whether to use SSL/HTTPS
+        :return: (reader, writer) stream pair or None
+        """
+        try:
+            context = ssl.create_default_context() if use_ssl else None
+            return await asyncio.wait_for(
+                asyncio.open_connection(
+                    host, 
+                    port, 
+                    ssl=context, 
+                    server_hostname=host if use_ssl else None
+                ),
+                timeout=ServerConfig.CONNECTION_TIMEOUT
+            )
         
         except Exception as e:
-            Logger.log_error(f"Request send error: {e}")
-            return None
-        finally:
-            sock.close()
\ No newline at end of file
+            Logger.log_error(f"Connection error to {host}:{port} - {e}")
+            return None
\ No newline at end of file
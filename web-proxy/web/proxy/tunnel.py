@@ -0,0 +1,334 @@
+# web/proxy/tunnel.py
+import asyncio
+import selectors
+import socket
+import time
+from typing import Optional
+from web.config.settings import ServerConfig
+from web.utils.metrics import Metrics
+
+def _refusal(status: str, text: str) -> bytes:
+    """Build a complete response refusing a CONNECT request"""
+    body = text.encode('ascii') + b'\r\n'
+    return (
+        f"HTTP/1.1 {status}\r\nContent-Type: text/plain\r\n"
+        f"Connection: close\r\nContent-Length: {len(body)}\r\n\r\n"
+    ).encode('ascii') + body
+
+
+def _count(upstream: int, downstream: int, result: str) -> None:
+    """Count a finished tunnel and the bytes it relayed"""
+    Metrics.increment('proxy_tunnels_total', result=result)
+    if upstream:
+        Metrics.increment('proxy_tunnel_bytes_total', upstream, direction='upstream')
+    if downstream:
+        Metrics.increment('proxy_tunnel_bytes_total', downstream, direction='downstream')
+
+
+class _Pipe:
+    """One direction of a tunnel: bytes read from source wait in a reusable buffer until written to sink"""
+    
+    __slots__ = ('source', 'sink', 'view', 'start', 'end', 'eof', 'relayed')
+    
+    def __init__(self, source: socket.socket, sink: socket.socket, buffer_size: int):
+        """
+        Initialize pipe
+        
+        :param source: Socket read from
+        :param sink: Socket written to
+        :param buffer_size: Bytes read at once
+        """
+        self.source = source
+        self.sink = sink
+        self.view = memoryview(bytearray(buffer_size))
+        self.start = self.end = 0
+        self.eof = False
+        self.relayed = 0
+    
+    @property
+    def pending(self) -> bool:
+        """Whether received bytes are still waiting to be written"""
+        return self.start < self.end
+    
+    def receive(self) -> None:
+        """Read into the empty buffer and write as much as sink takes"""
+        received = self.source.recv_into(self.view)
+        if not received:
+            # Pass the half-close on; the other direction may go on
+            self.eof = True
+            self.sink.shutdown(socket.SHUT_WR)
+            return
+        self.start, self.end = 0, received
+        self.relayed += received
+        self.send()
+    
+    def send(self) -> None:
+        """Write buffered bytes to sink without blocking"""
+        try:
+            self.start += self.sink.send(self.view[self.start:self.end])
+        except BlockingIOError:
+            pass
+
+
+class Tunnel:
+    """
+    Relay bytes both ways between a client and a server socket
+    
+    Each direction reads into a buffer of its own and is not read again
+    until the buffer has been written out, so a slow reader on one side
+    holds back only the sender on the other. A side that closes its
+    sending half has the close passed on, and the tunnel ends once both
+    directions are closed, on an error, or after idle_timeout seconds
+    without a byte either way.
+    """
+    
+    ESTABLISHED_RESPONSE = b"HTTP/1.1 200 Connection Established\r\n\r\n"
+    FORBIDDEN_PORT_RESPONSE = _refusal('403 Forbidden', 'CONNECT to this port is not allowed')
+    BAD_GATEWAY_RESPONSE = _refusal('502 Bad Gateway', 'Could not connect to the target')
+    
+    def __init__(self, 
+                 client_socket: socket.socket, 
+                 server_socket: socket.socket, 
+                 buffer_size: int = ServerConfig.TUNNEL_BUFFER_SIZE, 
+                 idle_timeout: Optional[float] = None):
+        """
+        Initialize tunnel
+        
+        :param client_socket: Connected client socket
+        :param server_socket: Connected server socket
+        :param buffer_size: Bytes read at once in each direction
+        :param idle_timeout: Seconds without traffic before the tunnel is
+                             closed (ServerConfig.TUNNEL_IDLE_TIMEOUT if None)
+        """
+        self._client_socket = client_socket
+        self._server_socket = server_socket
+        self._buffer_size = buffer_size
+        self._idle_timeout = idle_timeout if idle_timeout is not None else ServerConfig.TUNNEL_IDLE_TIMEOUT
+    
+    @staticmethod
+    def allows_port(port: int) -> bool:
+        """
+        Check whether CONNECT may open a tunnel to a port
+        
+        :param port: Target port
+        :return: True if ServerConfig.TUNNEL_PORTS allows it
+        """
+        return ServerConfig.TUNNEL_PORTS is None or port in ServerConfig.TUNNEL_PORTS
+    
+    def relay(self, pending: bytes = b'') -> None:
+        """
+        Relay until the tunnel ends; the caller closes both sockets
+        
+        :param pending: Bytes the client sent after the CONNECT request,
+                        forwarded to the server first
+        """
+        if pending:
+            self._server_socket.sendall(pending)
+        pipes = (
+            _Pipe(self._client_socket, self._server_socket, self._buffer_size),
+            _Pipe(self._server_socket, self._client_socket, self._buffer_size)
+        )
+        for sock in (self._client_socket, self._server_socket):
+            sock.setblocking(False)
+        
+        result = 'closed'
+        registered = {}
+        last_activity = time.monotonic()
+        with selectors.DefaultSelector() as selector:
+            try:
+                while True:
+                    # A direction waits to write its buffer out, or else to read
+                    wanted = {self._client_socket: 0, self._server_socket: 0}
+                    for pipe in pipes:
+                        if pipe.pending:
+                            wanted[pipe.sink] |= selectors.EVENT_WRITE
+                        elif not pipe.eof:
+                            wanted[pipe.source] |= selectors.EVENT_READ
+                    if not any(wanted.values()):
+                        break
+                    for sock, events in wanted.items():
+                        if events == registered.get(sock, 0):
+                            continue
+                        if not events:
+                            selector.unregister(sock)
+                            del registered[sock]
+                            continue
+                        if sock in registered:
+                            selector.modify(sock, events)
+                        else:
+                            selector.register(sock, events)
+                        registered[sock] = events
+                    
+                    remaining = self._idle_timeout - (time.monotonic() - last_activity)
+                    ready = selector.select(remaining) if remaining > 0 else []
+                    if not ready:
+                        if time.monotonic() - last_activity >= self._idle_timeout:
+                            result = 'idle_timeout'
+                            break
+                        continue
+                    
+                    last_activity = time.monotonic()
+                    for key, events in ready:
+                        for pipe in pipes:
+                            if events & selectors.EVENT_WRITE and pipe.sink is key.fileobj and pipe.pending:
+                                pipe.send()
+                            elif events & selectors.EVENT_READ and pipe.source is key.fileobj and not pipe.pending:
+                                try:
+                                    pipe.receive()
+                                except BlockingIOError:
+                                    pass
+            except OSError:
+                result = 'error'
+        _count(len(pending) + pipes[0].relayed, pipes[1].relayed, result)
+
+
+class _TunnelProtocol(asyncio.BufferedProtocol):
+    """One end of an AsyncTunnel, receiving into a reusable buffer that is written to the other end"""
+    
+    def __init__(self, 
+                 tunnel: 'AsyncTunnel', 
+                 transport: asyncio.Transport, 
+                 buffer_size: int):
+        """
+        Take over a stream's transport
+        
+        :param tunnel: Tunnel this end belongs to
+        :param transport: Transport of the stream
+        :param buffer_size: Bytes received at once
+        """
+        self._tunnel = tunnel
+        self._original = transport.get_protocol()
+        self._view = memoryview(bytearray(buffer_size))
+        self.transport = transport
+        self.peer: Optional['_TunnelProtocol'] = None
+        self.relayed = 0
+        self.eof = False
+        self.closed = False
+        transport.set_protocol(self)
+    
+    def get_buffer(self, sizehint: int) -> memoryview:
+        """Receive into the reusable buffer"""
+        return self._view
+    
+    def buffer_updated(self, nbytes: int) -> None:
+        """Write what was received to the other end"""
+        self.relayed += nbytes
+        self._tunnel.last_activity = time.monotonic()
+        self.peer.transport.write(self._view[:nbytes])
+    
+    def pause_writing(self) -> None:
+        """Stop reading from the other end while this one has bytes left to send"""
+        self.peer.transport.pause_reading()
+    
+    def resume_writing(self) -> None:
+        """Read from the other end again"""
+        self.peer.transport.resume_reading()
+    
+    def eof_received(self) -> bool:
+        """Pass a half-close on, or end the tunnel once both sides have closed"""
+        self.eof = True
+        if self.peer.eof:
+            self._tunnel.finish()
+            return False
+        if self.peer.transport.can_write_eof():
+            self.peer.transport.write_eof()
+        return True
+    
+    def connection_lost(self, exc: Optional[Exception]) -> None:
+        """End the tunnel and let the stream protocol that owned the transport see the close"""
+        self.closed = True
+        self._tunnel.finish('error' if exc is not None else 'closed')
+        self._original.connection_lost(exc)
+
+
+class AsyncTunnel:
+    """
+    Relay bytes both ways between a client and a server stream on the
+    event loop, as Tunnel does with threads
+    
+    The transports of both streams are switched to buffered protocols
+    that receive into one reusable buffer per direction. A direction
+    stops reading while the other side's transport has anything left to
+    send, which is what keeps those buffers safe to reuse.
+    """
+    
+    def __init__(self, 
+                 client_reader: asyncio.StreamReader, 
+                 client_writer: asyncio.StreamWriter, 
+                 server_reader: asyncio.StreamReader, 
+                 server_writer: asyncio.StreamWriter, 
+                 buffer_size: int = ServerConfig.TUNNEL_BUFFER_SIZE, 
+                 idle_timeout: Optional[float] = None):
+        """
+        Initialize tunnel
+        
+        :param client_reader: Client stream reader
+        :param client_writer: Client stream writer
+        :param server_reader: Server stream reader
+        :param server_writer: Server stream writer
+        :param buffer_size: Bytes read at once in each direction
+        :param idle_timeout: Seconds without traffic before the tunnel is
+                             closed (ServerConfig.TUNNEL_IDLE_TIMEOUT if None)
+        """
+        self._streams = ((client_reader, client_writer), (server_reader, server_writer))
+        self._buffer_size = buffer_size
+        self._idle_timeout = idle_timeout if idle_timeout is not None else ServerConfig.TUNNEL_IDLE_TIMEOUT
+        self._done: Optional[asyncio.Future] = None
+        self._result = 'closed'
+        self.last_activity = time.monotonic()
+    
+    def finish(self, result: str = 'closed') -> None:
+        """
+        End the tunnel, called by its protocols
+        
+        :param result: How the tunnel ended
+        """
+        if self._done is not None and not self._done.done():
+            self._result = result
+            self._done.set_result(None)
+    
+    async def relay(self, pending: bytes = b'') -> None:
+        """
+        Relay until the tunnel ends, then close both transports
+        
+        :param pending: Bytes the client sent after the CONNECT request,
+                        forwarded to the server first
+        """
+        self._done = asyncio.get_running_loop().create_future()
+        client, server = [
+            _TunnelProtocol(self, writer.transport, self._buffer_size)
+            for _, writer in self._streams
+        ]
+        client.peer, server.peer = server, client
+        for protocol in (client, server):
+            # pause_writing() as soon as anything is left unsent, so the
+            # buffer is not reused while the transport may still refer to it
+            protocol.transport.set_write_buffer_limits(high=0)
+        
+        # Take what the stream readers buffered before the switch,
+        # including a half-close they saw
+        early = []
+        ended = []
+        for reader, _ in self._streams:
+            ended.append(reader.at_eof())
+            reader.feed_eof()
+            early.append(await reader.read())
+        upstream = len(pending) + len(early[0])
+        server.transport.write(pending + early[0])
+        client.transport.write(early[1])
+        for protocol, eof in zip((client, server), ended):
+            if eof:
+                protocol.eof_received()
+        
+        try:
+            while not self._done.done():
+                remaining = self._idle_timeout - (time.monotonic() - self.last_activity)
+                if remaining <= 0:
+                    self._result = 'idle_timeout'
+                    break
+                await asyncio.wait([self._done], timeout=remaining)
+        finally:
+            for protocol in (client, server):
+                if not protocol.closed:
+                    protocol.transport.close()
+            _count(upstream + client.relayed, len(early[1]) + server.relayed, self._result)
\ No newline at end of file
@@ -0,0 +1,309 @@
+# web/proxy/worker_pool.py
+import asyncio
+import collections
+import queue
+import socket
+import threading
+import time
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+from web.config.settings import ServerConfig
+from web.logging.logger import Logger
+from web.utils.metrics import Metrics
+
+def _plain_response(status: str, text: str) -> bytes:
+    """Build a complete response telling the client to retry later"""
+    body = text.encode('ascii') + b'\r\n'
+    return (
+        f"HTTP/1.1 {status}\r\nContent-Type: text/plain\r\nRetry-After: 1\r\n"
+        f"Connection: close\r\nContent-Length: {len(body)}\r\n\r\n"
+    ).encode('ascii') + body
+
+
+OVERLOADED_RESPONSE = _plain_response('503 Service Unavailable', 'Proxy is overloaded')
+CLIENT_LIMIT_RESPONSE = _plain_response('429 Too Many Requests', 'Too many connections from this client')
+
+class ClientLimits:
+    """Count open connections per client IP and cap them"""
+    
+    def __init__(self, max_per_client: Optional[int] = ServerConfig.MAX_CONNECTIONS_PER_CLIENT):
+        """
+        Initialize client limits
+        
+        :param max_per_client: Connections one IP may have open at once
+                               (None for no limit)
+        """
+        self._max_per_client = max_per_client
+        self._open: Dict[str, int] = collections.defaultdict(int)
+        self._lock = threading.Lock()
+    
+    def acquire(self, client_ip: str) -> bool:
+        """
+        Count a new connection from a client
+        
+        :param client_ip: Client IP address
+        :return: True if admitted, False if the client is at its limit
+        """
+        if self._max_per_client is None:
+            return True
+        with self._lock:
+            if self._open[client_ip] >= self._max_per_client:
+                return False
+            self._open[client_ip] += 1
+            return True
+    
+    def release(self, client_ip: str) -> None:
+        """
+        Count a client's connection as closed
+        
+        :param client_ip: Client IP address
+        """
+        if self._max_per_client is None:
+            return
+        with self._lock:
+            self._open[client_ip] -= 1
+            if self._open[client_ip] <= 0:
+                del self._open[client_ip]
+
+
+class ClientWorkerPool:
+    """
+    Serve accepted client connections on a fixed set of threads
+    
+    Accepted connections wait in a bounded queue for a free worker. When
+    every worker is busy and the queue is full, the overload policy
+    decides what happens to the next connection:
+    
+    - OVERLOAD_QUEUE: dispatch() blocks, so the acceptor stops accepting
+      and further clients wait in the kernel's listen backlog
+    - OVERLOAD_SHED: the connection is answered with 503 and closed
+    - OVERLOAD_PAUSE: like OVERLOAD_QUEUE but without the queue; accepting
+      pauses as soon as every worker is busy
+    
+    Connections that waited in the queue longer than queue_timeout are
+    answered with 503 instead of being served late.
+    """
+    
+    def __init__(self, 
+                 handle: Callable[[socket.socket], None], 
+                 workers: int = ServerConfig.MAX_ACTIVE_CLIENTS, 
+                 queue_size: int = ServerConfig.ACCEPT_QUEUE_SIZE, 
+                 overload: str = ServerConfig.OVERLOAD_POLICY, 
+                 queue_timeout: float = ServerConfig.ACCEPT_QUEUE_TIMEOUT, 
+                 client_limits: Optional[ClientLimits] = None):
+        """
+        Initialize worker pool
+        
+        :param handle: Serves one client connection and closes it
+        :param workers: Worker threads, i.e. connections served at once
+        :param queue_size: Accepted connections waiting for a worker at most
+        :param overload: ServerConfig.OVERLOAD_QUEUE, OVERLOAD_SHED or OVERLOAD_PAUSE
+        :param queue_timeout: Seconds a connection may wait for a worker
+        :param client_limits: Per-client connection caps (a default one if None)
+        """
+        self._handle = handle
+        self._workers = workers
+        self._overload = overload
+        self._queue_timeout = queue_timeout
+        self._client_limits = client_limits if client_limits is not None else ClientLimits()
+        # Free places among the workers and the queue behind them
+        capacity = workers + (0 if overload == ServerConfig.OVERLOAD_PAUSE else queue_size)
+        self._slots = threading.Semaphore(capacity)
+        self._queue: 'queue.Queue[Optional[Tuple[socket.socket, str, float]]]' = queue.Queue()
+        self._threads = []
+        self._busy = 0
+        self._busy_lock = threading.Lock()
+        self._stopped = threading.Event()
+    
+    def start(self) -> None:
+        """Start the worker threads"""
+        self._stopped.clear()
+        for index in range(self._workers):
+            thread = threading.Thread(target=self._run, name=f'ClientWorker-{index}')
+            thread.start()
+            self._threads.append(thread)
+    
+    def stop(self) -> None:
+        """Let the workers finish the connections already queued, then end them"""
+        if self._stopped.is_set():
+            return
+        self._stopped.set()
+        for _ in self._threads:
+            self._queue.put(None)
+        self._threads = []
+    
+    def dispatch(self, client_socket: socket.socket, address: Tuple[str, int]) -> bool:
+        """
+        Queue an accepted connection for a worker, or turn it away
+        
+        :param client_socket: Accepted client socket
+        :param address: Client address
+        :return: True if queued, False if answered with an error and closed
+        """
+        client_ip = address[0]
+        if self._stopped.is_set():
+            client_socket.close()
+            return False
+        if not self._client_limits.acquire(client_ip):
+            self._reject(client_socket, CLIENT_LIMIT_RESPONSE, 'client_limit')
+            return False
+        
+        if self._overload == ServerConfig.OVERLOAD_SHED:
+            admitted = self._slots.acquire(blocking=False)
+        else:
+            # Blocking here keeps the acceptor from accepting more
+            admitted = False
+            while not admitted and not self._stopped.is_set():
+                admitted = self._slots.acquire(timeout=0.1)
+        if not admitted:
+            self._client_limits.release(client_ip)
+            self._reject(client_socket, OVERLOADED_RESPONSE, 'overload')
+            return False
+        
+        self._queue.put((client_socket, client_ip, time.monotonic()))
+        return True
+    
+    def _run(self) -> None:
+        """Serve queued connections until a stop marker is taken"""
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            client_socket, client_ip, queued_at = item
+            with self._busy_lock:
+                self._busy += 1
+            try:
+                if time.monotonic() - queued_at > self._queue_timeout:
+                    self._reject(client_socket, OVERLOADED_RESPONSE, 'queue_timeout')
+                else:
+                    self._handle(client_socket)
+            except Exception as e:
+                Logger.log_error(f"Client worker error: {e}")
+            finally:
+                with self._busy_lock:
+                    self._busy -= 1
+                self._client_limits.release(client_ip)
+                self._slots.release()
+    
+    @staticmethod
+    def _reject(client_socket: socket.socket, response: bytes, reason: str) -> None:
+        """Answer a connection that will not be served, and close it"""
+        Metrics.increment('proxy_rejected_connections_total', reason=reason)
+        try:
+            client_socket.sendall(response)
+        except OSError:
+            pass
+        finally:
+            client_socket.close()
+    
+    def metrics(self) -> Dict[str, float]:
+        """
+        Get the pool's load, for the metrics endpoint
+        
+        :return: Current values by metric name
+        """
+        return {
+            'proxy_active_clients': self._busy,
+            'proxy_queued_clients': self._queue.qsize()
+        }
+
+
+class AsyncAdmission:
+    """
+    Limit how many client connections the event loop serves at once
+    
+    Connections beyond max_active wait for a free slot, up to queue_size
+    of them for at most queue_timeout seconds; the rest are answered
+    with 503. OVERLOAD_SHED answers every connection beyond max_active
+    with 503 right away. The event loop accepts connections on its own,
+    so OVERLOAD_PAUSE cannot stop it from accepting and behaves like
+    OVERLOAD_QUEUE.
+    """
+    
+    def __init__(self, 
+                 handle: Callable[[asyncio.StreamReader, asyncio.StreamWriter], Awaitable[None]], 
+                 max_active: int = ServerConfig.MAX_ACTIVE_CLIENTS, 
+                 queue_size: int = ServerConfig.ACCEPT_QUEUE_SIZE, 
+                 overload: str = ServerConfig.OVERLOAD_POLICY, 
+                 queue_timeout: float = ServerConfig.ACCEPT_QUEUE_TIMEOUT, 
+                 client_limits: Optional[ClientLimits] = None):
+        """
+        Initialize admission control
+        
+        :param handle: Serves one client connection and closes it
+        :param max_active: Connections served at once
+        :param queue_size: Connections waiting for a slot at most
+        :param overload: ServerConfig.OVERLOAD_QUEUE, OVERLOAD_SHED or OVERLOAD_PAUSE
+        :param queue_timeout: Seconds a connection may wait for a slot
+        :param client_limits: Per-client connection caps (a default one if None)
+        """
+        self._handle = handle
+        self._max_active = max_active
+        self._queue_size = 0 if overload == ServerConfig.OVERLOAD_SHED else queue_size
+        self._queue_timeout = queue_timeout
+        self._client_limits = client_limits if client_limits is not None else ClientLimits()
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._active = 0
+        self._waiting = 0
+    
+    async def __call__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """
+        Serve a connection if admitted
+        
+        :param reader: Client stream reader
+        :param writer: Client stream writer
+        """
+        peer = writer.get_extra_info('peername')
+        client_ip = peer[0] if peer else ''
+        if not self._client_limits.acquire(client_ip):
+            await self._reject(writer, CLIENT_LIMIT_RESPONSE, 'client_limit')
+            return
+        
+        try:
+            if self._slots is None:
+                self._slots = asyncio.Semaphore(self._max_active)
+            if self._slots.locked():
+                if self._waiting >= self._queue_size:
+                    await self._reject(writer, OVERLOADED_RESPONSE, 'overload')
+                    return
+                self._waiting += 1
+                try:
+                    await asyncio.wait_for(self._slots.acquire(), self._queue_timeout)
+                except asyncio.TimeoutError:
+                    await self._reject(writer, OVERLOADED_RESPONSE, 'queue_timeout')
+                    return
+                finally:
+                    self._waiting -= 1
+            else:
+                await self._slots.acquire()
+            
+            self._active += 1
+            try:
+                await self._handle(reader, writer)
+            finally:
+                self._active -= 1
+                self._slots.release()
+        finally:
+            self._client_limits.release(client_ip)
+    
+    @staticmethod
+    async def _reject(writer: asyncio.StreamWriter, response: bytes, reason: str) -> None:
+        """Answer a connection that will not be served, and close it"""
+        Metrics.increment('proxy_rejected_connections_total', reason=reason)
+        try:
+            writer.write(response)
+            await writer.drain()
+        except Exception:
+            pass
+        finally:
+            writer.close()
+    
+    def metrics(self) -> Dict[str, float]:
+        """
+        Get the loop's load, for the metrics endpoint
+        
+        :return: Current values by metric name
+        """
+        return {
+            'proxy_active_clients': self._active,
+            'proxy_queued_clients': self._waiting
+        }
\ No newline at end of file
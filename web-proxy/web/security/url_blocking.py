@@ -1,35 +1,501 @@
 # web/security/url_blocking.py
+import ipaddress
+import itertools
+import os
 import re
+import threading
+import time
+from typing import AbstractSet, Dict, FrozenSet, Iterable, List, Optional, Pattern, Set, Tuple
+from ..config.settings import ServerConfig
+from ..logging.logger import Logger
+
+# Blocklist lines shaped like a host name are domain entries; a leading
+# '*.' or '.' is accepted and means the same (host and subdomains)
+_DOMAIN_ENTRY = re.compile(r'(?:\*?\.)?([a-z0-9_-]+(?:\.[a-z0-9_-]+)*)\.?', re.IGNORECASE)
+# Backreferences are numbered per pattern, so they cannot be combined
+_BACKREFERENCE = re.compile(r'\\[1-9]|\(\?P=')
+# Patterns are indexed by a substring of this length that every match contains
+_GRAM_SIZE = 4
+_QUANTIFIER = re.compile(r'\{\d*,?\d*\}')
+# Escapes standing for one character, and any other escape sequence
+# (classes like \d, backreferences, named characters)
+_CHARACTER_ESCAPE = re.compile(
+    r'x[0-9a-f]{2}|u[0-9a-f]{4}|U[0-9a-fA-F]{8}|[0-3][0-7]{2}|0[0-7]{0,2}|[^0-9a-z]',
+    re.IGNORECASE | re.DOTALL
+)
+_OTHER_ESCAPE = re.compile(r'N\{[^}]*\}|\d{1,2}|.?', re.DOTALL)
+
+def _url_host(url: str) -> str:
+    """
+    Get the lower-cased host of an absolute URL or authority-form target
+    
+    :param url: Request target
+    :return: Host name, or '' for origin-form targets
+    """
+    if url.startswith('/'):
+        return ''
+    authority = url.partition('://')[2] if '://' in url else url
+    for delimiter in '/?#':
+        authority = authority.partition(delimiter)[0]
+    authority = authority.rpartition('@')[2]
+    if authority.startswith('['):
+        return authority[1:].partition(']')[0].lower()
+    return authority.partition(':')[0].rstrip('.').lower()
+
+
+def _escaped_character(escape: str) -> str:
+    """
+    Get the character a character escape stands for
+    
+    :param escape: Escape matched by _CHARACTER_ESCAPE, without the backslash
+    :return: Escaped character
+    """
+    if escape[0] in 'xuU':
+        return chr(int(escape[1:], 16))
+    if escape[0].isdigit():
+        return chr(int(escape, 8))
+    return escape
+
+
+def _required_literals(pattern: str) -> List[str]:
+    """
+    Find literal substrings every match of a regex contains
+    
+    Only text outside groups and character classes is considered, and
+    any construct that is not understood ends the current substring, so
+    the result may miss literals but never includes optional text.
+    
+    :param pattern: Regex
+    :return: Lower-case literal substrings (none for top-level alternations
+             or patterns starting with inline flags)
+    """
+    if pattern.startswith('(?') and pattern[2:3].isalpha():
+        return []
+    literals: List[str] = []
+    run: List[str] = []
+    depth = 0
+    position = 0
+    while position < len(pattern):
+        char = pattern[position]
+        position += 1
+        if char == '\\':
+            # Skip the whole escape sequence, keeping the character it
+            # stands for when it is one
+            escape = _CHARACTER_ESCAPE.match(pattern, position)
+            position = (escape or _OTHER_ESCAPE.match(pattern, position)).end()
+            escaped = _escaped_character(escape.group()) if escape else ''
+            if depth == 0 and escaped.isascii() and escaped:
+                run.append(escaped.lower())
+                continue
+        elif char == '[':
+            # Skip the class; a ']' right after '[' or '[^' is a member
+            position += 1 if pattern.startswith('^', position) else 0
+            position += 1 if pattern.startswith(']', position) else 0
+            while position < len(pattern) and pattern[position] != ']':
+                position += 2 if pattern[position] == '\\' else 1
+            position += 1
+        elif char == '(':
+            depth += 1
+        elif char == ')':
+            depth -= 1
+        elif depth:
+            continue
+        elif char == '|':
+            return []
+        elif char in '*?{':
+            # The quantified character is optional
+            if run:
+                run.pop()
+            if char == '{':
+                quantifier = _QUANTIFIER.match(pattern, position - 1)
+                position = quantifier.end() if quantifier else position
+        elif char.isascii() and char not in '.^$+':
+            run.append(char.lower())
+            continue
+        
+        if run:
+            literals.append(''.join(run))
+            run = []
+    if run:
+        literals.append(''.join(run))
+    return literals
+
+
+def parse_blocklist(lines: Iterable[str]) -> Tuple[Set[str], List[str]]:
+    """
+    Split blocklist lines into domain entries and URL patterns
+    
+    Blank lines and lines starting with '#' are skipped. Hosts-file
+    lines ('0.0.0.0 ads.example.com') contribute the hosts they list.
+    
+    :param lines: Blocklist lines
+    :return: (domains, patterns)
+    """
+    domains: Set[str] = set()
+    patterns: List[str] = []
+    for line in lines:
+        line = line.strip()
+        if not line or line.startswith('#'):
+            continue
+        
+        fields = line.split()
+        if len(fields) > 1:
+            try:
+                ipaddress.ip_address(fields[0])
+            except ValueError:
+                pass
+            else:
+                for field in fields[1:]:
+                    if field.startswith('#'):
+                        break
+                    domain = _DOMAIN_ENTRY.fullmatch(field)
+                    if domain:
+                        domains.add(domain.group(1).lower())
+                continue
+        
+        domain = _DOMAIN_ENTRY.fullmatch(line)
+        if domain:
+            domains.add(domain.group(1).lower())
+        else:
+            patterns.append(line)
+    return domains, patterns
+
+
+class _CompiledBlocklist:
+    """
+    Matcher compiled once from a fixed set of domains and patterns
+    
+    Domains are looked up in a hash set, one lookup per label suffix of
+    the host. Patterns are indexed by a short substring every match
+    must contain, so a lookup only runs the few patterns whose substring
+    occurs in the URL. The rest are joined into a single alternation,
+    except for those that cannot be combined (backreferences, named
+    groups, inline global flags), which are matched one by one.
+    """
+    
+    __slots__ = ('compiled', '_domains', '_indexed', '_all_indexed', '_combined', '_separate',
+                 '_verdicts', '_verdict_cache_size')
+    
+    def __init__(self,
+                 domains: AbstractSet[str],
+                 patterns: Tuple[str, ...],
+                 verdict_cache_size: int,
+                 reuse: Optional[Dict[str, Pattern]] = None):
+        """
+        Compile a blocklist
+        
+        :param domains: Lower-case domains blocked with their subdomains
+        :param patterns: URL regexes, matched from the start of the URL
+        :param verdict_cache_size: URLs whose verdict is remembered
+        :param reuse: Patterns already compiled (case-insensitive), e.g.
+                      by the matcher being replaced
+        :raises re.error: If a pattern is not a valid regex
+        """
+        reuse = reuse or {}
+        # Compiled patterns of this blocklist, for the next one to reuse
+        self.compiled: Dict[str, Pattern] = {}
+        self._domains = domains
+        self._indexed: Dict[str, List[Pattern]] = {}
+        self._all_indexed: List[Pattern] = []
+        self._separate: List[Pattern] = []
+        combinable: List[str] = []
+        for pattern in patterns:
+            compiled_pattern = reuse.get(pattern) or re.compile(pattern, re.IGNORECASE)
+            self.compiled[pattern] = compiled_pattern
+            grams = {
+                literal[start:start + _GRAM_SIZE]
+                for literal in _required_literals(pattern)
+                for start in range(len(literal) - _GRAM_SIZE + 1)
+            }
+            if grams:
+                # Spread patterns over as many substrings as possible
+                gram = min(sorted(grams), key=lambda gram: len(self._indexed.get(gram, ())))
+                self._indexed.setdefault(gram, []).append(compiled_pattern)
+                self._all_indexed.append(compiled_pattern)
+                continue
+            
+            if compiled_pattern.groupindex or _BACKREFERENCE.search(pattern):
+                self._separate.append(compiled_pattern)
+                continue
+            try:
+                re.compile(f'(?:{pattern})')
+            except re.error:
+                self._separate.append(compiled_pattern)
+            else:
+                combinable.append(f'(?:{pattern})')
+        self._combined: Optional[Pattern] = (
+            re.compile('|'.join(combinable), re.IGNORECASE) if combinable else None
+        )
+        self._verdicts: Dict[Tuple[str, str], bool] = {}
+        self._verdict_cache_size = verdict_cache_size
+    
+    def is_blocked(self, url: str, host: str) -> bool:
+        """
+        Check a URL against the blocklist
+        
+        :param url: Request target
+        :param host: Lower-case host of the request ('' if unknown)
+        :return: True if blocked
+        """
+        key = (host, url)
+        verdict = self._verdicts.get(key)
+        if verdict is not None:
+            return verdict
+        
+        verdict = self._match(url, host)
+        if self._verdict_cache_size > 0:
+            # Start over rather than track recency, so lookups stay lock-free
+            if len(self._verdicts) >= self._verdict_cache_size:
+                self._verdicts = {}
+            self._verdicts[key] = verdict
+        return verdict
+    
+    def _match(self, url: str, host: str) -> bool:
+        """Match a URL without consulting the verdict cache"""
+        if host and self._domains:
+            domains = self._domains
+            if host in domains:
+                return True
+            dot = host.find('.')
+            while dot >= 0:
+                if host[dot + 1:] in domains:
+                    return True
+                dot = host.find('.', dot + 1)
+        
+        if self._indexed:
+            if url.isascii():
+                indexed = self._indexed
+                lowered = url.lower()
+                for start in range(len(lowered) - _GRAM_SIZE + 1):
+                    candidates = indexed.get(lowered[start:start + _GRAM_SIZE])
+                    if candidates and any(pattern.match(url) for pattern in candidates):
+                        return True
+            # Case-insensitive matching folds some non-ASCII letters to ASCII ones
+            elif any(pattern.match(url) for pattern in self._all_indexed):
+                return True
+        
+        if self._combined is not None and self._combined.match(url):
+            return True
+        return any(pattern.match(url) for pattern in self._separate)
+
 
 class URLBlocker:
     """
     Manage URL blocking based on configuration
+    
+    Blocks requests for listed domains (and their subdomains) and for
+    URLs matching listed regexes. The lists are compiled into an
+    immutable matcher; any change compiles a new one next to it and
+    swaps it in with a single assignment, so lookups never wait for a
+    change and never see a half-built matcher. Blocklist files are
+    watched and reloaded by a background thread once start() is called;
+    replacing a file (write a copy, then rename it over the original)
+    is picked up on the next check, a file rewritten in place once it
+    has not changed for a whole check interval.
     """
     
-    def __init__(self):
-        """Initialize URL blocker with default blocked patterns"""
-        self._blocked_patterns = [
-            r'.*malicious\..*',
-            r'.*porn\..*',
-            r'.*gambling\..*'
-        ]
+    DEFAULT_PATTERNS = (
+        r'.*malicious\..*',
+        r'.*porn\..*',
+        r'.*gambling\..*'
+    )
     
-    def is_blocked(self, url: str) -> bool:
+    def __init__(self,
+                 patterns: Iterable[str] = DEFAULT_PATTERNS,
+                 blocklist_files: Iterable[str] = ServerConfig.BLOCKLIST_FILES,
+                 verdict_cache_size: int = ServerConfig.BLOCKLIST_VERDICT_CACHE_SIZE,
+                 reload_interval: float = ServerConfig.BLOCKLIST_RELOAD_INTERVAL):
+        """
+        Initialize URL blocker
+        
+        :param patterns: URL regexes blocked from the start
+        :param blocklist_files: Blocklist files loaded from the start
+        :param verdict_cache_size: Recently checked URLs whose verdict is
+                                   remembered (0 disables the cache)
+        :param reload_interval: Seconds between checks of the blocklist
+                                files for changes (0 disables reloading)
+        """
+        self._blocked_patterns: Tuple[str, ...] = tuple(patterns)
+        self._blocked_domains: FrozenSet[str] = frozenset()
+        # Per blocklist file: stat signature when read, domains, patterns
+        self._files: Dict[str, Tuple[Optional[Tuple[int, int, int]], AbstractSet[str], Tuple[str, ...]]] = {}
+        # Signature of each file at the previous background check
+        self._seen: Dict[str, Tuple[int, int, int]] = {}
+        self._verdict_cache_size = verdict_cache_size
+        self._reload_interval = reload_interval
+        # Serializes changes; lookups never take it
+        self._update_lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._matcher = _CompiledBlocklist(frozenset(), self._blocked_patterns, verdict_cache_size)
+        for path in blocklist_files:
+            try:
+                self.load_blocklist_file(path)
+            except (OSError, UnicodeDecodeError) as e:
+                Logger.log_error(f"Blocklist {path} not loaded: {e}")
+    
+    def is_blocked(self, url: str, host: Optional[str] = None) -> bool:
         """
         Check if a URL is blocked
         
         :param url: URL to check
+        :param host: Host of the request, needed to apply domain entries
+                     to origin-form URLs (taken from the URL by default)
         :return: True if blocked, False otherwise
         """
-        return any(
-            re.match(pattern, url, re.IGNORECASE) 
-            for pattern in self._blocked_patterns
-        )
+        host = host.lower() if host else _url_host(url)
+        return self._matcher.is_blocked(url, host)
     
     def add_blocked_pattern(self, pattern: str) -> None:
         """
         Add a new URL blocking pattern
         
         :param pattern: Regex pattern to block
+        :raises re.error: If the pattern is not a valid regex
+        """
+        compiled = re.compile(pattern, re.IGNORECASE)
+        with self._update_lock:
+            self._blocked_patterns += (pattern,)
+            self._swap({pattern: compiled})
+    
+    def add_blocked_domain(self, domain: str) -> None:
+        """
+        Block a domain and all of its subdomains
+        
+        :param domain: Domain name, e.g. 'ads.example.com'
+        :raises ValueError: If the value is not a domain name
+        """
+        entry = _DOMAIN_ENTRY.fullmatch(domain.strip())
+        if not entry:
+            raise ValueError(f"Not a domain name: {domain!r}")
+        with self._update_lock:
+            self._blocked_domains |= {entry.group(1).lower()}
+            self._swap()
+    
+    def load_blocklist_file(self, path: str) -> int:
+        """
+        Load a blocklist file and keep it watched for changes
+        
+        Lines are host names or URL regexes as described in
+        parse_blocklist(); invalid regexes are logged and skipped.
+        Loading the same file again replaces its entries.
+        
+        :param path: Blocklist file path
+        :return: Number of entries loaded
+        """
+        with self._update_lock:
+            return self._load_file(path, self._stat(path))
+    
+    def reload(self) -> int:
         """
-        self._blocked_patterns.append(pattern)
\ No newline at end of file
+        Reload the blocklist files that changed since they were read
+        
+        A file that disappears keeps blocking what it listed until it
+        is back.
+        
+        :return: Number of files reloaded
+        """
+        return self._reload(settled_only=False)
+    
+    def start(self) -> None:
+        """Start watching the blocklist files"""
+        if self._reload_interval > 0 and self._thread is None:
+            self._stopped.clear()
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+    
+    def stop(self) -> None:
+        """Stop watching the blocklist files"""
+        self._stopped.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join()
+        self._thread = None
+    
+    def _run(self) -> None:
+        """Reload changed blocklist files every interval until stopped"""
+        while not self._stopped.wait(self._reload_interval):
+            self._reload(settled_only=True)
+    
+    def _reload(self, settled_only: bool) -> int:
+        """
+        Reload changed blocklist files
+        
+        :param settled_only: Only reload files replaced by another file or
+                             unchanged since the previous check, so a file
+                             still being written is not read half-way
+        :return: Number of files reloaded
+        """
+        reloaded = 0
+        with self._update_lock:
+            for path, (signature, _, _) in list(self._files.items()):
+                try:
+                    current = self._stat(path)
+                except OSError as e:
+                    if signature is not None:
+                        Logger.log_warning(f"Blocklist {path} unavailable, keeping its entries: {e}")
+                        self._files[path] = (None,) + self._files[path][1:]
+                    continue
+                if current == signature:
+                    continue
+                # A file renamed over the original was complete before the
+                # rename; one rewritten in place may still be being written
+                replaced = signature is not None and current[0] != signature[0]
+                if settled_only and not replaced and self._seen.get(path) != current:
+                    self._seen[path] = current
+                    continue
+                try:
+                    self._load_file(path, current)
+                    reloaded += 1
+                except (OSError, UnicodeDecodeError) as e:
+                    Logger.log_error(f"Blocklist {path} not reloaded: {e}")
+        return reloaded
+    
+    def _load_file(self, path: str, signature: Tuple[int, int, int]) -> int:
+        """Read a blocklist file and swap in a matcher including it (update lock held)"""
+        started = time.perf_counter()
+        with open(path, encoding='utf-8') as blocklist_file:
+            domains, patterns = parse_blocklist(blocklist_file)
+        
+        compiled = {}
+        for pattern in dict.fromkeys(patterns):
+            try:
+                compiled[pattern] = self._matcher.compiled.get(pattern) or re.compile(pattern, re.IGNORECASE)
+            except re.error as e:
+                Logger.log_warning(f"Skipping invalid blocklist pattern {pattern!r} in {path}: {e}")
+        
+        # The set is built line by line above, so other threads keep running;
+        # it is never changed once stored
+        self._files[path] = (signature, domains, tuple(compiled))
+        self._swap(compiled)
+        Logger.log_info(
+            f"Loaded blocklist {path}: {len(domains)} domains, {len(compiled)} patterns "
+            f"in {(time.perf_counter() - started) * 1000:.0f} ms"
+        )
+        return len(domains) + len(compiled)
+    
+    def _swap(self, compiled: Optional[Dict[str, Pattern]] = None) -> None:
+        """
+        Build a matcher for the current entries and make it the one in use
+        
+        Called with the update lock held; patterns compiled by the
+        current matcher are reused.
+        
+        :param compiled: Newly compiled patterns to reuse as well
+        """
+        sources = [
+            domains for domains in (self._blocked_domains, *(entry[1] for entry in self._files.values()))
+            if domains
+        ]
+        # A lone list is used as is: copying a large set holds the GIL throughout
+        domains = sources[0] if len(sources) == 1 else frozenset().union(*sources)
+        patterns = tuple(dict.fromkeys(itertools.chain(
+            self._blocked_patterns, *(entry[2] for entry in self._files.values())
+        )))
+        reuse = {**self._matcher.compiled, **compiled} if compiled else self._matcher.compiled
+        self._matcher = _CompiledBlocklist(domains, patterns, self._verdict_cache_size, reuse)
+    
+    @staticmethod
+    def _stat(path: str) -> Tuple[int, int, int]:
+        """Signature of a file that changes whenever it is rewritten or replaced"""
+        stat = os.stat(path)
+        return stat.st_ino, stat.st_size, stat.st_mtime_ns
@@ -0,0 +1,124 @@
+import asyncio
+import socket
+import threading
+import time
+
+from web.config.settings import ServerConfig
+from web.proxy.worker_pool import AsyncAdmission, ClientLimits, ClientWorkerPool
+
+
+class BlockingHandler:
+    """Connection handler that holds each connection until released"""
+
+    def __init__(self):
+        self.release = threading.Event()
+        self.served = 0
+
+    def __call__(self, client_socket):
+        self.release.wait(5)
+        self.served += 1
+        client_socket.sendall(b'HTTP/1.1 200 OK\r\nContent-Length: 0\r\n\r\n')
+        client_socket.close()
+
+
+def _connect(pool, ip='10.0.0.1'):
+    server_side, client_side = socket.socketpair()
+    client_side.settimeout(5)
+    return pool.dispatch(server_side, (ip, 40000)), client_side
+
+
+def test_client_limits_cap_each_ip():
+    limits = ClientLimits(max_per_client=2)
+    assert limits.acquire('a') and limits.acquire('a')
+    assert not limits.acquire('a')
+    assert limits.acquire('b')
+    limits.release('a')
+    assert limits.acquire('a')
+
+
+def test_shed_policy_answers_503_when_full():
+    handler = BlockingHandler()
+    pool = ClientWorkerPool(handler, workers=1, queue_size=1, overload=ServerConfig.OVERLOAD_SHED)
+    pool.start()
+    try:
+        admitted = [_connect(pool) for _ in range(3)]
+        assert [queued for queued, _ in admitted] == [True, True, False]
+        assert admitted[2][1].recv(1024).startswith(b'HTTP/1.1 503')
+        handler.release.set()
+        for _, client in admitted[:2]:
+            assert client.recv(1024).startswith(b'HTTP/1.1 200')
+    finally:
+        handler.release.set()
+        pool.stop()
+
+
+def test_queue_policy_blocks_the_acceptor_until_a_worker_frees_up():
+    handler = BlockingHandler()
+    pool = ClientWorkerPool(handler, workers=1, queue_size=0, overload=ServerConfig.OVERLOAD_QUEUE)
+    pool.start()
+    try:
+        assert _connect(pool)[0]
+        second = []
+        acceptor = threading.Thread(target=lambda: second.append(_connect(pool)))
+        acceptor.start()
+        time.sleep(0.2)
+        assert acceptor.is_alive()
+
+        handler.release.set()
+        acceptor.join(5)
+        assert second[0][0]
+        assert second[0][1].recv(1024).startswith(b'HTTP/1.1 200')
+    finally:
+        handler.release.set()
+        pool.stop()
+
+
+def test_connections_queued_too_long_are_turned_away():
+    handler = BlockingHandler()
+    pool = ClientWorkerPool(handler, workers=1, queue_size=4, queue_timeout=0.05)
+    pool.start()
+    try:
+        _connect(pool)
+        _, late = _connect(pool)
+        time.sleep(0.2)
+        handler.release.set()
+        assert late.recv(1024).startswith(b'HTTP/1.1 503')
+        assert handler.served == 1
+    finally:
+        handler.release.set()
+        pool.stop()
+
+
+def test_async_admission_sheds_and_caps_clients():
+    async def scenario():
+        release = asyncio.Event()
+
+        async def handle(reader, writer):
+            await release.wait()
+            writer.write(b'HTTP/1.1 200 OK\r\nContent-Length: 0\r\n\r\n')
+            await writer.drain()
+            writer.close()
+
+        admission = AsyncAdmission(
+            handle, max_active=1, queue_size=1, overload=ServerConfig.OVERLOAD_QUEUE,
+            queue_timeout=5, client_limits=ClientLimits(max_per_client=2)
+        )
+        server = await asyncio.start_server(admission, '127.0.0.1', 0)
+        port = server.sockets[0].getsockname()[1]
+        connections = []
+        for _ in range(3):
+            connections.append(await asyncio.open_connection('127.0.0.1', port))
+            await asyncio.sleep(0.05)
+        assert admission.metrics() == {'proxy_active_clients': 1, 'proxy_queued_clients': 1}
+
+        release.set()
+        replies = [await reader.read() for reader, _ in connections]
+        for _, writer in connections:
+            writer.close()
+        server.close()
+        await server.wait_closed()
+        return replies
+
+    replies = asyncio.run(scenario())
+    assert replies[0].startswith(b'HTTP/1.1 200') and replies[1].startswith(b'HTTP/1.1 200')
+    assert replies[2].startswith(b'HTTP/1.1 429')
\ No newline at end of file
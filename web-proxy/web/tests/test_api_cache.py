@@ -0,0 +1,49 @@
+import asyncio
+
+from api.cache import CacheManager
+
+
+def _counting_source(cache: CacheManager, delay: float = 0.05):
+    calls = []
+
+    @cache.cached(ttl=120)
+    async def get_weather(owner, city: str):
+        calls.append(city)
+        await asyncio.sleep(delay)
+        return {"city": city}
+
+    return get_weather, calls
+
+
+def test_concurrent_calls_share_one_execution():
+    cache = CacheManager()
+    get_weather, calls = _counting_source(cache)
+
+    async def main():
+        return await asyncio.gather(*(get_weather(None, "Oslo") for _ in range(5)))
+
+    results = asyncio.run(main())
+
+    assert results == [{"city": "Oslo"}] * 5
+    assert calls == ["Oslo"]
+    assert not cache.in_flight
+
+
+def test_cancelled_caller_does_not_cancel_the_shared_call():
+    cache = CacheManager()
+    get_weather, calls = _counting_source(cache)
+
+    async def main():
+        first = asyncio.ensure_future(get_weather(None, "Oslo"))
+        await asyncio.sleep(0.01)
+        second = asyncio.ensure_future(get_weather(None, "Oslo"))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        return await second, first.cancelled()
+
+    result, first_cancelled = asyncio.run(main())
+
+    assert first_cancelled
+    assert result == {"city": "Oslo"}
+    assert calls == ["Oslo"]
+    assert list(cache.cache.values()) == [{"city": "Oslo"}]
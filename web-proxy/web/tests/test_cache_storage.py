@@ -0,0 +1,159 @@
+import pytest
+
+from web.cache.cache_eviction import CacheEvictionStrategy, LFUEvictionPolicy
+from web.cache.cache_storage import CacheStorage
+from web.config.cache_settings import CacheConfig
+
+
+def test_lru_evicts_least_recently_read_entry():
+    storage = CacheStorage(max_size=2, eviction_policy=CacheConfig.EVICTION_LRU)
+    storage.set('a', 1)
+    storage.set('b', 2)
+    storage.get('a')
+    storage.set('c', 3)
+
+    assert 'b' not in storage
+    assert storage.get('a') == 1 and storage.get('c') == 3
+
+
+def test_fifo_ignores_reads_when_evicting():
+    storage = CacheStorage(max_size=2, eviction_policy=CacheConfig.EVICTION_FIFO)
+    storage.set('a', 1)
+    storage.set('b', 2)
+    storage.get('a')
+    storage.set('c', 3)
+
+    assert 'a' not in storage
+    assert len(storage) == 2
+
+
+def test_lfu_evicts_least_frequent_then_oldest():
+    storage = CacheStorage(max_size=3, eviction_policy=CacheConfig.EVICTION_LFU)
+    for key in ('a', 'b', 'c'):
+        storage.set(key, key)
+    storage.get('a')
+    storage.get('a')
+    storage.get('c')
+    storage.set('d', 'd')
+
+    assert 'b' not in storage
+    storage.set('e', 'e')
+    assert 'd' not in storage
+    assert {'a', 'c', 'e'} == {key for key in 'abcde' if key in storage}
+
+
+def test_lfu_recovers_minimum_after_out_of_order_removal():
+    policy = LFUEvictionPolicy()
+    for key in ('a', 'b'):
+        policy.record_insert(key)
+    policy.record_access('b')
+    policy.record_remove('a')
+
+    assert policy.select_victim() == 'b'
+
+
+@pytest.mark.parametrize('name', [
+    CacheConfig.EVICTION_LRU, CacheConfig.EVICTION_FIFO, CacheConfig.EVICTION_LFU
+])
+def test_delete_keeps_policy_in_sync(name):
+    storage = CacheStorage(max_size=2, eviction_policy=name)
+    storage.set('a', 1)
+    storage.set('b', 2)
+    storage.delete('a')
+    storage.set('c', 3)
+
+    assert len(storage) == 2 and 'b' in storage and 'c' in storage
+
+
+def test_unknown_policy_falls_back_to_lru():
+    policy = CacheEvictionStrategy.get_strategy('does-not-exist')
+    assert type(policy).__name__ == 'LRUEvictionPolicy'
+
+
+def test_expired_entries_are_removed_lazily_and_in_deadline_order(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr('web.cache.cache_storage.time.time', lambda: now[0])
+    storage = CacheStorage(max_size=10, expiration_time=60)
+    storage.set('short', 1, ttl=5)
+    storage.set('long', 2)
+
+    now[0] += 10
+    assert storage.get('short') is None
+    assert storage.get('long') == 2
+
+    now[0] += 100
+    assert storage.purge_expired() == 1
+    assert len(storage) == 0
+
+
+def test_overwrite_supersedes_earlier_deadline(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr('web.cache.cache_storage.time.time', lambda: now[0])
+    storage = CacheStorage(max_size=10, expiration_time=60)
+    storage.set('key', 'old', ttl=5)
+    storage.set('key', 'new', ttl=50)
+
+    now[0] += 10
+    storage.set('other', 'x')
+    assert storage.get('key') == 'new'
+
+
+def test_expiry_heap_stays_bounded_under_overwrites():
+    storage = CacheStorage(max_size=10)
+    for i in range(10_000):
+        storage.set('hot', i)
+
+    assert len(storage._expiry_heap) <= 2 * len(storage) + 64
+
+
+def test_byte_budget_evicts_until_new_value_fits():
+    storage = CacheStorage(max_size=100, max_bytes=100)
+    storage.set('a', b'x' * 40)
+    storage.set('b', b'x' * 40)
+    storage.set('c', b'x' * 40)
+
+    assert 'a' not in storage
+    assert storage.size_bytes == 80
+
+
+def test_overwrite_replaces_accounted_size():
+    storage = CacheStorage(max_size=100, max_bytes=100)
+    storage.set('a', b'x' * 60)
+    storage.set('a', b'x' * 90)
+
+    assert storage.size_bytes == 90
+    storage.delete('a')
+    assert storage.size_bytes == 0
+
+
+def test_max_object_size_rejects_and_drops_stale_version():
+    storage = CacheStorage(max_size=100, max_object_size=50)
+    assert storage.set('a', b'x' * 10)
+    assert not storage.set('a', b'x' * 51)
+
+    assert 'a' not in storage
+    assert storage.size_bytes == 0
+
+
+def test_cache_manager_exposes_current_bytes():
+    from web.cache.cache_manager import CacheManager
+
+    manager = CacheManager(max_bytes=1024)
+    manager.cache('a', b'x' * 100)
+    manager.cache('b', b'x' * 200)
+    assert manager.cache_bytes == 300
+
+
+def test_stale_ttl_keeps_expired_entry_for_lookup(monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr('web.cache.cache_storage.time.time', lambda: clock[0])
+    storage = CacheStorage()
+    storage.set('a', b'v', ttl=10, stale_ttl=20)
+
+    clock[0] = 1015.0
+    assert storage.get('a') is None
+    assert storage.lookup('a') == (b'v', False)
+
+    clock[0] = 1031.0
+    assert storage.lookup('a') is None
+    assert 'a' not in storage
@@ -0,0 +1,95 @@
+import zlib
+
+import pytest
+
+from web.cache.cache_manager import CacheManager
+from web.cache.compression import accepts_gzip, is_compressed
+from web.cache.http_cache_policy import HTTPCachePolicy
+from web.config.cache_settings import CacheConfig
+from web.proxy.request_parser import RequestParser
+from web.proxy.response_parser import ResponseParser
+
+BODY = b'{"items": [' + b', '.join(b'{"id": %d, "name": "item"}' % i for i in range(200)) + b']}'
+
+
+def _request(headers: str = ''):
+    raw = f"GET /items HTTP/1.1\r\nHost: example.com\r\n{headers}\r\n".encode()
+    return RequestParser.parse_request(raw)
+
+
+def _response(content_type: str = 'application/json', body: bytes = BODY, headers: str = '') -> bytes:
+    return (
+        f"HTTP/1.1 200 OK\r\nContent-Type: {content_type}\r\nCache-Control: max-age=60\r\n"
+        f"ETag: \"v1\"\r\nAccept-Ranges: bytes\r\n{headers}Content-Length: {len(body)}\r\n\r\n".encode()
+        + body
+    )
+
+
+@pytest.fixture(autouse=True)
+def compression(monkeypatch):
+    monkeypatch.setattr(CacheConfig, 'COMPRESS_RESPONSES', True)
+
+
+def test_clients_get_the_encoding_they_accept():
+    manager = CacheManager()
+    policy = HTTPCachePolicy(manager)
+    raw = _response()
+    assert policy.store(_request(), raw)
+
+    key = policy.cache_key(_request())
+    assert is_compressed(manager.retrieve(key))
+    assert manager.cache_bytes < len(raw) / 2
+
+    plain, fresh = policy.lookup(_request(), key)
+    assert fresh and bytes(plain) == raw
+
+    gzipped, _ = policy.lookup(_request('Accept-Encoding: gzip, deflate\r\n'), key)
+    head, body = ResponseParser.parse(gzipped)
+    assert head.get_header('content-encoding') == 'gzip'
+    assert head.get_header('vary') == 'Accept-Encoding'
+    assert head.get_header('etag') == 'W/"v1"'
+    assert 'accept-ranges' not in head.headers
+    assert int(head.get_header('content-length')) == len(body)
+    assert zlib.decompress(body, 31) == BODY
+
+    stats = policy.compression_stats
+    assert stats['compressed'] == 1 and stats['raw_bytes'] == len(raw)
+    assert stats['compressed_bytes'] < stats['raw_bytes']
+
+
+@pytest.mark.parametrize('raw', [
+    _response(content_type='image/png'),
+    _response(body=b'short'),
+    _response(headers='Content-Encoding: br\r\n'),
+])
+def test_unsuitable_responses_are_stored_as_is(raw):
+    manager = CacheManager()
+    policy = HTTPCachePolicy(manager)
+    assert policy.store(_request(), raw)
+
+    assert bytes(manager.retrieve(policy.cache_key(_request()))) == raw
+    assert policy.compression_stats['compressed'] == 0
+
+
+def test_not_modified_refreshes_the_original_response():
+    manager = CacheManager()
+    policy = HTTPCachePolicy(manager)
+    policy.store(_request(), _response())
+    key = policy.cache_key(_request())
+    gzip_client = _request('Accept-Encoding: gzip\r\n')
+    stored, _ = policy.lookup(gzip_client, key)
+
+    not_modified = ResponseParser.parse_head(b'HTTP/1.1 304 Not Modified\r\nETag: "v1"\r\nX-Refreshed: 1\r\n\r\n')
+    refreshed = policy.refresh(gzip_client, key, stored, not_modified)
+
+    head, body = ResponseParser.parse(refreshed)
+    assert head.get_header('x-refreshed') == '1' and body == BODY
+    assert is_compressed(manager.retrieve(key))
+    plain, _ = policy.lookup(_request(), key)
+    assert bytes(plain).endswith(BODY)
+
+
+def test_accept_encoding_quality_zero_refuses_gzip():
+    assert accepts_gzip(_request('Accept-Encoding: br, gzip;q=0.5\r\n'))
+    assert not accepts_gzip(_request('Accept-Encoding: gzip;q=0\r\n'))
+    assert not accepts_gzip(_request())
\ No newline at end of file
@@ -0,0 +1,118 @@
+import os
+
+from web.cache.disk_storage import DiskCacheStorage
+
+
+def _segment_files(directory):
+    return sorted(name for name in os.listdir(directory) if name.endswith('.seg'))
+
+
+def test_values_are_served_from_the_segment_map(tmp_path):
+    storage = DiskCacheStorage(directory=str(tmp_path))
+    storage.set('a', b'HTTP/1.1 200 OK\r\n\r\nhello')
+
+    value = storage.get('a')
+    assert isinstance(value, memoryview)
+    assert bytes(value) == b'HTTP/1.1 200 OK\r\n\r\nhello'
+    storage.close()
+
+
+def test_index_survives_reopen_including_deletes(tmp_path):
+    storage = DiskCacheStorage(directory=str(tmp_path))
+    storage.set('a', b'one')
+    storage.set('b', b'two')
+    storage.set('a', b'three')
+    storage.delete('b')
+    storage.close()
+
+    reopened = DiskCacheStorage(directory=str(tmp_path))
+    assert bytes(reopened.get('a')) == b'three'
+    assert 'b' not in reopened
+    assert reopened.size_bytes == len(b'three')
+    reopened.close()
+
+
+def test_reopen_recovers_segment_without_hint_file(tmp_path):
+    storage = DiskCacheStorage(directory=str(tmp_path))
+    storage.set('a', b'x' * 100)
+    storage.set('b', b'y' * 100)
+    # Simulate a crash: the active segment is never sealed
+    storage._active.map.flush()
+
+    reopened = DiskCacheStorage(directory=str(tmp_path))
+    assert bytes(reopened.get('a')) == b'x' * 100
+    assert bytes(reopened.get('b')) == b'y' * 100
+    reopened.close()
+
+
+def test_expired_entries_are_not_reloaded(tmp_path, monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr('web.cache.cache_storage.time.time', lambda: clock[0])
+    storage = DiskCacheStorage(directory=str(tmp_path))
+    storage.set('a', b'short', ttl=5)
+    storage.set('b', b'long', ttl=500)
+    storage.close()
+
+    clock[0] = 1010.0
+    reopened = DiskCacheStorage(directory=str(tmp_path))
+    assert 'a' not in reopened
+    assert bytes(reopened.get('b')) == b'long'
+    reopened.close()
+
+
+def test_compaction_rewrites_mostly_dead_segments(tmp_path):
+    storage = DiskCacheStorage(directory=str(tmp_path), segment_size=1024)
+    for i in range(20):
+        storage.set(f'key{i % 2}', bytes([i]) * 200)
+
+    # Overwrites keep only two live values, so old segments are dropped
+    assert len(_segment_files(tmp_path)) <= 3
+    assert bytes(storage.get('key0')) == bytes([18]) * 200
+    assert bytes(storage.get('key1')) == bytes([19]) * 200
+    storage.close()
+
+    reopened = DiskCacheStorage(directory=str(tmp_path), segment_size=1024)
+    assert bytes(reopened.get('key1')) == bytes([19]) * 200
+    reopened.close()
+
+
+def test_byte_budget_applies_to_disk_storage(tmp_path):
+    storage = DiskCacheStorage(directory=str(tmp_path), max_bytes=250)
+    storage.set('a', b'x' * 100)
+    storage.set('b', b'x' * 100)
+    storage.set('c', b'x' * 100)
+
+    assert 'a' not in storage
+    assert storage.size_bytes == 200
+    storage.close()
+
+
+def test_shared_storages_see_each_others_writes(tmp_path):
+    first = DiskCacheStorage(directory=str(tmp_path), shared=True, sync_interval=0)
+    second = DiskCacheStorage(directory=str(tmp_path), shared=True, sync_interval=0)
+
+    first.set('a', b'from first')
+    assert bytes(second.get('a')) == b'from first'
+
+    second.set('a', b'from second')
+    assert bytes(first.get('a')) == b'from second'
+
+    first.delete('a')
+    assert second.lookup('a') is None
+    first.close()
+    second.close()
+
+
+def test_shared_storage_forgets_segments_compacted_elsewhere(tmp_path):
+    first = DiskCacheStorage(directory=str(tmp_path), shared=True, sync_interval=0, segment_size=1024)
+    second = DiskCacheStorage(directory=str(tmp_path), shared=True, sync_interval=0, segment_size=1024)
+    for i in range(20):
+        first.set(f'key{i % 2}', bytes([i]) * 200)
+        # The second storage tails each segment first writes
+        second.get('key0')
+
+    assert bytes(second.get('key0')) == bytes([18]) * 200
+    assert bytes(second.get('key1')) == bytes([19]) * 200
+    assert set(second._segments) == {int(name[:-4]) for name in _segment_files(tmp_path)}
+    first.close()
+    second.close()
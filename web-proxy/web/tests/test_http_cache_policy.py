@@ -0,0 +1,149 @@
+import socket
+import threading
+import time
+
+import pytest
+
+from web.cache.cache_manager import CacheManager
+from web.cache.http_cache_policy import (
+    HTTPCachePolicy,
+    freshness_lifetime,
+    normalize_url,
+    update_stored_headers
+)
+from web.config.settings import ServerConfig
+from web.proxy.request_parser import RequestParser
+from web.proxy.response_parser import ResponseParser
+from web.proxy.server import ProxyServer
+from web.tests.test_server import KeepAliveOrigin, _free_port, _proxy_get
+
+
+def _request(target: str, headers: str = '', method: str = 'GET'):
+    raw = f"{method} {target} HTTP/1.1\r\nHost: Example.com\r\n{headers}\r\n".encode()
+    return RequestParser.parse_request(raw)
+
+
+def _response(headers: str, body: bytes = b'hello', status: str = '200 OK') -> bytes:
+    return (
+        f"HTTP/1.1 {status}\r\nContent-Length: {len(body)}\r\n{headers}\r\n".encode()
+        + body
+    )
+
+
+def test_keys_normalize_origin_and_absolute_forms():
+    absolute = _request('HTTP://EXAMPLE.com:80/a?b=1#frag')
+    origin_form = _request('/a?b=1')
+
+    assert normalize_url(absolute) == 'http://example.com/a?b=1'
+    policy = HTTPCachePolicy(CacheManager())
+    assert policy.cache_key(absolute) == policy.cache_key(origin_form) == 'GET http://example.com/a?b=1'
+    assert policy.cache_key(_request('/a', method='POST')) is None
+
+
+def test_freshness_prefers_s_maxage_then_max_age_then_expires():
+    now = time.time()
+    head = ResponseParser.parse_head(_response('Cache-Control: max-age=60, s-maxage=30\r\n'))
+    assert freshness_lifetime(head, now) == 30
+
+    head = ResponseParser.parse_head(_response(
+        'Date: Sun, 18 Oct 2026 10:00:00 GMT\r\nExpires: Sun, 18 Oct 2026 10:05:00 GMT\r\n'
+    ))
+    assert freshness_lifetime(head, now) == 300
+
+    head = ResponseParser.parse_head(_response('Expires: 0\r\n'))
+    assert freshness_lifetime(head, now) == 0
+
+
+@pytest.mark.parametrize('headers', [
+    'Cache-Control: no-store\r\n',
+    'Cache-Control: private\r\n',
+    'Vary: *\r\n',
+    'Cache-Control: max-age=0\r\n'
+])
+def test_uncacheable_responses_are_not_stored(headers):
+    manager = CacheManager()
+    policy = HTTPCachePolicy(manager)
+    request = _request('/a')
+
+    assert not policy.store(request, _response(headers))
+    assert manager.cache_size == 0
+
+
+def test_vary_keys_variants_separately():
+    policy = HTTPCachePolicy(CacheManager())
+    gzip = _request('/a', 'Accept-Encoding: gzip\r\n')
+    plain = _request('/a', 'Accept-Encoding: identity\r\n')
+
+    assert policy.store(gzip, _response('Vary: Accept-Encoding\r\n', b'zipped'))
+    gzip_key = policy.cache_key(gzip)
+    assert gzip_key != policy.cache_key(plain)
+
+    assert policy.lookup(gzip, gzip_key)[0].endswith(b'zipped')
+    assert policy.lookup(plain, policy.cache_key(plain)) is None
+
+
+def test_expired_response_with_validators_is_kept_for_revalidation():
+    policy = HTTPCachePolicy(CacheManager())
+    request = _request('/a')
+    stored = _response('Cache-Control: max-age=0\r\nETag: "v1"\r\n')
+
+    assert policy.store(request, stored)
+    key = policy.cache_key(request)
+    value, fresh = policy.lookup(request, key)
+    assert not fresh
+
+    conditional = policy.conditional_request(request, value)
+    assert b'\r\nIf-None-Match: "v1"\r\n' in conditional
+    assert conditional.endswith(b'\r\n\r\n')
+
+
+def test_not_modified_refreshes_headers_but_keeps_body():
+    stored = _response('Cache-Control: max-age=0\r\nETag: "v1"\r\n', b'body')
+    not_modified = ResponseParser.parse_head(
+        b'HTTP/1.1 304 Not Modified\r\nCache-Control: max-age=60\r\nContent-Length: 0\r\n\r\n'
+    )
+
+    refreshed = update_stored_headers(stored, not_modified)
+    head = ResponseParser.parse_head(refreshed)
+    assert head.get_header('cache-control') == 'max-age=60'
+    assert head.get_header('content-length') == '4'
+    assert refreshed.endswith(b'\r\n\r\nbody')
+
+
+class RevalidatingOrigin(KeepAliveOrigin):
+    """Origin whose responses always need revalidation, answering 304 to If-None-Match"""
+
+    def __init__(self):
+        self.conditional = 0
+        super().__init__()
+
+    def _serve(self, conn: socket.socket) -> None:
+        with conn:
+            while True:
+                request = conn.recv(65536)
+                if not request:
+                    return
+                if b'If-None-Match: "v1"' in request:
+                    self.conditional += 1
+                    conn.sendall(b'HTTP/1.1 304 Not Modified\r\nETag: "v1"\r\n\r\n')
+                else:
+                    conn.sendall(_response('Cache-Control: no-cache\r\nETag: "v1"\r\n', self.body))
+
+
+@pytest.mark.parametrize('mode', [ServerConfig.MODE_ASYNCIO, ServerConfig.MODE_THREADED])
+def test_proxy_revalidates_with_conditional_request(mode):
+    origin = RevalidatingOrigin()
+    port = _free_port()
+    server = ProxyServer(host='127.0.0.1', port=port, mode=mode)
+    threading.Thread(target=server.start, daemon=True).start()
+    time.sleep(0.3)
+    try:
+        url = f"http://127.0.0.1:{origin.port}/validated"
+        responses = [_proxy_get(port, url) for _ in range(3)]
+    finally:
+        server.stop()
+        origin.close()
+
+    assert all(response.startswith(b'HTTP/1.1 200 OK') for response in responses)
+    assert all(response.endswith(origin.body) for response in responses)
+    assert origin.conditional == 2
@@ -0,0 +1,57 @@
+import io
+import logging
+from logging.handlers import RotatingFileHandler
+
+from web.logging.async_writer import AsyncLogWriter
+
+
+def _logger(name: str, handler: logging.Handler) -> logging.Logger:
+    logger = logging.getLogger(name)
+    logger.handlers = [handler]
+    logger.propagate = False
+    handler.setFormatter(logging.Formatter('%(levelname)s %(message)s'))
+    return logger
+
+
+def test_records_are_formatted_and_written_in_batches():
+    stream = io.StringIO()
+    writer = AsyncLogWriter(_logger('test.async.batches', logging.StreamHandler(stream)), flush_interval=0.01)
+    writer.start()
+    for index in range(1000):
+        assert writer.submit(logging.INFO, "Request: %s /%d", ('GET', index))
+    writer.submit(logging.ERROR, "100% literal")
+    writer.stop()
+
+    lines = stream.getvalue().splitlines()
+    assert lines[:2] == ['INFO Request: GET /0', 'INFO Request: GET /1']
+    assert lines[-1] == 'ERROR 100% literal'
+    assert len(lines) == 1001
+    stats = writer.stats
+    assert stats['written'] == 1001 and stats['queued'] == 0 and stats['dropped'] == 0
+    assert stats['batches'] < 100
+
+
+def test_full_queue_drops_and_reports_records():
+    stream = io.StringIO()
+    writer = AsyncLogWriter(_logger('test.async.drops', logging.StreamHandler(stream)), queue_size=3)
+    results = [writer.submit(logging.INFO, f"message {index}") for index in range(5)]
+
+    assert results == [True, True, True, False, False]
+    assert writer.stats['dropped'] == 2 and writer.stats['dropped_info'] == 2
+    assert writer.flush()
+    assert stream.getvalue().splitlines() == [
+        'INFO message 0', 'INFO message 1', 'INFO message 2',
+        'WARNING Log queue full, dropped 2 records'
+    ]
+
+
+def test_batches_roll_the_log_file_over(tmp_path):
+    handler = RotatingFileHandler(tmp_path / 'proxy.log', maxBytes=1000, backupCount=2)
+    writer = AsyncLogWriter(_logger('test.async.rotate', handler))
+    for index in range(100):
+        writer.submit(logging.INFO, "line %d", (index,))
+    writer.stop()
+    handler.close()
+
+    assert (tmp_path / 'proxy.log.1').exists()
+    assert (tmp_path / 'proxy.log').stat().st_size < 1000
\ No newline at end of file
@@ -0,0 +1,100 @@
+import threading
+import time
+import urllib.request
+
+import pytest
+
+from web.cache.cache_storage import CacheStorage
+from web.config.settings import ServerConfig
+from web.proxy.server import ProxyServer
+from web.tests.test_prefork import CachingOrigin
+from web.tests.test_server import _free_port, _proxy_get
+from web.utils.metrics import Metrics
+from web.utils.timer import Histogram, StageTimer
+
+
+def test_histogram_buckets_and_quantiles():
+    histogram = Histogram(bounds=(0.001, 0.01, 0.1))
+    for value in (0.0005, 0.002, 0.003, 0.05, 5.0):
+        histogram.observe(value)
+
+    bounds, counts, total = histogram.snapshot()
+    assert counts == [1, 2, 1, 1]
+    assert total == pytest.approx(5.0555)
+    assert histogram.count == 5
+    assert histogram.quantile(0.5) == 0.01
+    assert histogram.quantile(1.0) == 0.1
+
+
+def test_stage_timer_adds_up_repeated_laps():
+    timer = StageTimer()
+    for _ in range(3):
+        time.sleep(0.002)
+        timer.lap('transfer')
+        timer.lap('send')
+
+    assert set(timer.stages) == {'transfer', 'send'}
+    assert timer.stages['transfer'] >= 0.006
+    assert sum(timer.stages.values()) <= timer.elapsed
+
+
+def test_storage_counts_evictions_and_expirations():
+    storage = CacheStorage(max_size=2)
+    for key in ('a', 'b', 'c'):
+        storage.set(key, b'x')
+    storage.set('old', b'x', ttl=-1)
+    assert storage.lookup('old') is None
+
+    assert storage.stats['evictions'] == 2
+    assert storage.stats['expirations'] == 1
+
+
+def test_render_exports_counters_collectors_and_histograms():
+    Metrics.reset()
+    Metrics.increment('proxy_cache_requests_total', result='hit')
+    Metrics.increment('proxy_cache_requests_total', 3, result='miss')
+    timer = StageTimer()
+    timer.lap('parse')
+    Metrics.record_request(timer)
+    Metrics.register_collector('test', lambda: {'proxy_cache_entries': 7})
+    try:
+        text = Metrics.render()
+    finally:
+        Metrics.unregister_collector('test')
+
+    assert 'proxy_cache_requests_total{result="miss"} 3' in text
+    assert 'proxy_cache_hit_ratio 0.25' in text
+    assert '# TYPE proxy_cache_entries gauge\nproxy_cache_entries 7' in text
+    assert 'proxy_stage_duration_seconds_bucket{stage="parse",le="+Inf"} 1' in text
+    assert 'proxy_stage_duration_seconds_count{stage="upstream_connect"} 0' in text
+    assert 'proxy_request_duration_seconds_count 1' in text
+
+
+@pytest.mark.parametrize('mode', [ServerConfig.MODE_ASYNCIO, ServerConfig.MODE_THREADED])
+def test_admin_port_serves_request_metrics(mode):
+    Metrics.reset()
+    origin = CachingOrigin()
+    port = _free_port()
+    server = ProxyServer(host='127.0.0.1', port=port, mode=mode, snapshot_path=None, admin_port=0)
+    threading.Thread(target=server.start, daemon=True).start()
+    time.sleep(0.3)
+    url = f"http://127.0.0.1:{origin.port}/metered"
+    try:
+        for _ in range(2):
+            assert _proxy_get(port, url).endswith(b'shared body')
+        with urllib.request.urlopen(f"http://127.0.0.1:{server.admin_port}/metrics", timeout=5) as scrape:
+            text = scrape.read().decode()
+    finally:
+        server.stop()
+        origin.close()
+
+    assert 'proxy_requests_total 2' in text
+    assert 'proxy_cache_requests_total{result="hit"} 1' in text
+    assert 'proxy_cache_requests_total{result="miss"} 1' in text
+    assert 'proxy_cache_hit_ratio 0.5' in text
+    assert 'proxy_cache_entries 1' in text
+    assert Metrics.value('proxy_cache_served_bytes_total') == Metrics.value('proxy_upstream_bytes_total')
+    for stage in ('parse', 'blocklist', 'cache_lookup', 'client_send'):
+        assert Metrics.stage(stage).count == 2
+    for stage in ('upstream_connect', 'upstream_transfer'):
+        assert Metrics.stage(stage).count == 1
\ No newline at end of file
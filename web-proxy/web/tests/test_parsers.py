@@ -0,0 +1,170 @@
+import pytest
+
+from web.config.settings import ServerConfig
+from web.proxy.request_parser import RequestParser
+from web.proxy.response_parser import ResponseParser, HTTPParseError
+
+
+def _feed_in_pieces(parser: ResponseParser, data: bytes, size: int) -> int:
+    consumed = 0
+    for start in range(0, len(data), size):
+        consumed += parser.feed(data[start:start + size])
+    return consumed
+
+
+def test_response_parser_content_length_stops_at_message_end():
+    message = b"HTTP/1.1 200 OK\r\nContent-Length: 5\r\nX-Test: a\r\n\r\nhello"
+    parser = ResponseParser(collect_body=True)
+
+    consumed = parser.feed(message + b"HTTP/1.1 200 OK\r\n")
+
+    assert consumed == len(message)
+    assert parser.message_complete and parser.keep_alive
+    assert parser.response.status == 200
+    assert parser.response.get_header('x-test') == 'a'
+    assert b''.join(parser.body_chunks()) == b"hello"
+
+
+@pytest.mark.parametrize('piece_size', [1, 3, 7, 4096])
+def test_response_parser_decodes_chunked_body_across_feeds(piece_size):
+    message = (
+        b"HTTP/1.1 200 OK\r\nTransfer-Encoding: chunked\r\n\r\n"
+        b"5\r\nhello\r\n6;ext=1\r\n world\r\n0\r\nX-Trailer: t\r\n\r\n"
+    )
+    parser = ResponseParser(collect_body=True)
+
+    assert _feed_in_pieces(parser, message, piece_size) == len(message)
+    assert parser.message_complete and parser.keep_alive
+    assert b''.join(parser.body_chunks()) == b"hello world"
+
+
+def test_response_parser_close_delimited_body():
+    parser = ResponseParser(collect_body=True)
+    parser.feed(b"HTTP/1.0 200 OK\r\n\r\npartial ")
+    parser.feed(b"body")
+    assert not parser.message_complete
+
+    parser.feed_eof()
+    assert parser.message_complete and not parser.keep_alive
+    assert b''.join(parser.body_chunks()) == b"partial body"
+
+
+def test_response_parser_head_and_304_have_no_body():
+    head_parser = ResponseParser(method='HEAD')
+    head_parser.feed(b"HTTP/1.1 200 OK\r\nContent-Length: 100\r\n\r\n")
+    assert head_parser.message_complete
+
+    parsed = ResponseParser.parse(b"HTTP/1.1 304 Not Modified\r\nETag: \"x\"\r\n\r\n")
+    assert parsed[0].status == 304 and parsed[1] == b""
+
+
+def test_response_parser_tells_whether_connection_persists():
+    assert ResponseParser.persistent(b"HTTP/1.1 200 OK\r\nContent-Length: 2\r\n\r\nok")
+    assert ResponseParser.persistent(b"HTTP/1.1 100 Continue\r\n\r\nHTTP/1.1 204 No Content\r\n\r\n")
+    assert not ResponseParser.persistent(b"HTTP/1.1 200 OK\r\n\r\nuntil close")
+    assert not ResponseParser.persistent(b"HTTP/1.1 200 OK\r\nContent-Length: 0\r\nConnection: close\r\n\r\n")
+    assert ResponseParser.persistent(b"HTTP/1.1 200 OK\r\nContent-") is None
+
+
+def test_response_parser_rejects_truncated_and_malformed_responses():
+    parser = ResponseParser()
+    parser.feed(b"HTTP/1.1 200 OK\r\nContent-Length: 10\r\n\r\nshort")
+    with pytest.raises(HTTPParseError):
+        parser.feed_eof()
+
+    with pytest.raises(HTTPParseError):
+        ResponseParser().feed(b"garbage\r\n\r\n")
+
+    for head in (b"Content-Length: -3", b"Content-Length: 3\r\nContent-Length: 4", b"Transfer-Encoding: chunked\r\n\r\n-3"):
+        with pytest.raises(HTTPParseError):
+            ResponseParser().feed(b"HTTP/1.1 200 OK\r\n" + head + b"\r\n\r\nabc\r\n")
+    assert ResponseParser.parse_head(b"HTTP/1.1 200 OK\r\nContent-Length: -3\r\n\r\n") is None
+
+
+def test_request_parser_accumulates_request_split_across_reads():
+    request = (
+        b"POST http://Example.com:8081/submit?x=1 HTTP/1.1\r\n"
+        b"Host: example.com\r\nContent-Length: 11\r\n\r\nhello world"
+    )
+    parser = RequestParser()
+    for i in range(len(request) - 1):
+        parser.feed(request[i:i + 1])
+        assert parser.next_request() is None
+    parser.feed(request[-1:])
+
+    parsed = parser.next_request()
+    assert (parsed.method, parsed.host, parsed.port, parsed.path) == ('POST', 'example.com', 8081, '/submit')
+    assert parsed.body == b"hello world"
+    assert parsed.raw == request
+    assert parsed.headers['content-length'] == '11'
+
+
+def test_request_parser_splits_pipelined_requests():
+    parser = RequestParser()
+    parser.feed(
+        b"POST http://a/ HTTP/1.1\r\nTransfer-Encoding: chunked\r\n\r\n3\r\nabc\r\n0\r\n\r\n"
+        b"GET /next HTTP/1.1\r\nHost: b:8080\r\nConnection: close\r\n\r\n"
+    )
+
+    first = parser.next_request()
+    second = parser.next_request()
+
+    assert first.body == b"3\r\nabc\r\n0\r\n\r\n"
+    assert (second.host, second.port, second.path) == ('b', 8080, '/next')
+    assert not second.keep_alive
+    assert parser.next_request() is None and parser.buffered == 0
+
+
+def test_request_parser_handles_connect_and_malformed_requests():
+    connect = RequestParser.parse_request(b"CONNECT example.com:443 HTTP/1.1\r\n\r\n")
+    assert (connect.host, connect.port) == ('example.com', 443)
+
+    assert RequestParser.parse_request(b"NOT A REQUEST\r\n\r\n") is None
+
+    parser = RequestParser()
+    parser.feed(b"GET / HTTP/1.1\r\nX-Big: " + b"a" * (RequestParser.MAX_HEADER_SIZE + 1))
+    with pytest.raises(HTTPParseError):
+        parser.next_request()
+
+
+@pytest.mark.parametrize('framing', [
+    b"Content-Length: -3\r\n",
+    b"Content-Length: +3\r\n",
+    b"Content-Length: 3\r\nContent-Length: 4\r\n",
+    b"Content-Length: 3\r\nTransfer-Encoding: chunked\r\n",
+    b"Transfer-Encoding: chunked\r\n\r\n-3\r\nabc\r\n0\r\n",
+    b"Transfer-Encoding: gzip\r\n",
+    b"Transfer-Encoding: xchunked\r\n",
+    b"Transfer-Encoding: chunked, gzip\r\n",
+])
+def test_request_parser_rejects_ambiguous_framing(framing):
+    parser = RequestParser()
+    parser.feed(b"POST http://a/ HTTP/1.1\r\n" + framing + b"\r\nabc")
+    with pytest.raises(HTTPParseError):
+        parser.next_request()
+
+
+def test_request_parser_joins_repeated_transfer_encoding_headers():
+    parser = RequestParser()
+    parser.feed(b"POST http://a/ HTTP/1.1\r\nTransfer-Encoding: identity\r\n"
+                b"Transfer-Encoding: chunked\r\n\r\n5\r\nGET /\r\n0\r\n\r\n")
+
+    request = parser.next_request()
+
+    assert request.body == b"5\r\nGET /\r\n0\r\n\r\n"
+    assert parser.next_request() is None
+
+
+def test_request_parser_limits_chunked_body_scanned_once(monkeypatch):
+    body = b"1\r\na\r\n" * 20000 + b"0\r\n\r\n"
+    request = b"POST http://a/ HTTP/1.1\r\nTransfer-Encoding: chunked\r\n\r\n" + body
+    parser = RequestParser()
+    for start in range(0, len(request), 100):
+        parser.feed(request[start:start + 100])
+        parsed = parser.next_request()
+    assert parsed.body == body
+
+    monkeypatch.setattr(ServerConfig, 'MAX_REQUEST_BODY_SIZE', len(body) // 2)
+    parser.feed(request)
+    with pytest.raises(HTTPParseError):
+        parser.next_request()
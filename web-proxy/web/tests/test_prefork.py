@@ -0,0 +1,101 @@
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+
+import pytest
+
+from web.tests.test_server import KeepAliveOrigin, _free_port, _proxy_get
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+class CachingOrigin(KeepAliveOrigin):
+    """Origin whose responses may be cached for a minute; counts requests"""
+
+    def __init__(self):
+        self.requests = 0
+        super().__init__(body=b'shared body')
+
+    def _serve(self, conn: socket.socket) -> None:
+        with conn:
+            while conn.recv(65536):
+                self.requests += 1
+                conn.sendall(
+                    b"HTTP/1.1 200 OK\r\nCache-Control: max-age=60\r\nContent-Length: %d\r\n\r\n"
+                    % len(self.body) + self.body
+                )
+
+
+def _children(pid: int):
+    """Pids of the direct children of a process, read from /proc"""
+    children = set()
+    for name in os.listdir('/proc'):
+        if not name.isdigit():
+            continue
+        try:
+            with open(f'/proc/{name}/stat') as stat:
+                # The parent pid follows the parenthesised command name
+                fields = stat.read().rsplit(')', 1)[1].split()
+        except OSError:
+            continue
+        if int(fields[1]) == pid:
+            children.add(int(name))
+    return children
+
+
+def _wait_for(predicate, timeout: float = 5.0) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.05)
+    return False
+
+
+def _accepting(port: int) -> bool:
+    try:
+        socket.create_connection(('127.0.0.1', port), timeout=1).close()
+        return True
+    except OSError:
+        return False
+
+
+@pytest.mark.skipif(not hasattr(os, 'fork'), reason="pre-fork mode needs os.fork")
+@pytest.mark.parametrize('mode, reuse_port', [('threaded', True), ('asyncio', False)])
+def test_workers_share_cache_and_are_restarted(tmp_path, mode, reuse_port):
+    origin = CachingOrigin()
+    port = _free_port()
+    master = subprocess.Popen(
+        [sys.executable, '-c',
+         "import sys; from web.proxy.prefork import PreforkServer; "
+         "PreforkServer(host='127.0.0.1', port=int(sys.argv[1]), workers=2, mode=sys.argv[2], "
+         "reuse_port=sys.argv[3] == 'True', cache_directory=sys.argv[4]).start()",
+         str(port), mode, str(reuse_port), str(tmp_path)],
+        cwd=PROJECT_DIR
+    )
+    url = f"http://127.0.0.1:{origin.port}/shared"
+    try:
+        assert _wait_for(lambda: len(_children(master.pid)) == 2 and _accepting(port))
+
+        # Connections are spread over both workers; all but the first hit the shared cache
+        for _ in range(6):
+            assert _proxy_get(port, url).endswith(b'shared body')
+            time.sleep(0.1)
+        assert origin.requests == 1
+
+        workers = _children(master.pid)
+        crashed = workers.pop()
+        os.kill(crashed, signal.SIGKILL)
+        assert _wait_for(lambda: len(_children(master.pid) - workers) == 1 and crashed not in _children(master.pid))
+        assert _proxy_get(port, url).endswith(b'shared body')
+    finally:
+        master.send_signal(signal.SIGTERM)
+        try:
+            master.wait(timeout=10)
+        finally:
+            origin.close()
+
+    assert master.returncode == 0
\ No newline at end of file
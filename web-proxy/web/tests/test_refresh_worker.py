@@ -0,0 +1,136 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from web.cache.cache_manager import CacheManager
+from web.cache.http_cache_policy import HTTPCachePolicy
+from web.cache.refresh_worker import AsyncRefreshWorker, RefreshWorker
+from web.config.settings import ServerConfig
+from web.proxy.request_parser import RequestParser
+from web.proxy.server import ProxyServer
+from web.tests.test_server import KeepAliveOrigin, _free_port, _proxy_get
+
+
+def _request(target: str = '/a', headers: str = ''):
+    raw = f"GET {target} HTTP/1.1\r\nHost: example.com\r\n{headers}\r\n".encode()
+    return RequestParser.parse_request(raw)
+
+
+def _response(cache_control: str, body: bytes = b'v1') -> bytes:
+    return (
+        f"HTTP/1.1 200 OK\r\nCache-Control: {cache_control}\r\nContent-Length: {len(body)}\r\n\r\n".encode()
+        + body
+    )
+
+
+def test_worker_runs_each_key_once_while_pending():
+    worker = RefreshWorker(workers=1)
+    release = threading.Event()
+    runs = []
+
+    def job():
+        runs.append(1)
+        release.wait(5)
+
+    assert worker.submit('a', job)
+    assert not worker.submit('a', job)
+    release.set()
+    deadline = time.time() + 5
+    while len(worker) and time.time() < deadline:
+        time.sleep(0.01)
+
+    assert runs == [1]
+    assert worker.submit('a', lambda: None)
+
+
+def test_async_worker_drops_duplicates():
+    runs = []
+
+    async def scenario():
+        worker = AsyncRefreshWorker()
+
+        async def job():
+            runs.append(1)
+
+        assert worker.submit('a', job)
+        assert not worker.submit('a', job)
+        await asyncio.sleep(0.01)
+        return len(worker)
+
+    assert asyncio.run(scenario()) == 0
+    assert runs == [1]
+
+
+def test_stale_within_grace_window_may_be_served(monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr('web.cache.cache_storage.time.time', lambda: clock[0])
+    monkeypatch.setattr('web.cache.http_cache_policy.time.time', lambda: clock[0])
+    policy = HTTPCachePolicy(CacheManager())
+    request = _request()
+    policy.store(request, _response('max-age=10, stale-while-revalidate=30'))
+    key = policy.cache_key(request)
+
+    clock[0] = 1020.0
+    stored, fresh = policy.lookup(request, key)
+    assert not fresh
+    assert policy.can_serve_stale(request, key, stored)
+    assert not policy.can_serve_stale(_request(headers='Cache-Control: no-cache\r\n'), key, stored)
+
+    clock[0] = 1045.0
+    assert policy.lookup(request, key) is None
+
+
+def test_must_revalidate_is_never_served_stale():
+    policy = HTTPCachePolicy(CacheManager())
+    request = _request()
+    stored = _response('max-age=0, must-revalidate, stale-while-revalidate=30')
+    policy.store(request, stored)
+
+    assert not policy.can_serve_stale(request, policy.cache_key(request), stored)
+
+
+def test_hot_entries_near_expiry_are_refreshed_ahead(monkeypatch):
+    monkeypatch.setattr('web.config.cache_settings.CacheConfig.REFRESH_AHEAD_SECONDS', 60)
+    monkeypatch.setattr('web.config.cache_settings.CacheConfig.REFRESH_AHEAD_MIN_HITS', 3)
+    policy = HTTPCachePolicy(CacheManager())
+    request = _request()
+    policy.store(request, _response('max-age=30'))
+    key = policy.cache_key(request)
+
+    assert [policy.should_refresh_ahead(key) for _ in range(4)] == [False, False, True, False]
+
+
+class VersionedOrigin(KeepAliveOrigin):
+    """Origin whose body changes on every request"""
+
+    def __init__(self):
+        self.version = 0
+        super().__init__()
+
+    def _serve(self, conn) -> None:
+        with conn:
+            while conn.recv(65536):
+                self.version += 1
+                conn.sendall(_response('max-age=1, stale-while-revalidate=30', b'v%d' % self.version))
+
+
+@pytest.mark.parametrize('mode', [ServerConfig.MODE_ASYNCIO, ServerConfig.MODE_THREADED])
+def test_proxy_serves_stale_while_refreshing(mode):
+    origin = VersionedOrigin()
+    port = _free_port()
+    server = ProxyServer(host='127.0.0.1', port=port, mode=mode)
+    threading.Thread(target=server.start, daemon=True).start()
+    time.sleep(0.3)
+    url = f"http://127.0.0.1:{origin.port}/swr"
+    try:
+        assert _proxy_get(port, url).endswith(b'v1')
+        time.sleep(1.2)
+        # Expired: the old body comes back at once and a refresh starts
+        assert _proxy_get(port, url).endswith(b'v1')
+        time.sleep(0.3)
+        assert _proxy_get(port, url).endswith(b'v2')
+    finally:
+        server.stop()
+        origin.close()
@@ -0,0 +1,157 @@
+import os
+import re
+import threading
+import time
+
+import pytest
+
+from web.security.url_blocking import URLBlocker, parse_blocklist
+
+
+def test_default_patterns_still_block():
+    blocker = URLBlocker()
+    assert blocker.is_blocked('http://www.malicious.com/')
+    assert blocker.is_blocked('http://GAMBLING.example/x')
+    assert not blocker.is_blocked('http://example.com/')
+
+
+def test_domains_block_their_subdomains_only():
+    blocker = URLBlocker(patterns=())
+    blocker.add_blocked_domain('Ads.Example.com')
+
+    assert blocker.is_blocked('http://ads.example.com/banner.js')
+    assert blocker.is_blocked('https://cdn.ads.example.com:8443/x')
+    assert blocker.is_blocked('ads.example.com:443')
+    assert blocker.is_blocked('/banner.js', host='ads.example.com')
+    assert not blocker.is_blocked('http://example.com/ads.example.com')
+    assert not blocker.is_blocked('http://badads.example.com/')
+
+
+def test_patterns_that_cannot_be_combined_are_matched_apart():
+    blocker = URLBlocker(patterns=(r'.*/(\w+)/\1/', r'(?i).*tracker', r'.*(?P<a>pixel)\.gif', r'.*\.exe$'))
+
+    assert blocker.is_blocked('http://a.com/dup/dup/')
+    assert blocker.is_blocked('http://a.com/TRACKER')
+    assert blocker.is_blocked('http://a.com/pixel.gif')
+    assert blocker.is_blocked('http://a.com/setup.EXE')
+    assert not blocker.is_blocked('http://a.com/dup/other/')
+
+
+def test_blocklist_file_is_loaded_in_bulk(tmp_path):
+    path = tmp_path / 'blocklist.txt'
+    path.write_text(
+        "# comment\n"
+        "tracker.example\n"
+        "*.doubleclick.net\n"
+        "0.0.0.0 ads.one.com ads.two.com # hosts file\n"
+        r".*/ads/.*\.js" "\n"
+        "[unclosed\n"
+    )
+    blocker = URLBlocker(patterns=(), blocklist_files=[str(path), str(tmp_path / 'missing.txt')])
+
+    assert blocker.is_blocked('http://tracker.example/')
+    assert blocker.is_blocked('http://ad.doubleclick.net/')
+    assert blocker.is_blocked('http://ads.two.com/')
+    assert blocker.is_blocked('http://cdn.com/ads/x.js')
+    assert not blocker.is_blocked('http://cdn.com/app.js')
+    assert blocker.load_blocklist_file(str(path)) == 5
+
+
+def test_verdicts_are_not_stale_after_a_change():
+    blocker = URLBlocker(patterns=(), verdict_cache_size=2)
+    for url in ('http://a.com/', 'http://b.com/', 'http://c.com/'):
+        assert not blocker.is_blocked(url)
+    blocker.add_blocked_domain('a.com')
+    assert blocker.is_blocked('http://a.com/')
+
+    with pytest.raises(ValueError):
+        blocker.add_blocked_domain('not a domain')
+
+
+@pytest.mark.parametrize('pattern', [
+    r'.*\x2eexample', r'.*\u002Eexample\.com', r'.*\056example', r'.*ads\x2E[e]xample',
+    r'.*\d\dexample', r'.*(ads)\1\.example', r'.*\N{FULL STOP}example', r'.*\x41DS\.example',
+])
+def test_indexed_patterns_match_like_plain_regexes(pattern):
+    blocker = URLBlocker(patterns=(pattern,))
+    urls = [
+        'http://ads.example.com/x', 'http://adsads.example.com/', 'http://42example.com/',
+        'http://2eexample.com/', 'http://x.org/56example', 'http://ADS.EXAMPLE.COM/',
+    ]
+    for url in urls:
+        assert blocker.is_blocked(url) == bool(re.match(pattern, url, re.IGNORECASE)), url
+
+
+def test_parse_blocklist_splits_domains_and_patterns():
+    assert parse_blocklist(['Example.COM.', '.sub.example.org', r'.*\.exe']) == (
+        {'example.com', 'sub.example.org'}, [r'.*\.exe']
+    )
+
+def test_changed_blocklist_file_replaces_its_entries(tmp_path):
+    path = tmp_path / 'blocklist.txt'
+    path.write_text("old.example\n")
+    blocker = URLBlocker(patterns=(), blocklist_files=[str(path)])
+    assert blocker.reload() == 0
+
+    path.write_text("new.example\n.*/banner/.*\n")
+    assert blocker.reload() == 1
+    assert not blocker.is_blocked('http://old.example/')
+    assert blocker.is_blocked('http://new.example/')
+    assert blocker.is_blocked('http://cdn.com/banner/1.png')
+
+    path.unlink()
+    assert blocker.reload() == 0
+    assert blocker.is_blocked('http://new.example/')
+
+
+def test_watcher_reloads_replaced_file_at_once_and_rewritten_file_once_settled(tmp_path):
+    path = tmp_path / 'blocklist.txt'
+    path.write_text("old.example\n")
+    blocker = URLBlocker(patterns=(), blocklist_files=[str(path)])
+
+    replacement = tmp_path / 'blocklist.new'
+    replacement.write_text("new.example\n")
+    os.replace(replacement, path)
+    assert blocker._reload(settled_only=True) == 1
+    assert blocker.is_blocked('http://new.example/')
+
+    with open(path, 'a') as blocklist_file:
+        blocklist_file.write("more.example\n")
+    assert blocker._reload(settled_only=True) == 0
+    assert blocker._reload(settled_only=True) == 1
+    assert blocker.is_blocked('http://more.example/')
+
+
+def test_watcher_swaps_in_reloaded_list_without_disturbing_lookups(tmp_path):
+    path = tmp_path / 'blocklist.txt'
+    path.write_text("always.example\n")
+    blocker = URLBlocker(patterns=(), blocklist_files=[str(path)], reload_interval=0.01)
+    stop = threading.Event()
+    errors = []
+
+    def lookups():
+        while not stop.is_set():
+            if not blocker.is_blocked('http://always.example/'):
+                errors.append('lost an entry during a swap')
+
+    thread = threading.Thread(target=lookups)
+    thread.start()
+    blocker.start()
+    try:
+        for size in (20000, 10, 20000):
+            replacement = tmp_path / 'blocklist.new'
+            replacement.write_text("always.example\n" + "".join(f"host{index}.example\n" for index in range(size)))
+            os.replace(replacement, path)
+            # The last host of the new list is blocked, the first one past it is not
+            loaded = lambda: (blocker.is_blocked(f'http://host{size - 1}.example/')
+                              and not blocker.is_blocked(f'http://host{size}.example/'))
+            deadline = time.monotonic() + 5
+            while not loaded() and time.monotonic() < deadline:
+                time.sleep(0.01)
+            assert loaded()
+    finally:
+        blocker.stop()
+        stop.set()
+        thread.join()
+
+    assert not errors
\ No newline at end of file
@@ -0,0 +1,332 @@
+import asyncio
+import socket
+import threading
+import time
+
+import pytest
+
+from web.config.settings import ServerConfig
+from web.proxy.request_flow import RequestFlow
+from web.proxy.connection_pool import ConnectionPool
+from web.proxy.server import ProxyServer
+from web.proxy.server_connector import ServerConnector, AsyncServerConnector
+
+
+ORIGIN_PORT = 7070  # ClientHandler tries localhost:7070 before the target host
+ORIGIN_BODY = b"hello from origin"
+
+
+def _run_origin(server_socket: socket.socket) -> None:
+    """Minimal origin that answers every connection with a fixed response"""
+    while True:
+        try:
+            conn, _ = server_socket.accept()
+        except OSError:
+            return
+        conn.recv(65536)
+        conn.sendall(
+            b"HTTP/1.1 200 OK\r\nContent-Length: %d\r\n\r\n" % len(ORIGIN_BODY)
+            + ORIGIN_BODY
+        )
+        conn.close()
+
+
+@pytest.fixture(scope='module')
+def origin():
+    server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    server_socket.bind(('127.0.0.1', ORIGIN_PORT))
+    server_socket.listen(16)
+    threading.Thread(target=_run_origin, args=(server_socket,), daemon=True).start()
+    yield
+    server_socket.shutdown(socket.SHUT_RDWR)
+    server_socket.close()
+
+
+class KeepAliveOrigin:
+    """Origin that serves many Content-Length framed responses per connection"""
+
+    def __init__(self, body: bytes = ORIGIN_BODY):
+        self.body = body
+        self.accepted = 0
+        self._socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self._socket.bind(('127.0.0.1', 0))
+        self._socket.listen(16)
+        self.port = self._socket.getsockname()[1]
+        threading.Thread(target=self._accept_loop, daemon=True).start()
+
+    def _accept_loop(self) -> None:
+        while True:
+            try:
+                conn, _ = self._socket.accept()
+            except OSError:
+                return
+            self.accepted += 1
+            threading.Thread(target=self._serve, args=(conn,), daemon=True).start()
+
+    def _serve(self, conn: socket.socket) -> None:
+        with conn:
+            while conn.recv(65536):
+                conn.sendall(
+                    b"HTTP/1.1 200 OK\r\nContent-Length: %d\r\n\r\n" % len(self.body)
+                    + self.body
+                )
+
+    def close(self) -> None:
+        self._socket.shutdown(socket.SHUT_RDWR)
+        self._socket.close()
+
+
+@pytest.fixture
+def keep_alive_origin():
+    server = KeepAliveOrigin()
+    yield server
+    server.close()
+
+
+class SlowOrigin(KeepAliveOrigin):
+    """Origin that takes a while to answer and counts the requests it serves"""
+
+    def __init__(self, delay: float):
+        self.delay = delay
+        self.requests = 0
+        super().__init__()
+
+    def _serve(self, conn: socket.socket) -> None:
+        with conn:
+            while conn.recv(65536):
+                self.requests += 1
+                time.sleep(self.delay)
+                conn.sendall(
+                    b"HTTP/1.1 200 OK\r\nContent-Length: %d\r\n\r\n" % len(self.body)
+                    + self.body
+                )
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def _proxy_get(port: int, url: str) -> bytes:
+    with socket.create_connection(('127.0.0.1', port), timeout=5) as client:
+        client.sendall(f"GET {url} HTTP/1.1\r\nHost: localhost\r\nConnection: close\r\n\r\n".encode())
+        chunks = []
+        while True:
+            chunk = client.recv(4096)
+            if not chunk:
+                break
+            chunks.append(chunk)
+    return b''.join(chunks)
+
+
+@pytest.mark.parametrize('mode', [ServerConfig.MODE_ASYNCIO, ServerConfig.MODE_THREADED])
+def test_proxy_serves_requests(origin, mode):
+    port = _free_port()
+    server = ProxyServer(host='127.0.0.1', port=port, mode=mode)
+    threading.Thread(target=server.start, daemon=True).start()
+    time.sleep(0.3)
+    try:
+        for _ in range(2):
+            response = _proxy_get(port, f"http://localhost:{ORIGIN_PORT}/{mode}")
+            assert response.startswith(b"HTTP/1.1 200 OK")
+            assert response.endswith(ORIGIN_BODY)
+    finally:
+        server.stop()
+
+
+def _recv_until(client: socket.socket, end: bytes) -> bytes:
+    data = b''
+    while not data.endswith(end):
+        chunk = client.recv(4096)
+        assert chunk, "connection closed early"
+        data += chunk
+    return data
+
+
+@pytest.mark.parametrize('mode', [ServerConfig.MODE_ASYNCIO, ServerConfig.MODE_THREADED])
+def test_proxy_keeps_client_connection_alive(origin, mode, monkeypatch):
+    monkeypatch.setattr(ServerConfig, 'KEEP_ALIVE_TIMEOUT', 0.5)
+    port = _free_port()
+    server = ProxyServer(host='127.0.0.1', port=port, mode=mode)
+    threading.Thread(target=server.start, daemon=True).start()
+    time.sleep(0.3)
+    request = f"GET http://localhost:{ORIGIN_PORT}/alive-{mode} HTTP/1.1\r\nHost: localhost\r\n\r\n".encode()
+    try:
+        with socket.create_connection(('127.0.0.1', port), timeout=5) as client:
+            client.sendall(request)
+            assert _recv_until(client, ORIGIN_BODY).startswith(b"HTTP/1.1 200 OK")
+            # Two pipelined requests in one send; the second asks to close
+            client.sendall(request + request.replace(b"\r\n\r\n", b"\r\nConnection: close\r\n\r\n"))
+            replies = b''
+            while True:
+                chunk = client.recv(4096)
+                if not chunk:
+                    break
+                replies += chunk
+            assert replies.count(b"HTTP/1.1 200 OK") == 2 and replies.endswith(ORIGIN_BODY)
+
+        with socket.create_connection(('127.0.0.1', port), timeout=5) as idle:
+            idle.sendall(request)
+            _recv_until(idle, ORIGIN_BODY)
+            started = time.monotonic()
+            assert idle.recv(4096) == b''
+            assert time.monotonic() - started < 3
+    finally:
+        server.stop()
+
+
+def test_connector_reuses_pooled_connection(keep_alive_origin):
+    request = b"GET / HTTP/1.1\r\nHost: 127.0.0.1\r\n\r\n"
+    for _ in range(3):
+        response = ServerConnector.fetch('127.0.0.1', request, port=keep_alive_origin.port)
+        assert response.endswith(ORIGIN_BODY)
+
+    assert keep_alive_origin.accepted == 1
+    assert ServerConnector.get_pool().idle_count('127.0.0.1', keep_alive_origin.port) == 1
+
+
+def test_async_connector_reuses_pooled_connection(keep_alive_origin):
+    request = b"GET / HTTP/1.1\r\nHost: 127.0.0.1\r\n\r\n"
+
+    async def fetch_many():
+        return [
+            await AsyncServerConnector.fetch('127.0.0.1', request, port=keep_alive_origin.port)
+            for _ in range(3)
+        ]
+
+    responses = asyncio.run(fetch_many())
+    assert all(response.endswith(ORIGIN_BODY) for response in responses)
+    assert keep_alive_origin.accepted == 1
+
+
+def test_connector_streams_large_response_in_bounded_chunks():
+    origin = KeepAliveOrigin(body=b"x" * (1024 * 1024))
+    request = b"GET /large HTTP/1.1\r\nHost: 127.0.0.1\r\n\r\n"
+    try:
+        for _ in range(2):
+            total = 0
+            for chunk in ServerConnector.stream('127.0.0.1', request, port=origin.port):
+                assert len(chunk) <= ServerConfig.BUFFER_SIZE
+                total += len(chunk)
+            assert total > 1024 * 1024
+        assert origin.accepted == 1
+    finally:
+        origin.close()
+
+
+
+class RevalidatingOrigin(KeepAliveOrigin):
+    """Origin whose responses expire at once and change on every revalidation"""
+
+    def _serve(self, conn: socket.socket) -> None:
+        with conn:
+            while True:
+                request = conn.recv(65536)
+                if not request:
+                    return
+                version = b'v2' if b'If-None-Match' in request else b'v1'
+                conn.sendall(
+                    b'HTTP/1.1 200 OK\r\nCache-Control: max-age=0\r\nETag: "%s"\r\n'
+                    b'Content-Length: %d\r\n\r\n' % (version, len(self.body))
+                    + self.body
+                )
+
+
+@pytest.mark.parametrize('mode', [ServerConfig.MODE_ASYNCIO, ServerConfig.MODE_THREADED])
+def test_revalidated_response_is_relayed_in_full_on_kept_alive_connection(mode, monkeypatch):
+    origin = RevalidatingOrigin(body=b"x" * 20000)
+    monkeypatch.setattr(RequestFlow, 'upstreams', staticmethod(lambda request: [('127.0.0.1', origin.port)]))
+    port = _free_port()
+    server = ProxyServer(host='127.0.0.1', port=port, mode=mode)
+    threading.Thread(target=server.start, daemon=True).start()
+    time.sleep(0.3)
+    request = f"GET http://127.0.0.1:{origin.port}/revalidate HTTP/1.1\r\nHost: 127.0.0.1\r\n\r\n".encode()
+    try:
+        with socket.create_connection(('127.0.0.1', port), timeout=5) as client:
+            # The first response is cached already expired; the others revalidate it
+            for version in (b'v1', b'v2', b'v2'):
+                client.sendall(request)
+                response = _recv_until(client, origin.body)
+                assert b'ETag: "%s"' % version in response
+                assert len(response.partition(b"\r\n\r\n")[2]) == len(origin.body)
+    finally:
+        server.stop()
+        origin.close()
+
+
+def test_pool_release_wakes_waiter_for_that_origin(monkeypatch):
+    monkeypatch.setattr(ServerConfig, 'CONNECTION_TIMEOUT', 3)
+    pool = ConnectionPool(connect=lambda host, port, use_ssl: socket.socket(), max_per_host=1)
+    held = {port: pool.acquire('127.0.0.1', port)[0] for port in (1, 2)}
+    acquired = {}
+
+    def wait_for(port):
+        started = time.monotonic()
+        pool.acquire('127.0.0.1', port)
+        acquired[port] = time.monotonic() - started
+
+    # The waiter for the other origin waits first, so a single notify() would wake it
+    waiters = [threading.Thread(target=wait_for, args=(port,)) for port in (2, 1)]
+    for waiter in waiters:
+        waiter.start()
+        time.sleep(0.1)
+    pool.release('127.0.0.1', 1, False, held[1], reusable=True)
+    waiters[1].join()
+    pool.release('127.0.0.1', 2, False, held[2], reusable=True)
+    waiters[0].join()
+    pool.close_all()
+
+    assert acquired[1] < 1
+
+
+def test_pool_reaps_origins_that_are_not_asked_for_again(monkeypatch):
+    monkeypatch.setattr(ConnectionPool, 'REAP_INTERVAL', 0)
+    pool = ConnectionPool(connect=lambda host, port, use_ssl: socket.socket(), idle_timeout=0.1)
+    sock, _ = pool.acquire('127.0.0.1', 1)
+    pool.release('127.0.0.1', 1, False, sock, reusable=True)
+    assert pool.idle_count('127.0.0.1', 1) == 1
+
+    time.sleep(0.2)
+    other, _ = pool.acquire('127.0.0.1', 2)
+    assert pool.idle_count('127.0.0.1', 1) == 0 and sock.fileno() == -1
+    pool.release('127.0.0.1', 2, False, other, reusable=False)
+
+
+class OneShotOrigin(KeepAliveOrigin):
+    """Origin that answers the first request on a connection and drops the connection on the next"""
+
+    def __init__(self):
+        self.requests = []
+        super().__init__()
+
+    def _serve(self, conn: socket.socket) -> None:
+        with conn:
+            request = conn.recv(65536)
+            self.requests.append(request.split(b' ', 1)[0])
+            conn.sendall(b"HTTP/1.1 200 OK\r\nContent-Length: %d\r\n\r\n" % len(self.body) + self.body)
+            request = conn.recv(65536)
+            if request:
+                self.requests.append(request.split(b' ', 1)[0])
+
+
+@pytest.mark.parametrize('method, retried', [(b'GET', True), (b'POST', False)])
+def test_connector_retries_only_idempotent_requests(method, retried):
+    origin = OneShotOrigin()
+    request = b" / HTTP/1.1\r\nHost: 127.0.0.1\r\nContent-Length: 0\r\n\r\n"
+    try:
+        assert ServerConnector.fetch('127.0.0.1', b'GET' + request, port=origin.port).endswith(ORIGIN_BODY)
+        response = ServerConnector.fetch('127.0.0.1', method + request, port=origin.port)
+        assert (response is not None) == retried
+        assert origin.requests == [b'GET', method] + ([method] if retried else [])
+
+        async def fetch_twice():
+            await AsyncServerConnector.fetch('127.0.0.1', b'GET' + request, port=origin.port)
+            return await AsyncServerConnector.fetch('127.0.0.1', method + request, port=origin.port)
+
+        del origin.requests[:]
+        assert (asyncio.run(fetch_twice()) is not None) == retried
+        assert origin.requests == [b'GET', method] + ([method] if retried else [])
+    finally:
+        origin.close()
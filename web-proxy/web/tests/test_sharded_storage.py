@@ -0,0 +1,78 @@
+import threading
+
+from web.cache.cache_manager import CacheManager
+from web.cache.cache_storage import CacheStorage
+from web.cache.sharded_storage import ShardedCacheStorage
+from web.cache.tiered_storage import TieredCacheStorage
+
+
+def test_keys_are_spread_over_independent_shards():
+    shards = []
+
+    def factory(index):
+        shards.append(CacheStorage(max_size=100))
+        return shards[-1]
+
+    storage = ShardedCacheStorage(factory, shards=4)
+    for index in range(100):
+        storage.set(f'key{index}', index)
+
+    assert len(storage) == 100
+    assert all(len(shard) for shard in shards)
+    assert sum(len(shard) for shard in shards) == 100
+    assert storage.get('key42') == 42
+    storage.delete('key42')
+    assert 'key42' not in storage
+
+
+def test_stats_are_summed_across_shards():
+    storage = ShardedCacheStorage(
+        lambda index: TieredCacheStorage(l2=CacheStorage(max_size=10), l1_size=10),
+        shards=4
+    )
+    for index in range(8):
+        storage.set(f'key{index}', b'x')
+        storage.get(f'key{index}')
+    storage.get('missing')
+
+    stats = storage.stats
+    assert stats['l1'] == {'hits': 8, 'misses': 1, 'evictions': 0, 'expirations': 0}
+    assert stats['l2'] == {'hits': 0, 'misses': 1, 'evictions': 0, 'expirations': 0}
+    assert stats['promotions'] == 0
+    assert storage.size_bytes == 8
+
+
+def test_concurrent_access_keeps_storage_consistent():
+    storage = ShardedCacheStorage(lambda index: CacheStorage(max_size=16), shards=4)
+    errors = []
+
+    def worker(offset):
+        try:
+            for generation in range(200):
+                for index in range(32):
+                    key = f'key{(index + offset) % 48}'
+                    storage.set(key, generation)
+                    storage.get(key)
+                    if index % 7 == 0:
+                        storage.delete(key)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=worker, args=(offset,)) for offset in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert not errors
+    assert len(storage) <= 64
+
+
+def test_cache_manager_splits_size_budget_between_shards():
+    manager = CacheManager(max_size=10, shards=4)
+    for index in range(100):
+        manager.cache(f'key{index}', index)
+
+    assert manager.cache_size <= 12
+    manager.clear_cache()
+    assert manager.cache_size == 0
\ No newline at end of file
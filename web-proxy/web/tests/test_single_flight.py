@@ -0,0 +1,87 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from web.cache.single_flight import AsyncSingleFlight, SingleFlight
+from web.config.settings import ServerConfig
+from web.proxy.server import ProxyServer
+# Kept out of test_server.py, whose module-scoped origin on port 7070 would
+# answer first (the handlers try localhost:7070 before the target host)
+from web.tests.test_server import ORIGIN_BODY, SlowOrigin, _free_port, _proxy_get
+
+
+def test_followers_wait_for_the_leader():
+    flights = SingleFlight()
+    assert flights.acquire('url')
+    assert not flights.acquire('url')
+
+    finished = []
+
+    def follower():
+        finished.append(flights.wait('url', timeout=5))
+
+    threads = [threading.Thread(target=follower) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.05)
+    assert not finished
+
+    flights.release('url')
+    for thread in threads:
+        thread.join()
+    assert finished == [True] * 4
+    assert len(flights) == 0
+
+
+def test_wait_times_out_when_leader_is_slow():
+    flights = SingleFlight()
+    flights.acquire('url')
+    assert not flights.wait('url', timeout=0.01)
+    flights.release('url')
+    assert flights.wait('url', timeout=0.01)
+
+
+def test_async_followers_wait_for_the_leader():
+    async def scenario():
+        flights = AsyncSingleFlight()
+        assert flights.acquire('url')
+        waiters = [asyncio.ensure_future(flights.wait('url', timeout=5)) for _ in range(3)]
+        await asyncio.sleep(0)
+        assert not any(waiter.done() for waiter in waiters)
+        timed_out = await flights.wait('url', timeout=0.01)
+
+        flights.release('url')
+        return timed_out, await asyncio.gather(*waiters)
+
+    timed_out, results = asyncio.run(scenario())
+    assert timed_out is False
+    assert results == [True, True, True]
+
+
+@pytest.mark.parametrize('mode', [ServerConfig.MODE_ASYNCIO, ServerConfig.MODE_THREADED])
+def test_concurrent_misses_are_coalesced(mode):
+    origin = SlowOrigin(delay=0.3)
+    port = _free_port()
+    server = ProxyServer(host='127.0.0.1', port=port, mode=mode)
+    threading.Thread(target=server.start, daemon=True).start()
+    time.sleep(0.3)
+    url = f"http://127.0.0.1:{origin.port}/popular"
+    responses = []
+    try:
+        clients = [
+            threading.Thread(target=lambda: responses.append(_proxy_get(port, url)))
+            for _ in range(5)
+        ]
+        for client in clients:
+            client.start()
+        for client in clients:
+            client.join()
+    finally:
+        server.stop()
+        origin.close()
+
+    assert len(responses) == 5
+    assert all(response.endswith(ORIGIN_BODY) for response in responses)
+    assert origin.requests == 1
@@ -0,0 +1,97 @@
+import threading
+import time
+
+from web.cache.cache_manager import CacheManager
+from web.cache.http_cache_policy import HTTPCachePolicy
+from web.cache.snapshot import CacheSnapshotter
+from web.config.settings import ServerConfig
+from web.proxy.request_parser import RequestParser
+from web.proxy.server import ProxyServer
+from web.tests.test_prefork import CachingOrigin
+from web.tests.test_server import _free_port, _proxy_get
+from web.utils.metrics import Metrics
+
+
+def test_snapshot_restores_values_and_deadlines(tmp_path):
+    path = str(tmp_path / 'cache.snap')
+    manager = CacheManager()
+    manager.cache('a', b'alpha', ttl=60, stale_ttl=30)
+    manager.cache('b', b'beta' * 1000)
+    manager.cache('gone', b'expired', ttl=-1)
+    manager.cache('object', {'not': 'bytes'})
+    snapshotter = CacheSnapshotter(manager, path)
+    assert snapshotter.snapshot() == 2
+    assert snapshotter.stats['bytes'] > len(b'beta' * 1000)
+
+    restored = CacheManager()
+    assert CacheSnapshotter(restored, path).load() == 2
+    assert bytes(restored.retrieve('a')) == b'alpha'
+    assert bytes(restored.retrieve('b')) == b'beta' * 1000
+    for restored_deadline, deadline in zip(restored.expiry('a'), manager.expiry('a')):
+        assert abs(restored_deadline - deadline) < 1
+    assert 'gone' not in [key for key, _, _, _ in restored.entries()]
+
+
+def test_corrupt_snapshot_starts_cold(tmp_path):
+    path = tmp_path / 'cache.snap'
+    manager = CacheManager()
+    manager.cache('a', b'alpha')
+    CacheSnapshotter(manager, str(path)).snapshot()
+    path.write_bytes(path.read_bytes()[:-3])
+
+    restored = CacheManager()
+    assert CacheSnapshotter(restored, str(path)).load() == 0
+    assert restored.cache_size == 0
+
+
+def test_restored_variants_stay_reachable():
+    manager = CacheManager()
+    request = RequestParser.parse_request(
+        b"GET /v HTTP/1.1\r\nHost: example.com\r\nAccept-Language: de\r\n\r\n"
+    )
+    HTTPCachePolicy(manager).store(
+        request, b"HTTP/1.1 200 OK\r\nCache-Control: max-age=60\r\nVary: Accept-Language\r\nContent-Length: 2\r\n\r\nde"
+    )
+
+    policy = HTTPCachePolicy(manager)
+    assert bytes(policy.lookup(request, policy.cache_key(request))[0]).endswith(b'de')
+
+
+def test_proxy_exports_snapshot_metrics(tmp_path):
+    path = str(tmp_path / 'cache.snap')
+    manager = CacheManager()
+    manager.cache('a', b'alpha')
+    CacheSnapshotter(manager, path).snapshot()
+
+    server = ProxyServer(host='127.0.0.1', port=_free_port(), mode=ServerConfig.MODE_THREADED, snapshot_path=path)
+    try:
+        text = Metrics.render()
+    finally:
+        server.stop()
+
+    assert 'proxy_cache_snapshot_loaded_entries 1' in text
+    assert 'proxy_cache_snapshot_load_duration_seconds ' in text
+    assert 'proxy_cache_snapshot_entries 0' in text
+    assert 'proxy_cache_snapshot_bytes 0' in text
+    assert 'proxy_cache_snapshot_duration_seconds 0' in text
+    assert 'proxy_cache_snapshot' not in Metrics.render()
+
+
+def test_proxy_restart_serves_from_snapshot(tmp_path):
+    origin = CachingOrigin()
+    path = str(tmp_path / 'cache.snap')
+    url = f"http://127.0.0.1:{origin.port}/warm"
+    try:
+        for _ in range(2):
+            port = _free_port()
+            server = ProxyServer(host='127.0.0.1', port=port, mode=ServerConfig.MODE_THREADED, snapshot_path=path)
+            threading.Thread(target=server.start, daemon=True).start()
+            time.sleep(0.3)
+            try:
+                assert _proxy_get(port, url).endswith(b'shared body')
+            finally:
+                server.stop()
+    finally:
+        origin.close()
+
+    assert origin.requests == 1
\ No newline at end of file
@@ -0,0 +1,75 @@
+from web.cache.cache_manager import CacheManager
+from web.cache.cache_storage import CacheStorage
+from web.cache.disk_storage import DiskCacheStorage
+from web.cache.tiered_storage import TieredCacheStorage
+
+
+def test_l1_evictions_are_demoted_to_l2():
+    l2 = CacheStorage(max_size=100)
+    storage = TieredCacheStorage(l2=l2, l1_size=2)
+    storage.set('a', b'1')
+    storage.set('b', b'2')
+    storage.set('c', b'3')
+
+    assert 'a' in l2
+    assert storage.get('a') == b'1'
+    assert len(storage) == 3
+    assert storage.stats['demotions'] == 1
+
+
+def test_repeated_l2_hits_promote_to_l1():
+    l2 = CacheStorage(max_size=100)
+    storage = TieredCacheStorage(l2=l2, l1_size=2, promotion_hits=2)
+    l2.set('a', b'cold')
+
+    storage.get('a')
+    assert 'a' in l2
+    storage.get('a')
+    assert 'a' not in l2
+
+    stats = storage.stats
+    assert stats['promotions'] == 1
+    assert stats['l1']['misses'] == 2 and stats['l2']['hits'] == 2
+    assert storage.get('a') == b'cold'
+    assert storage.stats['l1']['hits'] == 1
+
+
+def test_overwrite_does_not_leave_stale_copy_in_l2():
+    l2 = CacheStorage(max_size=100)
+    storage = TieredCacheStorage(l2=l2, l1_size=1)
+    storage.set('a', b'old')
+    storage.set('b', b'x')  # demotes 'a'
+    storage.set('a', b'new')
+
+    assert storage.get('a') == b'new'
+    storage.delete('a')
+    assert storage.get('a') is None
+
+
+def test_objects_too_big_for_l1_go_straight_to_l2():
+    l2 = CacheStorage(max_size=100)
+    storage = TieredCacheStorage(l2=l2, l1_size=10, l1_max_bytes=4)
+    storage.set('big', b'x' * 10)
+
+    assert 'big' in l2
+    assert storage.get('big') == b'x' * 10
+
+
+def test_disk_backed_l2(tmp_path):
+    storage = TieredCacheStorage(l2=DiskCacheStorage(directory=str(tmp_path)), l1_size=1)
+    storage.set('a', b'one')
+    storage.set('b', b'two')
+
+    assert bytes(storage.get('a')) == b'one'
+    assert len(storage) == 2
+
+
+def test_cache_manager_reports_per_tier_stats():
+    manager = CacheManager(l1_size=1)
+    manager.cache('a', b'one')
+    manager.retrieve('a')
+    manager.retrieve('missing')
+
+    stats = manager.stats
+    assert stats['l1'] == {'hits': 1, 'misses': 1, 'evictions': 0, 'expirations': 0}
+    assert stats['l2'] == {'hits': 0, 'misses': 1, 'evictions': 0, 'expirations': 0}
@@ -0,0 +1,116 @@
+import socket
+import threading
+import time
+
+import pytest
+
+from web.config.settings import ServerConfig
+from web.proxy.server import ProxyServer
+from web.tests.test_server import _free_port
+from web.utils.metrics import Metrics
+
+MODES = [ServerConfig.MODE_ASYNCIO, ServerConfig.MODE_THREADED]
+
+
+class EchoServer:
+    """Target that echoes everything back and closes once the client does"""
+
+    def __init__(self):
+        self._socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self._socket.bind(('127.0.0.1', 0))
+        self._socket.listen(16)
+        self.port = self._socket.getsockname()[1]
+        threading.Thread(target=self._accept_loop, daemon=True).start()
+
+    def _accept_loop(self) -> None:
+        while True:
+            try:
+                conn, _ = self._socket.accept()
+            except OSError:
+                return
+            threading.Thread(target=self._serve, args=(conn,), daemon=True).start()
+
+    @staticmethod
+    def _serve(conn: socket.socket) -> None:
+        with conn:
+            while True:
+                data = conn.recv(65536)
+                if not data:
+                    return
+                conn.sendall(data)
+
+    def close(self) -> None:
+        self._socket.shutdown(socket.SHUT_RDWR)
+        self._socket.close()
+
+
+@pytest.fixture
+def echo_server():
+    server = EchoServer()
+    yield server
+    server.close()
+
+
+@pytest.fixture
+def proxy(request, monkeypatch):
+    monkeypatch.setattr(ServerConfig, 'TUNNEL_PORTS', None)
+    port = _free_port()
+    server = ProxyServer(host='127.0.0.1', port=port, mode=request.param)
+    threading.Thread(target=server.start, daemon=True).start()
+    time.sleep(0.3)
+    yield port
+    server.stop()
+
+
+def _connect(proxy_port: int, target_port: int, early: bytes = b'') -> socket.socket:
+    client = socket.create_connection(('127.0.0.1', proxy_port), timeout=5)
+    client.sendall(f"CONNECT 127.0.0.1:{target_port} HTTP/1.1\r\nHost: 127.0.0.1\r\n\r\n".encode() + early)
+    return client
+
+
+def _read_all(client: socket.socket) -> bytes:
+    data = bytearray()
+    while True:
+        chunk = client.recv(65536)
+        if not chunk:
+            return bytes(data)
+        data += chunk
+
+
+@pytest.mark.parametrize('proxy', MODES, indirect=True)
+def test_tunnel_relays_both_ways_until_both_sides_close(proxy, echo_server):
+    upstream_before = Metrics.value('proxy_tunnel_bytes_total', direction='upstream')
+    payload = bytes(range(256)) * 4096
+    with _connect(proxy, echo_server.port, early=b'hello') as client:
+        # The client sends everything, then half-closes; the echo comes back in full
+        sender = threading.Thread(target=lambda: (client.sendall(payload), client.shutdown(socket.SHUT_WR)))
+        sender.start()
+        received = _read_all(client)
+        sender.join()
+
+    assert received == b"HTTP/1.1 200 Connection Established\r\n\r\nhello" + payload
+    time.sleep(0.1)
+    assert Metrics.value('proxy_tunnel_bytes_total', direction='upstream') - upstream_before == len(payload) + 5
+
+
+@pytest.mark.parametrize('proxy', MODES, indirect=True)
+def test_tunnel_refuses_forbidden_ports_and_unreachable_targets(proxy, monkeypatch):
+    with _connect(proxy, _free_port()) as client:
+        assert _read_all(client).startswith(b"HTTP/1.1 502")
+
+    monkeypatch.setattr(ServerConfig, 'TUNNEL_PORTS', (443,))
+    with _connect(proxy, 8443) as client:
+        assert _read_all(client).startswith(b"HTTP/1.1 403")
+
+
+@pytest.mark.parametrize('proxy', MODES, indirect=True)
+def test_idle_tunnel_is_closed(proxy, echo_server, monkeypatch):
+    monkeypatch.setattr(ServerConfig, 'TUNNEL_IDLE_TIMEOUT', 0.3)
+    timeouts_before = Metrics.value('proxy_tunnels_total', result='idle_timeout')
+    with _connect(proxy, echo_server.port, early=b'ping') as client:
+        started = time.monotonic()
+        assert _read_all(client).endswith(b'ping')
+        assert time.monotonic() - started < 3
+
+    time.sleep(0.1)
+    assert Metrics.value('proxy_tunnels_total', result='idle_timeout') == timeouts_before + 1
\ No newline at end of file
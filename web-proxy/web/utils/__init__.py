@@ -0,0 +1,5 @@
+# web/utils/__init__.py
+from .metrics import Metrics
+from .timer import Histogram, StageTimer
+
+__all__ = ['Histogram', 'Metrics', 'StageTimer']
\ No newline at end of file
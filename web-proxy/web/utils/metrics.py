@@ -0,0 +1,210 @@
+# web/utils/metrics.py
+import threading
+from typing import Callable, Dict, List, Optional, Tuple
+from .timer import Histogram, StageTimer
+
+# Stages of handling a request, in the order they happen
+STAGES = (
+    'parse', 'blocklist', 'cache_lookup', 'coalesce_wait',
+    'upstream_connect', 'upstream_transfer', 'client_send'
+)
+
+# Type and help text of every exported metric
+_DESCRIPTIONS: Dict[str, Tuple[str, str]] = {
+    'proxy_requests_total': ('counter', 'Requests handled'),
+    'proxy_blocked_requests_total': ('counter', 'Requests refused by the URL blocklist'),
+    'proxy_cache_requests_total': ('counter', 'Cacheable requests by how the cache answered them'),
+    'proxy_cache_hit_ratio': ('gauge', 'Share of cacheable requests answered without contacting the origin'),
+    'proxy_cache_served_bytes_total': ('counter', 'Response bytes served from the cache instead of the origin'),
+    'proxy_upstream_bytes_total': ('counter', 'Response bytes relayed from origins'),
+    'proxy_request_duration_seconds': ('histogram', 'Time from accepting a request to sending its response'),
+    'proxy_stage_duration_seconds': ('histogram', 'Time per request spent in each stage of handling it'),
+    'proxy_cache_entries': ('gauge', 'Entries in the cache'),
+    'proxy_cache_size_bytes': ('gauge', 'Total size of cached values'),
+    'proxy_cache_evictions_total': ('counter', 'Entries evicted to make room'),
+    'proxy_cache_expirations_total': ('counter', 'Entries removed after their retention ended'),
+    'proxy_cache_compression_saved_bytes_total': ('counter', 'Bytes saved by storing responses compressed'),
+    'proxy_rejected_connections_total': ('counter', 'Client connections turned away, by reason'),
+    'proxy_active_clients': ('gauge', 'Client connections being served'),
+    'proxy_queued_clients': ('gauge', 'Accepted client connections waiting to be served'),
+    'proxy_tunnels_total': ('counter', 'CONNECT tunnels by how they ended'),
+    'proxy_tunnel_bytes_total': ('counter', 'Bytes relayed through CONNECT tunnels, by direction'),
+    'proxy_log_records_dropped_total': ('counter', 'Log records dropped because the log queue was full'),
+    'proxy_log_queue_depth': ('gauge', 'Log records waiting to be written')
+}
+
+# Counter key: metric name and sorted (label, value) pairs
+_CounterKey = Tuple[str, Tuple[Tuple[str, str], ...]]
+
+def _format_labels(labels: Tuple[Tuple[str, str], ...]) -> str:
+    """Render label pairs as a Prometheus label set"""
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{name}="{value}"' for name, value in labels) + '}'
+
+
+def _format_value(value: float) -> str:
+    """Render a sample value, integers without a fraction"""
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class Metrics:
+    """
+    Process-wide proxy metrics, exported in the Prometheus text format
+    
+    Request handlers bump counters and hand over their StageTimer once
+    a request is done. Components keeping counters of their own (the
+    cache, the log writer) register collectors instead, which are only
+    called when the metrics are rendered.
+    """
+    
+    _lock = threading.Lock()
+    _counters: Dict[_CounterKey, float] = {}
+    _stages: Dict[str, Histogram] = {stage: Histogram() for stage in STAGES}
+    _requests = Histogram()
+    _collectors: Dict[str, Callable[[], Dict[str, float]]] = {}
+    
+    @classmethod
+    def increment(cls, name: str, amount: float = 1, **labels: str) -> None:
+        """
+        Add to a counter
+        
+        :param name: Metric name
+        :param amount: Amount added
+        :param labels: Label values of the counter
+        """
+        key = (name, tuple(sorted(labels.items())) if labels else ())
+        with cls._lock:
+            cls._counters[key] = cls._counters.get(key, 0) + amount
+    
+    @classmethod
+    def value(cls, name: str, **labels: str) -> float:
+        """
+        Get the current value of a counter
+        
+        :param name: Metric name
+        :param labels: Label values of the counter
+        :return: Counter value (0 if never incremented)
+        """
+        return cls._counters.get((name, tuple(sorted(labels.items()))), 0)
+    
+    @classmethod
+    def record_request(cls, timer: StageTimer) -> None:
+        """
+        Record the total and per-stage durations of a finished request
+        
+        :param timer: Timer the request's stages were lapped on
+        """
+        cls._requests.observe(timer.elapsed)
+        for stage, seconds in timer.stages.items():
+            histogram = cls._stages.get(stage)
+            if histogram is None:
+                with cls._lock:
+                    histogram = cls._stages.setdefault(stage, Histogram())
+            histogram.observe(seconds)
+    
+    @classmethod
+    def stage(cls, name: str) -> Histogram:
+        """
+        Get the duration histogram of a stage
+        
+        :param name: Stage name
+        :return: Histogram of the seconds per request spent in the stage
+        """
+        with cls._lock:
+            return cls._stages.setdefault(name, Histogram())
+    
+    @classmethod
+    def register_collector(cls, name: str, collector: Callable[[], Dict[str, float]]) -> None:
+        """
+        Register a callable read whenever the metrics are rendered
+        
+        :param name: Collector name; registering it again replaces it
+        :param collector: Returns current values by metric name
+        """
+        with cls._lock:
+            cls._collectors[name] = collector
+    
+    @classmethod
+    def unregister_collector(cls, 
+                             name: str, 
+                             collector: Optional[Callable[[], Dict[str, float]]] = None) -> None:
+        """
+        Remove a collector
+        
+        :param name: Collector name
+        :param collector: Only remove the collector if it is still this one
+        """
+        with cls._lock:
+            if collector is None or cls._collectors.get(name) == collector:
+                cls._collectors.pop(name, None)
+    
+    @classmethod
+    def render(cls) -> str:
+        """
+        Render every metric in the Prometheus text exposition format
+        
+        :return: Metrics text
+        """
+        with cls._lock:
+            counters = dict(cls._counters)
+            collectors = list(cls._collectors.values())
+            stages = dict(cls._stages)
+        
+        samples: Dict[str, List[str]] = {}
+        for (name, labels), value in sorted(counters.items()):
+            samples.setdefault(name, []).append(f'{name}{_format_labels(labels)} {_format_value(value)}')
+        
+        results = {
+            dict(labels).get('result'): value
+            for (name, labels), value in counters.items() if name == 'proxy_cache_requests_total'
+        }
+        if results:
+            ratio = 1 - results.get('miss', 0) / sum(results.values())
+            samples['proxy_cache_hit_ratio'] = [f'proxy_cache_hit_ratio {_format_value(ratio)}']
+        
+        for collector in collectors:
+            for name, value in collector().items():
+                samples.setdefault(name, []).append(f'{name} {_format_value(value)}')
+        
+        samples['proxy_request_duration_seconds'] = cls._histogram_lines(
+            'proxy_request_duration_seconds', (), cls._requests
+        )
+        samples['proxy_stage_duration_seconds'] = [
+            line
+            for stage, histogram in stages.items()
+            for line in cls._histogram_lines('proxy_stage_duration_seconds', (('stage', stage),), histogram)
+        ]
+        
+        lines = []
+        for name, metric_lines in samples.items():
+            kind, help_text = _DESCRIPTIONS.get(name, ('untyped', name))
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} {kind}')
+            lines.extend(metric_lines)
+        return '\n'.join(lines) + '\n'
+    
+    @staticmethod
+    def _histogram_lines(name: str, 
+                         labels: Tuple[Tuple[str, str], ...], 
+                         histogram: Histogram) -> List[str]:
+        """Render a histogram as cumulative buckets, sum and count"""
+        bounds, counts, total = histogram.snapshot()
+        lines = []
+        cumulative = 0
+        for bound, count in zip(bounds + (float('inf'),), counts):
+            cumulative += count
+            le = '+Inf' if bound == float('inf') else repr(bound)
+            lines.append(f'{name}_bucket{_format_labels(labels + (("le", le),))} {cumulative}')
+        lines.append(f'{name}_sum{_format_labels(labels)} {_format_value(total)}')
+        lines.append(f'{name}_count{_format_labels(labels)} {cumulative}')
+        return lines
+    
+    @classmethod
+    def reset(cls) -> None:
+        """Forget every counter and observation; collectors stay registered"""
+        with cls._lock:
+            cls._counters.clear()
+            for histogram in cls._stages.values():
+                histogram.reset()
+            cls._requests.reset()
\ No newline at end of file
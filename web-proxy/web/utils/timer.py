@@ -0,0 +1,124 @@
+# web/utils/timer.py
+import bisect
+import threading
+import time
+from typing import Dict, List, Sequence, Tuple
+
+# Upper bounds in seconds of the default latency buckets, 100 us to 30 s
+LATENCY_BUCKETS = (
+    0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025,
+    0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0
+)
+
+class Histogram:
+    """
+    Fixed-bucket histogram of observed values
+    
+    Recording an observation is a bisect over the bucket bounds and two
+    increments, so it is cheap enough for every request.
+    """
+    
+    __slots__ = ('_bounds', '_counts', '_sum', '_lock')
+    
+    def __init__(self, bounds: Sequence[float] = LATENCY_BUCKETS):
+        """
+        Initialize histogram
+        
+        :param bounds: Ascending upper bounds of the buckets; values above
+                       the last bound fall into an overflow bucket
+        """
+        self._bounds = tuple(bounds)
+        self._counts = [0] * (len(self._bounds) + 1)
+        self._sum = 0.0
+        self._lock = threading.Lock()
+    
+    def observe(self, value: float) -> None:
+        """
+        Record one observation
+        
+        :param value: Observed value
+        """
+        index = bisect.bisect_left(self._bounds, value)
+        with self._lock:
+            self._counts[index] += 1
+            self._sum += value
+    
+    def snapshot(self) -> Tuple[Tuple[float, ...], List[int], float]:
+        """
+        Get a consistent copy of the histogram
+        
+        :return: (bucket bounds, count per bucket including the overflow
+                 bucket, sum of all observations)
+        """
+        with self._lock:
+            return self._bounds, list(self._counts), self._sum
+    
+    def quantile(self, q: float) -> float:
+        """
+        Estimate a quantile from the bucket counts
+        
+        :param q: Quantile between 0 and 1
+        :return: Upper bound of the bucket holding the quantile (the last
+                 bound for the overflow bucket, 0.0 when empty)
+        """
+        bounds, counts, _ = self.snapshot()
+        rank = q * sum(counts)
+        seen = 0
+        for index, count in enumerate(counts):
+            seen += count
+            if count and seen >= rank:
+                return bounds[min(index, len(bounds) - 1)]
+        return 0.0
+    
+    @property
+    def count(self) -> int:
+        """Number of observations recorded"""
+        return sum(self._counts)
+    
+    def reset(self) -> None:
+        """Forget every observation"""
+        with self._lock:
+            self._counts = [0] * (len(self._bounds) + 1)
+            self._sum = 0.0
+
+
+class StageTimer:
+    """
+    Split the time spent on one request into named stages
+    
+    Each lap() charges the time since the previous lap to a stage, so
+    consecutive laps cover the request without gaps or overlaps. A
+    stage lapped more than once (e.g. once per relayed chunk) adds up.
+    """
+    
+    __slots__ = ('_started', '_last', '_stages')
+    
+    def __init__(self):
+        """Initialize timer, starting now"""
+        self._started = self._last = time.perf_counter()
+        self._stages: Dict[str, float] = {}
+    
+    def restart(self) -> None:
+        """Start the timer again from now, dropping any stages lapped"""
+        self._started = self._last = time.perf_counter()
+        self._stages = {}
+    
+    def lap(self, stage: str) -> None:
+        """
+        Charge the time since the previous lap to a stage
+        
+        :param stage: Stage name
+        """
+        now = time.perf_counter()
+        self._stages[stage] = self._stages.get(stage, 0.0) + now - self._last
+        self._last = now
+    
+    @property
+    def stages(self) -> Dict[str, float]:
+        """Seconds charged to each stage so far"""
+        return self._stages
+    
+    @property
+    def elapsed(self) -> float:
+        """Seconds since the timer started"""
+        return time.perf_counter() - self._started
\ No newline at end of file